@@ -84,22 +84,40 @@ class RabbitMQConsumer:
             print(f"❌ Error in consumer: {e}")
     
     def on_status_update_message(self, channel, method, properties, body):
-        #Handle incoming status update messages
+        #Handle incoming status update messages: one update, or {'updates': [...]} from a bulk status change
         try:
             data = json.loads(body)
+            updates = data['updates'] if 'updates' in data else [data]
             
             with self.app.app_context():
-                success = service.send_status_update_notification(
-                    data['task_id'],
-                    data['old_status'],
-                    data['new_status'],
-                    data['changed_by_id']
-                )
+                failed = []
+                for update in updates:
+                    try:
+                        success = service.send_status_update_notification(
+                            update['task_id'],
+                            update['old_status'],
+                            update['new_status'],
+                            update['changed_by_id']
+                        )
+                    except Exception as e:
+                        print(f"❌ Error processing status update for task {update.get('task_id')}: {e}")
+                        success = False
+                    if not success:
+                        failed.append(update)
                 
-                if success:
+                if not failed:
                     channel.basic_ack(delivery_tag=method.delivery_tag)
-                else:
+                elif len(failed) == len(updates):
                     channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+                else:
+                    # Only retry the failed part of a batch, so the others are not notified twice
+                    channel.basic_publish(
+                        exchange='',
+                        routing_key='task_status_updates',
+                        body=json.dumps({'updates': failed}),
+                        properties=pika.BasicProperties(delivery_mode=2)
+                    )
+                    channel.basic_ack(delivery_tag=method.delivery_tag)
                     
         except json.JSONDecodeError as e:
             print(f"❌ Invalid JSON in status update: {e}")
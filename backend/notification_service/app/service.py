@@ -82,8 +82,10 @@ def get_task_details(task_id):
         return None
 
 
-def get_task_collaborators(task_id):
-    #Fetch collaborators for a task
+def get_task_collaborators(task_id, collaborators_by_task=None):
+    #Fetch collaborators for a task (from a map prefetched by get_collaborators_for_tasks when given)
+    if collaborators_by_task is not None and task_id in collaborators_by_task:
+        return collaborators_by_task[task_id]
     try:
         task_service_url = current_app.config['TASK_SERVICE_URL']
         response = requests.get(
@@ -101,6 +103,29 @@ def get_task_collaborators(task_id):
         return []
 
 
+def get_collaborators_for_tasks(task_ids):
+    #Fetch collaborators for many tasks in one request, as {task_id: [user_id, ...]}
+    task_ids = list(dict.fromkeys(task_ids))
+    if not task_ids:
+        return {}
+    try:
+        task_service_url = current_app.config['TASK_SERVICE_URL']
+        response = requests.post(
+            f"{task_service_url}/tasks/collaborators:batch",
+            json={'task_ids': task_ids},
+            timeout=15
+        )
+        
+        if response.status_code == 200:
+            return {int(task_id): user_ids for task_id, user_ids in response.json().items()}
+        print(f"⚠️  Task service returned status {response.status_code} for collaborator batch")
+        return {}
+            
+    except Exception as e:
+        print(f"❌ Failed to fetch collaborators for {len(task_ids)} tasks: {e}")
+        return {}
+
+
 def get_all_tasks_with_deadlines():
     #Fetch all tasks and subtasks that have deadlines
     try:
@@ -121,6 +146,47 @@ def get_all_tasks_with_deadlines():
         return []
 
 
+def sync_deadline_feed():
+    #Bring this worker's copy of the active tasks with deadlines up to date and return it
+    #The first call downloads a snapshot; later calls only move the tasks changed since then
+    feed = current_app.extensions.setdefault('deadline_feed', {'cursor': None, 'tasks': {}})
+    try:
+        task_service_url = current_app.config['TASK_SERVICE_URL']
+        has_more = True
+        while has_more:
+            params = {'updated_since': feed['cursor']} if feed['cursor'] else {}
+            response = requests.get(
+                f"{task_service_url}/tasks/with-deadlines/feed",
+                params=params,
+                timeout=15
+            )
+            
+            if response.status_code != 200:
+                print(f"⚠️  Task service returned status {response.status_code} for deadline feed")
+                break
+            
+            data = response.json()
+            for task in data.get('tasks', []):
+                if task.get('deadline') and task.get('status') != 'Completed':
+                    feed['tasks'][task['id']] = task
+                else:
+                    feed['tasks'].pop(task['id'], None)
+            feed['cursor'] = data.get('next_cursor')
+            has_more = data.get('has_more', False)
+            
+    except Exception as e:
+        print(f"❌ Failed to sync deadline feed: {e}")
+    
+    return list(feed['tasks'].values())
+
+
+def drop_from_deadline_feed(task_id):
+    #Forget a task that was deleted or completed since it was last synced
+    feed = current_app.extensions.get('deadline_feed')
+    if feed:
+        feed['tasks'].pop(task_id, None)
+
+
 def parse_deadline(deadline_str):
     #Parse and Convert into SG Time
     singapore_tz = ZoneInfo('Asia/Singapore')
@@ -337,24 +403,26 @@ def send_status_update_notification(task_id, old_status, new_status, changed_by_
         return False
 
 # ==================== Deadline Reminder Notification ====================
-def send_deadline_reminder(task_id, days_before):
+def send_deadline_reminder(task_id, days_before, collaborators_by_task=None):
     #Send deadline reminder notification for a specific task
     try:
         #Get task details
         task = get_task_details(task_id)
         if not task:
             print(f"      ❌ Task not found")
+            drop_from_deadline_feed(task_id)
             return False
         
         #Skip if completed
         if task.get('status') == 'Completed':
             print(f"      ⏭️  Task completed, skipping")
+            drop_from_deadline_feed(task_id)
             return False
         
         #Collect recipients
         is_subtask = task.get('parent_task_id') is not None
         recipient_ids = set([task['owner_id']])
-        recipient_ids.update(get_task_collaborators(task_id))
+        recipient_ids.update(get_task_collaborators(task_id, collaborators_by_task))
         
         if not recipient_ids:
             return True
@@ -415,7 +483,7 @@ def check_and_send_deadline_reminders():
         print(f"   Today's Date: {today}")
         print(f"{'='*70}")
         
-        tasks = get_all_tasks_with_deadlines()
+        tasks = sync_deadline_feed()
         print(f"📋 Total tasks with deadlines: {len(tasks)}")
         
         if not tasks:
@@ -424,6 +492,7 @@ def check_and_send_deadline_reminders():
         
         reminder_intervals = [7, 3, 1]
         reminders_sent = 0
+        due_reminders = []
         
         for task in tasks:
             task_id = task['id']
@@ -460,14 +529,19 @@ def check_and_send_deadline_reminders():
                         print(f"      Today's Date: {today}")
                         print(f"      Days Before Deadline: {days_before}")
                         
-                        if send_deadline_reminder(task_id, days_before):
-                            reminders_sent += 1
+                        due_reminders.append((task_id, days_before))
             
             except Exception as e:
                 print(f"\n   ❌ Task {task_id}: {task_title}")
                 print(f"      Error: {e}")
                 continue
         
+        #Fetch collaborators of every due task in one request
+        collaborators_by_task = get_collaborators_for_tasks([task_id for task_id, _ in due_reminders])
+        for task_id, days_before in due_reminders:
+            if send_deadline_reminder(task_id, days_before, collaborators_by_task):
+                reminders_sent += 1
+        
         print(f"\n{'='*70}")
         print(f"✅ Check Complete: {reminders_sent} deadline reminder(s) sent")
         print(f"{'='*70}\n")
@@ -480,24 +554,26 @@ def check_and_send_deadline_reminders():
 
 
 # ==================== Overdue Task Alert Notification ====================
-def send_overdue_task_alert(task_id, days_overdue):
+def send_overdue_task_alert(task_id, days_overdue, collaborators_by_task=None):
     #Send overdue alert notification for a specific task
     try:
         #Get task details
         task = get_task_details(task_id)
         if not task:
             print(f"      ❌ Task not found")
+            drop_from_deadline_feed(task_id)
             return False
         
         #Skip if completed
         if task.get('status') == 'Completed':
             print(f"      ⏭️  Task completed, skipping")
+            drop_from_deadline_feed(task_id)
             return False
         
         #Collect recipients
         is_subtask = task.get('parent_task_id') is not None
         recipient_ids = set([task['owner_id']])
-        recipient_ids.update(get_task_collaborators(task_id))
+        recipient_ids.update(get_task_collaborators(task_id, collaborators_by_task))
         
         if not recipient_ids:
             return True
@@ -565,7 +641,7 @@ def check_and_send_overdue_alerts():
         print(f"   Today's Date: {today}")
         print(f"{'='*70}")
         
-        tasks = get_all_tasks_with_deadlines()
+        tasks = sync_deadline_feed()
         print(f"📋 Total tasks with deadlines: {len(tasks)}")
         
         if not tasks:
@@ -573,6 +649,7 @@ def check_and_send_overdue_alerts():
             return 0
         
         alerts_sent = 0
+        due_alerts = []
         
         for task in tasks:
             task_id = task['id']
@@ -616,14 +693,19 @@ def check_and_send_overdue_alerts():
                     print(f"      Today's Date: {today}")
                     print(f"      Overdue By: {days_overdue} day(s)")
                     
-                    if send_overdue_task_alert(task_id, days_overdue):
-                        alerts_sent += 1
+                    due_alerts.append((task_id, days_overdue))
             
             except Exception as e:
                 print(f"\n   ❌ Task {task_id}: {task_title}")
                 print(f"      Error: {e}")
                 continue
         
+        #Fetch collaborators of every overdue task in one request
+        collaborators_by_task = get_collaborators_for_tasks([task_id for task_id, _ in due_alerts])
+        for task_id, days_overdue in due_alerts:
+            if send_overdue_task_alert(task_id, days_overdue, collaborators_by_task):
+                alerts_sent += 1
+        
         print(f"\n{'='*70}")
         print(f"✅ Check Complete: {alerts_sent} overdue alert(s) sent")
         print(f"{'='*70}\n")
@@ -17,7 +17,9 @@ from app.service import (
     get_user_name,
     get_task_details,
     get_task_collaborators,
+    get_collaborators_for_tasks,
     get_all_tasks_with_deadlines,
+    sync_deadline_feed,
     parse_deadline,
     format_deadline_for_email,
     send_status_update_notification,
@@ -360,6 +362,44 @@ class TestNotificationService(unittest.TestCase):
             collaborators = get_task_collaborators(1)
             self.assertEqual(len(collaborators), 0)
 
+    @mock.patch('requests.post')
+    def test_get_collaborators_for_tasks_success(self, mock_post):
+        """Test fetching collaborators for many tasks in one request"""
+        with self.app.app_context():
+            mock_response = mock.MagicMock()
+            mock_response.status_code = 200
+            mock_response.json.return_value = {'1': [2, 3], '2': []}
+            mock_post.return_value = mock_response
+
+            collaborators = get_collaborators_for_tasks([1, 2, 1])
+            self.assertEqual(collaborators, {1: [2, 3], 2: []})
+            mock_post.assert_called_once()
+            self.assertEqual(mock_post.call_args.kwargs['json'], {'task_ids': [1, 2]})
+
+    @mock.patch('requests.post')
+    def test_get_collaborators_for_tasks_error(self, mock_post):
+        """Test batch collaborator lookup failures return an empty map"""
+        with self.app.app_context():
+            self.assertEqual(get_collaborators_for_tasks([]), {})
+            mock_post.assert_not_called()
+
+            mock_post.side_effect = Exception("Connection error")
+            self.assertEqual(get_collaborators_for_tasks([1]), {})
+
+    @mock.patch('requests.get')
+    def test_get_task_collaborators_uses_prefetched_map(self, mock_get):
+        """Test get_task_collaborators only calls the task service for tasks missing from the map"""
+        with self.app.app_context():
+            mock_response = mock.MagicMock()
+            mock_response.status_code = 200
+            mock_response.json.return_value = [{'user_id': 5}]
+            mock_get.return_value = mock_response
+
+            self.assertEqual(get_task_collaborators(1, {1: [2, 3]}), [2, 3])
+            mock_get.assert_not_called()
+            self.assertEqual(get_task_collaborators(2, {1: [2, 3]}), [5])
+            mock_get.assert_called_once()
+
     @mock.patch('requests.get')
     def test_get_all_tasks_with_deadlines_success(self, mock_get):
         """Test fetching all tasks with deadlines"""
@@ -383,6 +423,45 @@ class TestNotificationService(unittest.TestCase):
             tasks = get_all_tasks_with_deadlines()
             self.assertEqual(len(tasks), 0)
 
+    @mock.patch('requests.get')
+    def test_sync_deadline_feed_applies_changes(self, mock_get):
+        """Test the deadline feed snapshot followed by an incremental sync"""
+        def feed_response(tasks, cursor, has_more=False):
+            response = mock.MagicMock()
+            response.status_code = 200
+            response.json.return_value = {'tasks': tasks, 'next_cursor': cursor, 'has_more': has_more}
+            return response
+
+        with self.app.app_context():
+            mock_get.side_effect = [
+                feed_response([self.task_data], 'c1', has_more=True),
+                feed_response([self.subtask_data], 'c2'),
+            ]
+            tasks = sync_deadline_feed()
+            self.assertEqual(sorted(task['id'] for task in tasks), [1, 2])
+            self.assertNotIn('updated_since', mock_get.call_args_list[0].kwargs['params'])
+            self.assertEqual(mock_get.call_args_list[1].kwargs['params'], {'updated_since': 'c1'})
+
+            completed = dict(self.task_data, status='Completed')
+            mock_get.side_effect = [feed_response([completed], 'c3')]
+            tasks = sync_deadline_feed()
+            self.assertEqual([task['id'] for task in tasks], [2])
+            self.assertEqual(mock_get.call_args.kwargs['params'], {'updated_since': 'c2'})
+
+    @mock.patch('requests.get')
+    def test_sync_deadline_feed_keeps_tasks_on_error(self, mock_get):
+        """Test a failed sync returns the tasks already synced"""
+        with self.app.app_context():
+            ok = mock.MagicMock()
+            ok.status_code = 200
+            ok.json.return_value = {'tasks': [self.task_data], 'next_cursor': 'c1', 'has_more': False}
+            failed = mock.MagicMock()
+            failed.status_code = 500
+            mock_get.side_effect = [ok, failed]
+
+            self.assertEqual(len(sync_deadline_feed()), 1)
+            self.assertEqual(len(sync_deadline_feed()), 1)
+
     # ==================== Test Helper Functions ====================
     
     def test_parse_deadline_timezone_aware_utc(self):
@@ -736,7 +815,7 @@ class TestNotificationService(unittest.TestCase):
                 mock_resp.status_code = 200
                 
                 if 'with-deadlines' in url:
-                    mock_resp.json.return_value = [task_7days]
+                    mock_resp.json.return_value = {'tasks': [task_7days], 'next_cursor': 'c1', 'has_more': False}
                 elif 'collaborators' in url:
                     mock_resp.json.return_value = []
                 elif 'tasks/1' in url:
@@ -856,7 +935,7 @@ class TestNotificationService(unittest.TestCase):
                 mock_resp.status_code = 200
                 
                 if 'with-deadlines' in url:
-                    mock_resp.json.return_value = [task]
+                    mock_resp.json.return_value = {'tasks': [task], 'next_cursor': 'c1', 'has_more': False}
                 elif 'collaborators' in url:
                     mock_resp.json.return_value = []
                 elif 'tasks/1' in url:
@@ -897,7 +976,7 @@ class TestNotificationService(unittest.TestCase):
                 mock_resp.status_code = 200
                 
                 if 'with-deadlines' in url:
-                    mock_resp.json.return_value = [task]
+                    mock_resp.json.return_value = {'tasks': [task], 'next_cursor': 'c1', 'has_more': False}
                 elif 'collaborators' in url:
                     mock_resp.json.return_value = []
                 elif 'tasks/1' in url:
@@ -1068,7 +1147,7 @@ class TestNotificationService(unittest.TestCase):
                 mock_resp.status_code = 200
                 
                 if 'with-deadlines' in url:
-                    mock_resp.json.return_value = [overdue_task]
+                    mock_resp.json.return_value = {'tasks': [overdue_task], 'next_cursor': 'c1', 'has_more': False}
                 elif 'collaborators' in url:
                     mock_resp.json.return_value = []
                 elif 'tasks/1' in url:
@@ -1481,6 +1560,36 @@ class TestNotificationService(unittest.TestCase):
         
         mock_channel.basic_nack.assert_called_with(delivery_tag=1, requeue=True)
 
+    @mock.patch('pika.BlockingConnection')
+    @mock.patch('app.service.send_status_update_notification')
+    def test_rabbitmq_consumer_batched_status_updates(self, mock_notify, mock_conn):
+        """Test a bulk status change message: every update is notified, only failures are retried"""
+        from app.rabbitmq_consumer import RabbitMQConsumer
+        
+        mock_channel = mock.MagicMock()
+        consumer = RabbitMQConsumer(self.app)
+        
+        updates = [
+            {'task_id': task_id, 'old_status': 'Ongoing', 'new_status': 'Completed', 'changed_by_id': 1}
+            for task_id in (1, 2, 3)
+        ]
+        mock_notify.return_value = True
+        consumer.on_status_update_message(
+            mock_channel, mock.MagicMock(delivery_tag=1), None, json.dumps({'updates': updates}).encode()
+        )
+        self.assertEqual([c.args[0] for c in mock_notify.call_args_list], [1, 2, 3])
+        mock_channel.basic_ack.assert_called_with(delivery_tag=1)
+        
+        mock_notify.reset_mock()
+        mock_notify.side_effect = lambda task_id, *args: task_id != 2
+        consumer.on_status_update_message(
+            mock_channel, mock.MagicMock(delivery_tag=2), None, json.dumps({'updates': updates}).encode()
+        )
+        republished = json.loads(mock_channel.basic_publish.call_args.kwargs['body'])
+        self.assertEqual(republished, {'updates': [updates[1]]})
+        mock_channel.basic_ack.assert_called_with(delivery_tag=2)
+        mock_channel.basic_nack.assert_not_called()
+
     @mock.patch('pika.BlockingConnection')
     def test_rabbitmq_consumer_close(self, mock_conn):
         """Test RabbitMQ consumer close"""
@@ -1780,7 +1889,7 @@ class TestNotificationService(unittest.TestCase):
                 mock_resp.status_code = 200
                 
                 if 'with-deadlines' in url:
-                    mock_resp.json.return_value = [task]
+                    mock_resp.json.return_value = {'tasks': [task], 'next_cursor': 'c1', 'has_more': False}
                 elif 'collaborators' in url:
                     mock_resp.json.return_value = []
                 elif 'tasks/1' in url:
@@ -1819,7 +1928,7 @@ class TestNotificationService(unittest.TestCase):
                 mock_resp.status_code = 200
                 
                 if 'with-deadlines' in url:
-                    mock_resp.json.return_value = [task]
+                    mock_resp.json.return_value = {'tasks': [task], 'next_cursor': 'c1', 'has_more': False}
                 elif 'collaborators' in url:
                     mock_resp.json.return_value = []
                 elif 'tasks/1' in url:
@@ -2854,7 +2963,7 @@ class TestNotificationService(unittest.TestCase):
                 mock_resp.status_code = 200
                 
                 if 'with-deadlines' in url:
-                    mock_resp.json.return_value = [task]
+                    mock_resp.json.return_value = {'tasks': [task], 'next_cursor': 'c1', 'has_more': False}
                 elif 'collaborators' in url:
                     mock_resp.json.return_value = []
                 elif 'tasks/' in url:
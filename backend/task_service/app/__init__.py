@@ -3,6 +3,13 @@ from flask_cors import CORS
 from config import app_config
 from .models import db
 from .routes import task_bp
+from .visibility import visibility_cli
+from .closure import closure_cli
+from .counters import counters_cli
+from .changes import changes_cli
+from .cache import init_payload_cache
+from .events import init_event_broker
+from .encoding import OrjsonProvider
 from .report import routes as reports_routes
 import boto3
 
@@ -11,6 +18,8 @@ def create_app(config_name="development"):
     
     app = Flask(__name__)
     app.config.from_object(app_config[config_name])
+    # jsonify() through orjson
+    app.json = OrjsonProvider(app)
 
     if not app.config.get("TESTING"):
         app.s3_client = boto3.client(
@@ -27,9 +36,21 @@ def create_app(config_name="development"):
     
     # Initialize database
     db.init_app(app)
+
+    # Read-through cache for task and project payloads (PAYLOAD_CACHE_BACKEND)
+    init_payload_cache(app)
+
+    # Live task events for GET /tasks/events (TASK_EVENTS_BROKER)
+    init_event_broker(app)
     
     # Register blueprint - Use prefix="" because Kong routes /tasks to this service
     app.register_blueprint(task_bp, url_prefix="")
+
+    # `flask visibility|closure rebuild|verify` maintenance commands
+    app.cli.add_command(visibility_cli)
+    app.cli.add_command(closure_cli)
+    app.cli.add_command(counters_cli)
+    app.cli.add_command(changes_cli)
     
     # Create tables if they don't exist
     with app.app_context():
@@ -0,0 +1,222 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from .models import db
+
+# Read-through cache for serialized task and project payloads.
+# GET /tasks/<id> and GET /projects/<id> rebuild the whole nested tree on every call, and the
+# task detail and edit views ask for the same payloads again and again. Entries are stored
+# together with the version of the payload (the probe columns of app/conditional.py), and a
+# lookup only hits when the stored version still matches the current one. That version sums the
+# revision counters of the rows the payload is built from, which every committed UPDATE raises
+# (unlike updated_at, which a write that commits late can leave behind), so an entry stops being
+# served once a write to those rows has committed, whichever worker made it. Writes that leave
+# the task and project rows alone are not seen by the probe. On top of that the write paths that
+# call _update_timestamps_cascade or _touch_project invalidate the affected entries when their
+# transaction commits, which frees the memory straight away.
+#
+# The backend is pluggable (PAYLOAD_CACHE_BACKEND): 'memory' is an in-process LRU with a TTL
+# that needs no external service, 'none' disables caching. Other backends can be added with
+# register_cache_backend(); they only need get/set/delete/clear/__len__.
+
+_EXTENSION_KEY = 'payload_cache'
+_PENDING_KEY = 'payload_cache_pending'
+
+_MISSING = object()
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache whose entries also expire ttl seconds after they were stored."""
+
+    def __init__(self, max_entries=1024, ttl=300, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires_at = self.clock() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class NullCacheBackend:
+    """Backend that stores nothing: every lookup is a miss."""
+
+    def get(self, key, default=None):
+        return default
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, keys):
+        pass
+
+    def clear(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+_BACKENDS = {
+    'memory': lambda config: MemoryCacheBackend(
+        max_entries=config.get('PAYLOAD_CACHE_MAX_ENTRIES', 1024),
+        ttl=config.get('PAYLOAD_CACHE_TTL', 300),
+    ),
+    'none': lambda config: NullCacheBackend(),
+}
+
+
+def register_cache_backend(name, factory):
+    """Make factory(app.config) available as PAYLOAD_CACHE_BACKEND = name."""
+    _BACKENDS[name] = factory
+
+
+class PayloadCache:
+    """A cache backend plus the hit/miss counters of the payloads read through it."""
+
+    def __init__(self, backend, backend_name=None):
+        self.backend = backend
+        self.backend_name = backend_name
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.invalidations = 0
+
+    def read_through(self, kind, object_id, version, loader):
+        """
+        The cached payload of (kind, object_id) if it was stored for this version, else
+        loader()'s result, which is stored unless it is empty.
+        """
+        key = (kind, object_id)
+        entry = self.backend.get(key, _MISSING)
+        if entry is not _MISSING:
+            cached_version, payload = entry
+            if cached_version == version:
+                self.hits += 1
+                return payload
+            self.stale += 1
+        self.misses += 1
+
+        payload = loader()
+        if payload:
+            self.backend.set(key, (version, payload))
+        return payload
+
+    def invalidate(self, keys):
+        keys = list(keys)
+        self.backend.delete(keys)
+        self.invalidations += len(keys)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        stats = {
+            'backend': self.backend_name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale': self.stale,
+            'invalidations': self.invalidations,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            'size': len(self.backend),
+        }
+        for name in ('max_entries', 'ttl', 'evictions', 'expirations'):
+            if hasattr(self.backend, name):
+                stats[name] = getattr(self.backend, name)
+        return stats
+
+
+def init_payload_cache(app):
+    """Create the app's payload cache from PAYLOAD_CACHE_BACKEND."""
+    name = app.config.get('PAYLOAD_CACHE_BACKEND', 'memory')
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown PAYLOAD_CACHE_BACKEND: {name}")
+    cache = PayloadCache(_BACKENDS[name](app.config), name)
+    app.extensions[_EXTENSION_KEY] = cache
+    return cache
+
+
+def get_payload_cache():
+    """The current app's payload cache, or None outside an app that set one up."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get(_EXTENSION_KEY)
+
+
+def read_through(kind, object_id, validator, loader):
+    """
+    Cached payload of (kind, object_id) at the version described by validator (see
+    app/conditional.py). Without a validator or a cache, loader() is simply called.
+    """
+    cache = get_payload_cache()
+    if cache is None or validator is None:
+        return loader()
+    return cache.read_through(kind, object_id, validator.version, loader)
+
+
+# ==================== INVALIDATION ====================
+
+def invalidate_task_payloads(task_ids):
+    """Drop the cached payloads of task_ids when the current transaction commits."""
+    _invalidate_on_commit(('task', task_id) for task_id in task_ids if task_id is not None)
+
+
+def invalidate_project_payloads(project_ids):
+    """Drop the cached payloads of project_ids when the current transaction commits."""
+    _invalidate_on_commit(('project', project_id) for project_id in project_ids if project_id is not None)
+
+
+def _invalidate_on_commit(keys):
+    if get_payload_cache() is None:
+        return
+    db.session.info.setdefault(_PENDING_KEY, set()).update(keys)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_after_commit(session):
+    keys = session.info.pop(_PENDING_KEY, None)
+    cache = get_payload_cache()
+    if keys and cache is not None:
+        cache.invalidate(keys)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
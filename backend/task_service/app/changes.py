@@ -0,0 +1,164 @@
+from datetime import datetime, timedelta
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event
+from .models import db, Project, Task, project_collaborators, task_visibility, change_tombstones
+from .hierarchy import descendant_ids_query
+from .visibility import refresh_task_visibility, task_audiences
+from .pagination import encode_cursor, decode_cursor
+from .serializers import serialize_task_summaries
+
+# Delta-sync feed behind GET /changes.
+# Instead of reloading whole boards, a client keeps the cursor returned by its last call and asks
+# for the tasks and projects created, updated or deleted since then. Creates and updates are read
+# from created_at/updated_at (every write path bumps updated_at); deletes cannot be read back from
+# the rows, so deleting a task or project records a tombstone for each user who could see it.
+# A project is listed as updated when its own row changes (details, collaborators, tasks moved in
+# or out); edits of the tasks inside it are listed as task changes, since they do not stamp it.
+#
+# The cursor is a point on the database clock. Rows are stamped when their transaction starts,
+# not when it commits, so the cursor handed out lags the clock by CHANGE_FEED_OVERLAP: a write
+# still in flight during a call is picked up by the next one. Changes from the last few seconds
+# can therefore be reported twice; clients apply them idempotently. A cursor older than the
+# tombstone retention gets reset=true: reload.
+
+# How far behind the database clock the returned cursor is
+CHANGE_FEED_OVERLAP = timedelta(seconds=5)
+
+# Tombstones are kept this long; older cursors must reload
+CHANGE_TOMBSTONE_RETENTION = timedelta(days=30)
+
+_CURSOR_KEY = 'changes'
+
+
+def database_now():
+    """The database clock, naive like the timestamps the database stamps on rows."""
+    now = db.session.execute(db.select(db.func.now())).scalar()
+    return now.replace(tzinfo=None) if now.tzinfo else now
+
+
+def _user_project_ids(user_id):
+    return db.select(Project.id).where(Project.owner_id == user_id).union(
+        db.select(project_collaborators.c.project_id).where(project_collaborators.c.user_id == user_id)
+    )
+
+
+def _visible_task_ids(user_id):
+    """SELECT of every task (at any depth) the user sees on their task list or in their projects."""
+    refresh_task_visibility()
+    roots = db.select(task_visibility.c.root_task_id).where(task_visibility.c.user_id == user_id).union(
+        db.select(Task.id).where(Task.parent_task_id.is_(None), Task.project_id.in_(_user_project_ids(user_id)))
+    )
+    return descendant_ids_query(roots)
+
+
+def _split_created(rows, since):
+    created = [row.id for row in rows if row.created_at is not None and row.created_at > since]
+    created_ids = set(created)
+    return created, [row.id for row in rows if row.id not in created_ids]
+
+
+def get_changes(user_id, since=None, fields=None):
+    """
+    Tasks and projects visible to user_id that were created, updated or deleted since the cursor:
+    {"tasks": {"created", "updated", "deleted"}, "projects": {...}, "cursor", "reset"}.
+    Lists hold ids, or task summaries with the given fields. Without a cursor, or with one older
+    than the tombstone retention, nothing is listed and reset is true: reload, then sync from cursor.
+    Costs four queries (plus one for summaries). Raises ValueError for a malformed cursor.
+    """
+    # Taken first: anything written while the changes are read is reported again next time
+    now = database_now()
+    cursor = encode_cursor(_CURSOR_KEY, False, now - CHANGE_FEED_OVERLAP, 0)
+    empty = {'created': [], 'updated': [], 'deleted': []}
+    changes = {'tasks': dict(empty), 'projects': dict(empty), 'cursor': cursor, 'reset': False}
+
+    if not since:
+        changes['reset'] = True
+        return changes
+    window_start, _ = decode_cursor(since, _CURSOR_KEY, False)
+    if not isinstance(window_start, datetime) or window_start < now - CHANGE_TOMBSTONE_RETENTION:
+        changes['reset'] = True
+        return changes
+
+    task_rows = db.session.execute(
+        db.select(Task.id, Task.created_at)
+        .where(Task.updated_at > window_start, Task.id.in_(_visible_task_ids(user_id)))
+        .order_by(Task.updated_at, Task.id)
+    ).all()
+    project_rows = db.session.execute(
+        db.select(Project.id, Project.created_at)
+        .where(Project.updated_at > window_start, Project.id.in_(_user_project_ids(user_id)))
+        .order_by(Project.updated_at, Project.id)
+    ).all()
+    tombstones = db.session.execute(
+        db.select(change_tombstones.c.entity_type, change_tombstones.c.entity_id)
+        .where(change_tombstones.c.user_id == user_id, change_tombstones.c.deleted_at > window_start)
+        .order_by(change_tombstones.c.deleted_at, change_tombstones.c.id)
+    ).all()
+
+    created, updated = _split_created(task_rows, window_start)
+    if fields:
+        summaries = serialize_task_summaries(created + updated, fields)
+        created, updated = summaries[:len(created)], summaries[len(created):]
+    changes['tasks'] = {
+        'created': created,
+        'updated': updated,
+        'deleted': list(dict.fromkeys(row.entity_id for row in tombstones if row.entity_type == 'task')),
+    }
+    created, updated = _split_created(project_rows, window_start)
+    changes['projects'] = {
+        'created': created,
+        'updated': updated,
+        'deleted': list(dict.fromkeys(row.entity_id for row in tombstones if row.entity_type == 'project')),
+    }
+    return changes
+
+
+# ==================== TOMBSTONES ====================
+
+def _project_audience(project):
+    return {project.owner_id} | set(project.collaborator_ids())
+
+
+@event.listens_for(db.session, 'before_flush')
+def _record_tombstones(session, flush_context, instances):
+    # Rows and memberships are still in place before the flush deletes them
+    deleted = [obj for obj in session.deleted if isinstance(obj, (Task, Project)) and obj.id is not None]
+    if not deleted:
+        return
+
+    rows = []
+    with session.no_autoflush:
+        audiences = task_audiences([obj.id for obj in deleted if isinstance(obj, Task)], session)
+        for instance in deleted:
+            if isinstance(instance, Task):
+                entity_type, users = 'task', audiences.get(instance.id, ())
+            else:
+                entity_type, users = 'project', _project_audience(instance)
+            rows.extend(
+                {'user_id': user_id, 'entity_type': entity_type, 'entity_id': instance.id}
+                for user_id in users if user_id is not None
+            )
+        if rows:
+            session.execute(change_tombstones.insert(), rows)
+
+
+def prune_tombstones(session=None):
+    """Delete tombstones older than the retention period. Returns the number of rows. Does NOT commit."""
+    session = session or db.session
+    horizon = database_now() - CHANGE_TOMBSTONE_RETENTION
+    result = session.execute(change_tombstones.delete().where(change_tombstones.c.deleted_at < horizon))
+    return result.rowcount
+
+
+# ==================== CLI ====================
+
+changes_cli = AppGroup('changes', help='Maintain the change feed tombstones.')
+
+
+@changes_cli.command('prune')
+def prune_command():
+    """Delete tombstones older than the retention period."""
+    pruned = prune_tombstones()
+    db.session.commit()
+    click.echo(f"change tombstones pruned: {pruned} rows")
@@ -0,0 +1,123 @@
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event
+from sqlalchemy.orm import attributes
+from .models import db, Task, task_closure
+from .hierarchy import closure_enabled, recursive_descendant_ids_query, closure_rows_query
+
+# Maintenance of the optional task_closure table (see TASK_CLOSURE_ENABLED).
+# The table is updated at flush time, so subtree and ancestor lookups made later in the same
+# transaction already see new, moved and deleted tasks. Tasks created or re-parented through
+# the ORM (create_task, create_task_in_project, recurrence copies...) and ORM deletes are
+# picked up automatically; moving a task between projects does not touch the hierarchy.
+# Code that inserts tasks or changes parent_task_id with Core statements must call
+# refresh_task_closure() for those ids.
+
+_CLOSURE_COLUMNS = ['ancestor_id', 'descendant_id', 'depth']
+
+
+def refresh_task_closure(task_ids, connection=None):
+    """Rewrite the closure rows of the subtrees rooted at task_ids (new or re-parented tasks). Two statements."""
+    connection = connection or db.session.connection()
+    subtree = recursive_descendant_ids_query(list(task_ids))
+    connection.execute(
+        task_closure.delete().where(task_closure.c.descendant_id.in_(subtree))
+    )
+    connection.execute(
+        task_closure.insert().from_select(_CLOSURE_COLUMNS, closure_rows_query(subtree))
+    )
+
+
+def remove_from_task_closure(task_ids, connection=None):
+    """Drop the closure rows of deleted tasks and of everything that was under them."""
+    connection = connection or db.session.connection()
+    orphaned = db.select(task_closure.c.descendant_id).where(task_closure.c.ancestor_id.in_(list(task_ids)))
+    connection.execute(
+        task_closure.delete().where(task_closure.c.descendant_id.in_(orphaned))
+    )
+
+
+def rebuild_task_closure(session=None):
+    """Recompute the whole closure table from parent_task_id. Returns the number of rows. Does NOT commit."""
+    session = session or db.session
+    session.execute(task_closure.delete())
+    session.execute(task_closure.insert().from_select(_CLOSURE_COLUMNS, closure_rows_query()))
+    return session.execute(
+        db.select(db.func.count()).select_from(task_closure)
+    ).scalar()
+
+
+def verify_task_closure(session=None):
+    """
+    Compare the closure table with parent_task_id.
+    Returns (missing, extra): sets of (ancestor_id, descendant_id, depth) rows absent from / stale in the table.
+    """
+    session = session or db.session
+    expected = closure_rows_query().subquery('expected')
+    actual = db.select(task_closure.c.ancestor_id, task_closure.c.descendant_id, task_closure.c.depth)
+    expected_rows = db.select(expected.c.ancestor_id, expected.c.descendant_id, expected.c.depth)
+
+    missing = {tuple(row) for row in session.execute(expected_rows.except_(actual))}
+    extra = {tuple(row) for row in session.execute(actual.except_(expected_rows))}
+    return missing, extra
+
+
+@event.listens_for(db.session, 'after_flush')
+def _maintain_closure(session, flush_context):
+    if not closure_enabled():
+        return
+
+    moved, deleted = set(), set()
+    for task in session.new:
+        if isinstance(task, Task):
+            moved.add(task.id)
+    for task in session.deleted:
+        if isinstance(task, Task):
+            deleted.add(task.id)
+    for task in session.dirty:
+        if not isinstance(task, Task):
+            continue
+        parent_history = attributes.get_history(task, 'parent_task_id')
+        parent_task_history = attributes.get_history(
+            task, 'parent_task', passive=attributes.PASSIVE_NO_INITIALIZE
+        )
+        if parent_history.has_changes() or parent_task_history.has_changes():
+            moved.add(task.id)
+
+    connection = session.connection()
+    if deleted:
+        remove_from_task_closure(deleted, connection)
+    if moved:
+        refresh_task_closure(moved, connection)
+
+
+# ==================== CLI ====================
+
+closure_cli = AppGroup('closure', help='Maintain the task_closure hierarchy table.')
+
+
+@closure_cli.command('rebuild')
+def rebuild_command():
+    """Recompute task_closure from parent_task_id."""
+    count = rebuild_task_closure()
+    db.session.commit()
+    click.echo(f"task_closure rebuilt: {count} rows")
+
+
+@closure_cli.command('verify')
+@click.option('--fix', is_flag=True, help='Rebuild the table if drift is found.')
+def verify_command(fix):
+    """Report rows missing from or stale in task_closure."""
+    missing, extra = verify_task_closure()
+    click.echo(f"task_closure: {len(missing)} missing, {len(extra)} stale rows")
+    for ancestor_id, descendant_id, depth in sorted(missing):
+        click.echo(f"  missing: task {ancestor_id} -> task {descendant_id} (depth {depth})")
+    for ancestor_id, descendant_id, depth in sorted(extra):
+        click.echo(f"  stale:   task {ancestor_id} -> task {descendant_id} (depth {depth})")
+
+    if missing or extra:
+        if not fix:
+            raise SystemExit(1)
+        count = rebuild_task_closure()
+        db.session.commit()
+        click.echo(f"task_closure rebuilt: {count} rows")
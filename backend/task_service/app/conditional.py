@@ -0,0 +1,177 @@
+import hashlib
+from flask import current_app, request, Response
+from .models import db, Project, Task, project_collaborators, task_collaborators
+from .hierarchy import descendant_ids_query
+
+# Conditional GET for task and project payloads.
+# Every write updates the rows it touches (_update_timestamps_cascade, _touch_project, _touch_tasks,
+# the counter updates of app/counters.py), so a payload's version can be read with one aggregate
+# SELECT over the rows it is built from instead of serializing it. updated_at alone is not enough:
+# it is the start time of the writing transaction, so a write that started first but commits last
+# can land below the newest timestamp already served. Every UPDATE also increments the row's
+# revision column, so the probe adds up revisions instead: that sum only grows. It also counts the
+# rows and collaborator links and sums the row ids, which catches inserts, deletes and
+# collaborator-only changes. The version is sent as a weak ETag (plus Last-Modified, the newest
+# updated_at), and a matching If-None-Match is answered with 304 Not Modified before anything is
+# serialized.
+#
+# Conditional writes (PUT /tasks/<id>, PUT /projects/<id>) use the row's version column instead:
+# the client sends the version it last read as If-Match: "<version>" (or as a "version" field
+# of the body). The service compares and bumps it in one UPDATE, the first write of the update,
+# so a stale version gets 409 Conflict before anything else is written. That UPDATE takes the
+# row lock, which is held until the commit. Writes without a version are unconditional: they
+# still bump it, and the last one wins.
+
+
+class Validator:
+    """Version of one representation: a weak ETag and the newest updated_at it covers."""
+
+    def __init__(self, parts, last_modified):
+        # The same resource is served in several shapes (?view=, ?fields=, NDJSON...)
+        representation = (request.full_path, request.accept_mimetypes.to_header())
+        digest = hashlib.sha1(repr((representation, parts)).encode()).hexdigest()
+        self.etag = digest[:20]
+        # Shape-independent version, also used to validate cached payloads (app/cache.py)
+        self.version = parts
+        self.last_modified = last_modified
+
+    def not_modified(self):
+        """A 304 response if the client already holds this version, else None."""
+        if not request.if_none_match.contains_weak(self.etag):
+            return None
+        return self.apply(Response(status=304))
+
+    def apply(self, response):
+        """Attach the validators to an outgoing 200 response."""
+        response.set_etag(self.etag, weak=True)
+        if self.last_modified:
+            response.last_modified = self.last_modified
+        return response
+
+
+def not_modified(validator):
+    """304 response when the client's If-None-Match matches validator (which may be None), else None."""
+    return validator.not_modified() if validator else None
+
+
+def with_validator(response, validator):
+    """Attach validator's ETag and Last-Modified to response, if there is one."""
+    return validator.apply(response) if validator else response
+
+
+def _enabled():
+    # Apps that only register the blueprint (no database) serve plain responses
+    return 'sqlalchemy' in current_app.extensions
+
+
+def _subtree_version_columns(root_ids):
+    """
+    Aggregate columns over the subtrees of root_ids: newest updated_at, task count, collaborator
+    link count, sum of the task revisions and sum of the task ids.
+    """
+    subtree = descendant_ids_query(root_ids)
+    collaborator_links = db.select(db.func.count())\
+        .select_from(task_collaborators)\
+        .where(task_collaborators.c.task_id.in_(subtree))\
+        .scalar_subquery()
+    tasks = db.select(
+            db.func.max(Task.updated_at), db.func.count(Task.id), collaborator_links,
+            db.func.sum(Task.revision), db.func.sum(Task.id)
+        )\
+        .where(Task.id.in_(subtree))\
+        .subquery()
+    return list(tasks.c)
+
+
+def _project_collaborator_count(project_ids):
+    return db.select(db.func.count())\
+        .select_from(project_collaborators)\
+        .where(project_collaborators.c.project_id.in_(project_ids))\
+        .scalar_subquery()
+
+
+def _newest(*timestamps):
+    timestamps = [value for value in timestamps if value is not None]
+    return max(timestamps) if timestamps else None
+
+
+def task_validator(task_id):
+    """Validator of GET /tasks/<id> (the task with all its subtasks), or None if the task does not exist."""
+    if not _enabled():
+        return None
+    row = db.session.execute(db.select(*_subtree_version_columns([task_id]))).one()
+    updated_at, task_count = row[:2]
+    if not task_count:
+        return None
+    return Validator(tuple(row), updated_at)
+
+
+def project_validator(project_id):
+    """Validator of a project and the task trees in it, or None if the project does not exist."""
+    if not _enabled():
+        return None
+    project_updated_at = db.select(Project.updated_at).where(Project.id == project_id).scalar_subquery()
+    project_revision = db.select(Project.revision).where(Project.id == project_id).scalar_subquery()
+    project_task_ids = db.select(Task.id).where(Task.project_id == project_id)
+    row = db.session.execute(
+        db.select(
+            project_updated_at,
+            _project_collaborator_count([project_id]),
+            *_subtree_version_columns(project_task_ids),
+            project_revision
+        )
+    ).one()
+    if row[0] is None:
+        return None
+    return Validator(tuple(row), _newest(row[0], row[2]))
+
+
+def user_projects_validator(user_id):
+    """Validator of GET /projects/user/<id>: every project the user owns or collaborates on, with its tasks."""
+    if not _enabled():
+        return None
+    project_ids = db.select(Project.id).where(Project.owner_id == user_id).union(
+        db.select(project_collaborators.c.project_id).where(project_collaborators.c.user_id == user_id)
+    )
+    projects_updated_at = db.select(db.func.max(Project.updated_at)).where(Project.id.in_(project_ids)).scalar_subquery()
+    project_count = db.select(db.func.count(Project.id)).where(Project.id.in_(project_ids)).scalar_subquery()
+    project_revisions = db.select(db.func.sum(Project.revision) + db.func.sum(Project.id))\
+        .where(Project.id.in_(project_ids))\
+        .scalar_subquery()
+    project_task_ids = db.select(Task.id).where(Task.project_id.in_(project_ids))
+    row = db.session.execute(
+        db.select(
+            projects_updated_at,
+            project_count,
+            _project_collaborator_count(project_ids),
+            *_subtree_version_columns(project_task_ids),
+            project_revisions
+        )
+    ).one()
+    return Validator(tuple(row), _newest(row[0], row[3]))
+
+
+def expected_version(body_version=None):
+    """
+    Version a conditional write expects the row to have: the If-Match entity tag or the body's
+    version field. None for an unconditional write (neither sent, or If-Match: *).
+    Raises ValueError for a malformed precondition.
+    """
+    versions = set()
+    if body_version is not None:
+        versions.add(body_version)
+    if request.if_match and not request.if_match.star_tag:
+        tags = request.if_match.as_set()
+        if len(tags) != 1:
+            raise ValueError("If-Match must carry exactly one strong entity tag: the version")
+        versions.update(tags)
+
+    if not versions:
+        return None
+    try:
+        parsed = {int(version) for version in versions}
+    except (TypeError, ValueError):
+        raise ValueError("version must be an integer")
+    if len(parsed) > 1:
+        raise ValueError("If-Match and the version field disagree")
+    return parsed.pop()
@@ -0,0 +1,138 @@
+from collections import defaultdict
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, inspect
+from .models import db, Task, Comment, Attachment
+
+# Denormalized child counters on tasks: comment_count (comments and replies) and attachment_count.
+# The counters are adjusted at flush time, in the same transaction as the rows they count,
+# with relative UPDATE ... SET n = n + delta statements so concurrent writers do not lose
+# increments. Every ORM insert or delete of a comment or attachment goes through here:
+# add_comment, delete_comment, add_attachment, delete_attachment_url, delete_task and its
+# cascades... Use `flask counters repair` to recompute them after manual data fixes.
+# The counter UPDATE only touches the task the comment or attachment belongs to.
+# subtask_count is not stored: it is a subquery on Task (see app/models.py), because a stored
+# count would make every subtask insert or delete update the parent row, and sibling writers
+# would queue on it.
+
+COUNTER_COLUMNS = {
+    'comment_count': (Comment, 'task_id'),
+    'attachment_count': (Attachment, 'task_id'),
+}
+
+_PENDING_KEY = 'task_counters_pending'
+
+
+def _counter_for(instance):
+    for column, (model, foreign_key) in COUNTER_COLUMNS.items():
+        if isinstance(instance, model):
+            return column, foreign_key
+    return None, None
+
+
+def adjust_task_counters(deltas, connection=None):
+    """
+    Apply {(task_id, column): delta} to the counter columns. One UPDATE per distinct
+    (column, delta) pair, executed as an executemany over the task ids.
+    """
+    connection = connection or db.session.connection()
+    grouped = defaultdict(list)
+    for (task_id, column), delta in deltas.items():
+        if task_id is not None and delta:
+            grouped[(column, delta)].append({'counter_task_id': task_id})
+
+    for (column, delta), params in grouped.items():
+        counter = Task.__table__.c[column]
+        connection.execute(
+            Task.__table__.update()
+            .where(Task.__table__.c.id == db.bindparam('counter_task_id'))
+            .values({column: counter + delta}),
+            params
+        )
+
+
+def recount_task_counters(task_ids=None, session=None):
+    """
+    Recompute the counters from the child tables, for task_ids or for every task.
+    One UPDATE with correlated counts. Returns the number of rows touched. Does NOT commit.
+    """
+    session = session or db.session
+    values = {}
+    for column, (model, foreign_key) in COUNTER_COLUMNS.items():
+        child = model.__table__
+        values[column] = db.select(db.func.count())\
+            .select_from(child)\
+            .where(child.c[foreign_key] == Task.__table__.c.id)\
+            .scalar_subquery()
+
+    statement = Task.__table__.update().values(values)
+    if task_ids is not None:
+        statement = statement.where(Task.__table__.c.id.in_(list(task_ids)))
+    result = session.execute(statement)
+    session.expire_all()
+    return result.rowcount
+
+
+def verify_task_counters(session=None):
+    """Rows (task_id, column, stored, actual) whose counter disagrees with the child tables."""
+    session = session or db.session
+    drift = []
+    for column, (model, foreign_key) in COUNTER_COLUMNS.items():
+        child = model.__table__
+        actual = db.select(db.func.count())\
+            .select_from(child)\
+            .where(child.c[foreign_key] == Task.__table__.c.id)\
+            .scalar_subquery()
+        stored = Task.__table__.c[column]
+        result = session.execute(
+            db.select(Task.__table__.c.id, stored, actual).where(stored != actual)
+        )
+        drift.extend((task_id, column, stored_value, actual_value) for task_id, stored_value, actual_value in result)
+    return sorted(drift)
+
+
+# ==================== CHANGE TRACKING ====================
+
+@event.listens_for(db.session, 'after_flush')
+def _count_flushed_children(session, flush_context):
+    deltas = defaultdict(int)
+
+    for instance, sign in [(obj, 1) for obj in session.new] + [(obj, -1) for obj in session.deleted]:
+        column, foreign_key = _counter_for(instance)
+        if column:
+            deltas[(getattr(instance, foreign_key), column)] += sign
+
+    deltas = {key: delta for key, delta in deltas.items() if key[0] is not None and delta}
+    if not deltas:
+        return
+
+    adjust_task_counters(deltas, session.connection())
+    session.info.setdefault(_PENDING_KEY, set()).update(task_id for task_id, _ in deltas)
+
+
+@event.listens_for(db.session, 'after_flush_postexec')
+def _expire_loaded_counters(session, flush_context):
+    # Loaded Task objects still hold the pre-UPDATE values
+    task_ids = session.info.pop(_PENDING_KEY, None)
+    if not task_ids:
+        return
+    for task_id in task_ids:
+        task = session.identity_map.get(inspect(Task).identity_key_from_primary_key((task_id,)))
+        if task is not None:
+            session.expire(task, list(COUNTER_COLUMNS))
+
+
+# ==================== CLI ====================
+
+counters_cli = AppGroup('counters', help='Maintain the denormalized task counters.')
+
+
+@counters_cli.command('repair')
+def repair_command():
+    """Recompute comment and attachment counts for every task."""
+    drift = verify_task_counters()
+    for task_id, column, stored, actual in drift:
+        click.echo(f"  task {task_id}: {column} {stored} -> {actual}")
+    recount_task_counters()
+    db.session.commit()
+    click.echo(f"task counters repaired: {len(drift)} values fixed")
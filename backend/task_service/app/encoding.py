@@ -0,0 +1,121 @@
+import gzip
+import zlib
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # stdlib json is used instead
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is then simply not offered
+    msgpack = None
+
+# Response encoding for the task and user services.
+# - JSON is produced by orjson through a Flask JSON provider, so jsonify() everywhere gets the
+#   faster encoder with the same output (sorted keys, compact separators, HTTP dates).
+# - List endpoints negotiate the body format from Accept: JSON (default), MessagePack, or
+#   columnar JSON, which sends the keys of a list of objects once instead of once per row.
+# - Bodies of at least COMPRESS_MIN_SIZE bytes are gzip- or deflate-compressed when the client
+#   sends a matching Accept-Encoding. Streamed responses (NDJSON, SSE) are left as they are.
+#
+# task_service/app/encoding.py and user_service/app/encoding.py are the same file: every service
+# is its own Docker build context, so there is no shared package to import it from. Change both.
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+COLUMNAR_MIMETYPE = 'application/vnd.columnar+json'
+
+COMPRESSIBLE_MIMETYPES = {'application/json', COLUMNAR_MIMETYPE, MSGPACK_MIMETYPE, 'text/plain', 'text/html', 'text/csv'}
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with orjson doing the encoding (falls back to the stdlib without it)."""
+
+    def _orjson_options(self, sort_keys):
+        # Dates go through DefaultJSONProvider.default so they keep Flask's HTTP-date format
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs.get('indent') or set(kwargs) - {'sort_keys', 'default'}:
+            return super().dumps(obj, **kwargs)
+        option = self._orjson_options(kwargs.get('sort_keys', self.sort_keys))
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode()
+
+    def response(self, *args, **kwargs):
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        if orjson is None or pretty:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._orjson_options(self.sort_keys))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+
+def columnar(rows):
+    """{"columns": [...], "rows": [[...], ...]} for a list of objects (nested values are kept as they are)."""
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    return {'columns': columns, 'rows': [[row.get(column) for column in columns] for row in rows]}
+
+
+def _list_mimetype():
+    offers = ['application/json', COLUMNAR_MIMETYPE]
+    if msgpack is not None:
+        offers.append(MSGPACK_MIMETYPE)
+    # JSON wins ties and */*
+    return request.accept_mimetypes.best_match(offers) or 'application/json'
+
+
+def list_response(payload, rows_key=None):
+    """
+    Response for a list endpoint in the encoding the client asked for.
+    payload is the list itself, or an object holding it under rows_key (e.g. a page with a cursor);
+    only that list is made columnar.
+    """
+    mimetype = _list_mimetype()
+    if mimetype == COLUMNAR_MIMETYPE:
+        if rows_key is None:
+            payload = columnar(payload)
+        else:
+            payload = dict(payload, **{rows_key: columnar(payload[rows_key])})
+
+    if mimetype == MSGPACK_MIMETYPE:
+        response = current_app.response_class(msgpack.packb(payload, default=str), mimetype=MSGPACK_MIMETYPE)
+    else:
+        response = current_app.json.response(payload)
+        response.mimetype = mimetype
+    response.vary.add('Accept')
+    return response
+
+
+def compress_response(response):
+    """after_request hook: gzip/deflate bodies of at least COMPRESS_MIN_SIZE bytes when the client accepts it."""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    data = response.get_data()
+    if len(data) < current_app.config.get('COMPRESS_MIN_SIZE', 1024):
+        return response
+    response.vary.add('Accept-Encoding')
+
+    # No Accept-Encoding header means identity, not "anything"
+    if not request.accept_encodings:
+        return response
+    encoding = request.accept_encodings.best_match(['gzip', 'deflate'])
+    if encoding is None:
+        return response
+
+    level = current_app.config.get('COMPRESS_LEVEL', 6)
+    if encoding == 'gzip':
+        compressed = gzip.compress(data, compresslevel=level)
+    else:
+        compressed = zlib.compress(data, level)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
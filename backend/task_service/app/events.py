@@ -0,0 +1,361 @@
+import json
+import queue
+import threading
+import time
+import uuid
+import pika
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import attributes
+from .models import db, Task, Comment, Attachment
+from .visibility import refresh_task_visibility, task_audiences
+from .rabbitmq_publisher import ExchangePublisher
+
+# Live task-change events, pushed to browsers over server-sent events (GET /tasks/events).
+# Events are collected from the ORM at flush time (tasks created, updated, deleted or changing
+# status, comments and attachments added or removed) and published once the transaction commits,
+# so they come from the same commits as publish_status_update and never announce a rolled-back
+# write. Code that inserts tasks with Core statements must call mark_tasks_created() for the new
+# ids. Each event carries the users who can see the task (see task_audiences), and every
+# subscription only receives the events addressed to its user.
+#
+# Nothing is collected while no stream is open anywhere, so writes pay for the audience queries
+# only when someone is listening.
+#
+# Brokers (TASK_EVENTS_BROKER):
+# - 'rabbitmq': events go to the task_events fanout exchange through one long-lived publisher
+#   thread per process (commits only enqueue them); each worker process binds its own exclusive
+#   queue and hands what it receives to its local subscribers, so an event reaches clients
+#   connected to any worker. Processes holding streams announce themselves on the same exchange
+#   every PRESENCE_SECONDS, which is how the others know whether anyone is subscribed.
+# - 'local': in-process fan-out only. Used by the tests and single-process setups.
+#
+# An SSE connection waits on its in-memory queue and holds neither a database connection nor the
+# app context. In production the streams are served by the separate task_events process (gevent
+# workers, see docker-compose.yml); SSE_MAX_CONNECTIONS caps the streams one worker will hold, so
+# they can never take every thread of a worker that also serves the API.
+
+TASK_EVENTS_EXCHANGE = 'task_events'
+
+_EXTENSION_KEY = 'task_events'
+_PENDING_KEY = 'task_events_pending'
+_DELETED_KEY = 'task_events_deleted'
+_READY_KEY = 'task_events_ready'
+
+# How often a process with open streams announces itself, and how long an announcement lasts
+PRESENCE_SECONDS = 10
+PRESENCE_TTL = 3 * PRESENCE_SECONDS
+
+
+class EventSubscription:
+    """Events addressed to one user, buffered for one SSE connection."""
+
+    def __init__(self, broker, user_id, queue_size):
+        self.broker = broker
+        self.user_id = user_id
+        self.overflowed = False
+        self._queue = queue.Queue(maxsize=queue_size)
+
+    def push(self, task_event):
+        try:
+            self._queue.put_nowait(task_event)
+        except queue.Full:
+            # The client fell behind: it is told to resync instead of silently missing events
+            self.overflowed = True
+
+    def get(self, timeout=None):
+        """Next event, or None if none arrived within timeout seconds."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalEventBroker:
+    """In-process broker: publish() hands events straight to this process's subscriptions."""
+
+    def __init__(self, queue_size=100, max_connections=None):
+        self.queue_size = queue_size
+        self.max_connections = max_connections
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        """New subscription for user_id, or None if this process already holds max_connections."""
+        subscription = EventSubscription(self, user_id, self.queue_size)
+        with self._lock:
+            if self.max_connections is not None and len(self._subscriptions) >= self.max_connections:
+                return None
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def has_subscribers(self):
+        return bool(self._subscriptions)
+
+    def publish(self, events):
+        self.dispatch(events)
+
+    def dispatch(self, events):
+        """Deliver events to the local subscriptions of the users they are addressed to."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for task_event in events:
+            audience = set(task_event.get('user_ids', ()))
+            payload = {key: value for key, value in task_event.items() if key != 'user_ids'}
+            for subscription in subscriptions:
+                if subscription.user_id in audience:
+                    subscription.push(payload)
+
+
+class RabbitMQEventBroker(LocalEventBroker):
+    """Fans events out to every worker through a RabbitMQ fanout exchange."""
+
+    def __init__(self, rabbitmq_url, queue_size=100, max_connections=None):
+        super().__init__(queue_size, max_connections)
+        self.rabbitmq_url = rabbitmq_url
+        self._consumer = None
+        self._process_id = uuid.uuid4().hex
+        # Until when (time.monotonic()) another process is known to hold streams
+        self._remote_until = 0.0
+        self._publisher = ExchangePublisher(rabbitmq_url, TASK_EVENTS_EXCHANGE,
+                                            tick_seconds=PRESENCE_SECONDS, on_tick=self._announce)
+
+    def publish(self, events):
+        self._publisher.publish({'events': events})
+
+    def subscribe(self, user_id):
+        self._start_consumer()
+        subscription = super().subscribe(user_id)
+        if subscription is not None:
+            self._announce()
+        return subscription
+
+    def has_subscribers(self):
+        self._start_consumer()
+        return bool(self._subscriptions) or time.monotonic() < self._remote_until
+
+    def _announce(self):
+        if self._subscriptions:
+            self._publisher.publish({'presence': self._process_id})
+
+    def _start_consumer(self):
+        with self._lock:
+            if self._consumer is None:
+                self._consumer = threading.Thread(target=self._consume, name='task-events-consumer', daemon=True)
+                self._consumer.start()
+
+    def _consume(self):
+        def on_message(channel, method, properties, body):
+            try:
+                message = json.loads(body)
+                if 'presence' in message:
+                    if message['presence'] != self._process_id:
+                        self._remote_until = time.monotonic() + PRESENCE_TTL
+                elif 'presence_query' in message:
+                    self._announce()
+                else:
+                    self.dispatch(message.get('events', []))
+            except Exception as e:
+                print(f"Error dispatching task events: {e}")
+
+        while True:
+            try:
+                connection = pika.BlockingConnection(pika.URLParameters(self.rabbitmq_url))
+                channel = connection.channel()
+                channel.exchange_declare(exchange=TASK_EVENTS_EXCHANGE, exchange_type='fanout')
+                # One exclusive queue per worker, dropped with the connection
+                declared = channel.queue_declare(queue='', exclusive=True)
+                channel.queue_bind(exchange=TASK_EVENTS_EXCHANGE, queue=declared.method.queue)
+                channel.basic_consume(queue=declared.method.queue, on_message_callback=on_message, auto_ack=True)
+                # Processes holding streams answer at once, rather than at their next announcement
+                self._publisher.publish({'presence_query': self._process_id})
+                channel.start_consuming()
+            except Exception as e:
+                print(f"❌ Task events consumer disconnected: {e}")
+                time.sleep(5)
+
+
+_BROKERS = {
+    'local': lambda config: LocalEventBroker(config.get('SSE_QUEUE_SIZE', 100), config.get('SSE_MAX_CONNECTIONS')),
+    'rabbitmq': lambda config: RabbitMQEventBroker(config.get('RABBITMQ_URL'), config.get('SSE_QUEUE_SIZE', 100),
+                                                   config.get('SSE_MAX_CONNECTIONS')),
+}
+
+
+def init_event_broker(app):
+    """Create the app's task events broker from TASK_EVENTS_BROKER."""
+    name = app.config.get('TASK_EVENTS_BROKER', 'rabbitmq')
+    if name not in _BROKERS:
+        raise ValueError(f"Unknown TASK_EVENTS_BROKER: {name}")
+    broker = _BROKERS[name](app.config)
+    app.extensions[_EXTENSION_KEY] = broker
+    return broker
+
+
+def get_event_broker():
+    """The current app's task events broker, or None outside an app that set one up."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get(_EXTENSION_KEY)
+
+
+def _listening():
+    """The broker, if some stream is open to receive this process's events; None otherwise."""
+    broker = get_event_broker()
+    return broker if broker is not None and broker.has_subscribers() else None
+
+
+# ==================== SSE ====================
+
+def _format_sse(event_name, data):
+    return f"event: {event_name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def event_stream(subscription, heartbeat, max_seconds):
+    """
+    SSE body for a subscription: the events as they arrive, a comment line every heartbeat
+    seconds to keep proxies from closing the connection, and a 'resync' event if the client fell
+    behind. Ends after max_seconds so threads are recycled; EventSource reconnects by itself.
+    """
+    try:
+        yield 'retry: 3000\n\n'
+        deadline = time.monotonic() + max_seconds
+        while time.monotonic() < deadline:
+            task_event = subscription.get(timeout=heartbeat)
+            if subscription.overflowed:
+                yield _format_sse('resync', {})
+                return
+            if task_event is None:
+                yield ': keep-alive\n\n'
+                continue
+            yield _format_sse(task_event['event'], task_event)
+    finally:
+        subscription.close()
+
+
+# ==================== CHANGE TRACKING ====================
+
+def _pending(session):
+    return session.info.setdefault(_PENDING_KEY, {})
+
+
+def _mark(session, task_id, kind, **details):
+    if task_id is None:
+        return
+    pending = _pending(session)
+    entry = pending.setdefault(task_id, {'event': kind})
+    # A task created in this transaction stays 'created' whatever happens to it next
+    if entry['event'] != 'task.created':
+        entry['event'] = kind
+    entry.update(details)
+
+
+def mark_tasks_created(task_ids, session=None):
+    """Announce tasks inserted with Core statements (the ORM hooks below only see ORM inserts)."""
+    session = session or db.session
+    if _listening() is None:
+        return
+    for task_id in task_ids:
+        _mark(session, task_id, 'task.created')
+
+
+@event.listens_for(db.session, 'before_flush')
+def _collect_deleted_tasks(session, flush_context, instances):
+    if _listening() is None:
+        return
+    deleted = [obj for obj in session.deleted if isinstance(obj, Task) and obj.id is not None]
+    if not deleted:
+        return
+    # Who could see them has to be read before the rows are gone
+    with session.no_autoflush:
+        audiences = task_audiences([task.id for task in deleted], session)
+    for task in deleted:
+        session.info.setdefault(_DELETED_KEY, {})[task.id] = {
+            'event': 'task.deleted',
+            'task_id': task.id,
+            'project_id': task.project_id,
+            'parent_task_id': task.parent_task_id,
+            'user_ids': sorted(audiences.get(task.id, ())),
+        }
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_changed_tasks(session, flush_context):
+    if _listening() is None:
+        return
+    for obj in session.new:
+        if isinstance(obj, Task):
+            _mark(session, obj.id, 'task.created')
+        elif isinstance(obj, (Comment, Attachment)):
+            _mark(session, obj.task_id, 'task.updated')
+    for obj in session.deleted:
+        if isinstance(obj, (Comment, Attachment)):
+            _mark(session, obj.task_id, 'task.updated')
+    for obj in session.dirty:
+        if isinstance(obj, Task) and session.is_modified(obj, include_collections=False):
+            history = attributes.get_history(obj, 'status')
+            if history.has_changes() and history.deleted and history.added:
+                _mark(session, obj.id, 'task.status_changed',
+                      old_status=getattr(history.deleted[0], 'value', history.deleted[0]),
+                      new_status=getattr(history.added[0], 'value', history.added[0]))
+            else:
+                _mark(session, obj.id, 'task.updated')
+        elif isinstance(obj, (Comment, Attachment)) and session.is_modified(obj, include_collections=False):
+            _mark(session, obj.task_id, 'task.updated')
+
+
+@event.listens_for(db.session, 'before_commit')
+def _address_events(session):
+    if not session.info.get(_PENDING_KEY) and not session.info.get(_DELETED_KEY):
+        return
+    if _listening() is None:
+        # The last stream closed since these were collected
+        _discard_events(session)
+        return
+    # Visibility of new and moved tasks must be current before the audiences are read
+    refresh_task_visibility(session)
+    pending = session.info.pop(_PENDING_KEY, {})
+    deleted = session.info.pop(_DELETED_KEY, {})
+    for task_id in deleted:
+        pending.pop(task_id, None)
+
+    ready = list(deleted.values())
+    if pending:
+        audiences = task_audiences(pending, session)
+        rows = session.execute(
+            db.select(Task.id, Task.project_id, Task.parent_task_id).where(Task.id.in_(list(pending)))
+        ).all()
+        for row in rows:
+            ready.append(dict(
+                pending[row.id],
+                task_id=row.id,
+                project_id=row.project_id,
+                parent_task_id=row.parent_task_id,
+                user_ids=sorted(audiences.get(row.id, ())),
+            ))
+    session.info.setdefault(_READY_KEY, []).extend(ready)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_events(session):
+    events = session.info.pop(_READY_KEY, None)
+    broker = get_event_broker()
+    if not events or broker is None:
+        return
+    try:
+        broker.publish(events)
+    except Exception as e:
+        print(f"⚠️ Failed to publish task events: {e}")
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_events(session):
+    for key in (_PENDING_KEY, _DELETED_KEY, _READY_KEY):
+        session.info.pop(key, None)
@@ -0,0 +1,196 @@
+from flask import current_app
+from .models import db, Task, task_closure
+
+# Set-based operations on the task hierarchy.
+# Subtasks hang off a self-referencing parent_task_id. Walking that chain from Python costs one
+# query per node (down) or per level (up); the helpers here answer the same questions with a
+# single WITH RECURSIVE statement, and cascade changes with one UPDATE ... WHERE id IN (subtree).
+# Recursive CTEs are supported by both PostgreSQL and SQLite.
+# When TASK_CLOSURE_ENABLED is set, subtree and ancestor lookups read the task_closure table
+# (maintained by app/closure.py) instead, which is a plain indexed lookup.
+
+
+def closure_enabled():
+    return bool(current_app.config.get('TASK_CLOSURE_ENABLED'))
+
+
+def recursive_descendant_ids_query(root_ids):
+    """
+    SELECT of every task id in the subtrees rooted at root_ids (roots included), walking
+    parent_task_id with a recursive CTE. root_ids may be a list of ids or a SELECT of ids.
+    """
+    tree = db.select(Task.id).where(Task.id.in_(root_ids)).cte('task_tree', recursive=True)
+    # UNION (not UNION ALL) so overlapping roots are only visited once
+    tree = tree.union(
+        db.select(Task.id).join(tree, Task.parent_task_id == tree.c.id)
+    )
+    return db.select(tree.c.id)
+
+
+def descendant_ids_query(root_ids):
+    """
+    SELECT of every task id in the subtrees rooted at root_ids (roots included).
+    root_ids may be a list of ids or a SELECT of ids.
+    """
+    if closure_enabled():
+        return db.select(task_closure.c.descendant_id).where(task_closure.c.ancestor_id.in_(root_ids))
+    return recursive_descendant_ids_query(root_ids)
+
+
+def descendant_rows_query(root_ids):
+    """
+    SELECT of (root_id, id) pairing each of root_ids with itself and every task below it.
+    Batch form of descendant_ids_query.
+    """
+    if closure_enabled():
+        return db.select(task_closure.c.ancestor_id.label('root_id'), task_closure.c.descendant_id.label('id'))\
+            .where(task_closure.c.ancestor_id.in_(root_ids))
+
+    tree = db.select(Task.id.label('root_id'), Task.id)\
+        .where(Task.id.in_(root_ids))\
+        .cte('task_descendant_rows', recursive=True)
+    tree = tree.union_all(
+        db.select(tree.c.root_id, Task.id).join(tree, Task.parent_task_id == tree.c.id)
+    )
+    return db.select(tree.c.root_id, tree.c.id)
+
+
+def recursive_ancestors_query(task_id):
+    """
+    SELECT of (id, project_id, depth) for a task and every task above it, walking
+    parent_task_id with a recursive CTE. depth is 0 for the task itself, 1 for its parent, and so on.
+    """
+    chain = db.select(Task.id, Task.parent_task_id, Task.project_id, db.literal(0).label('depth'))\
+        .where(Task.id == task_id)\
+        .cte('task_ancestors', recursive=True)
+    chain = chain.union_all(
+        db.select(Task.id, Task.parent_task_id, Task.project_id, (chain.c.depth + 1).label('depth'))
+        .join(chain, Task.id == chain.c.parent_task_id)
+    )
+    return db.select(chain.c.id, chain.c.project_id, chain.c.depth)
+
+
+def ancestors_query(task_id):
+    """
+    SELECT of (id, project_id, depth) for a task and every task above it.
+    depth is 0 for the task itself, 1 for its parent, and so on.
+    """
+    if closure_enabled():
+        return db.select(task_closure.c.ancestor_id.label('id'), Task.project_id, task_closure.c.depth)\
+            .join(Task, Task.id == task_closure.c.ancestor_id)\
+            .where(task_closure.c.descendant_id == task_id)
+    return recursive_ancestors_query(task_id)
+
+
+def ancestor_rows_query(task_ids):
+    """
+    SELECT of (task_id, id, project_id) pairing each of task_ids with itself and every task above it.
+    Batch form of ancestors_query.
+    """
+    if closure_enabled():
+        return db.select(
+            task_closure.c.descendant_id.label('task_id'),
+            task_closure.c.ancestor_id.label('id'),
+            Task.project_id
+        ).join(Task, Task.id == task_closure.c.ancestor_id)\
+            .where(task_closure.c.descendant_id.in_(task_ids))
+
+    chain = db.select(Task.id.label('task_id'), Task.id, Task.parent_task_id, Task.project_id)\
+        .where(Task.id.in_(task_ids))\
+        .cte('task_ancestor_rows', recursive=True)
+    chain = chain.union_all(
+        db.select(chain.c.task_id, Task.id, Task.parent_task_id, Task.project_id)
+        .join(chain, Task.id == chain.c.parent_task_id)
+    )
+    return db.select(chain.c.task_id, chain.c.id, chain.c.project_id)
+
+
+def root_rows_query(task_ids):
+    """
+    SELECT of (task_id, root_id, project_id) giving the top-level task above each of task_ids
+    (the task itself for a parent task) and that top-level task's project.
+    """
+    if closure_enabled():
+        return db.select(
+            task_closure.c.descendant_id.label('task_id'),
+            task_closure.c.ancestor_id.label('root_id'),
+            Task.project_id
+        ).join(Task, Task.id == task_closure.c.ancestor_id)\
+            .where(task_closure.c.descendant_id.in_(task_ids), Task.parent_task_id.is_(None))
+
+    chain = db.select(Task.id.label('task_id'), Task.id, Task.parent_task_id, Task.project_id)\
+        .where(Task.id.in_(task_ids))\
+        .cte('task_roots', recursive=True)
+    chain = chain.union_all(
+        db.select(chain.c.task_id, Task.id, Task.parent_task_id, Task.project_id)
+        .join(chain, Task.id == chain.c.parent_task_id)
+    )
+    return db.select(chain.c.task_id, chain.c.id.label('root_id'), chain.c.project_id)\
+        .where(chain.c.parent_task_id.is_(None))
+
+
+def closure_rows_query(task_ids=None):
+    """
+    SELECT of (ancestor_id, descendant_id, depth) for every task in task_ids (default: all tasks)
+    and each of its ancestors, computed with a recursive CTE. This is what task_closure stores.
+    """
+    start = db.select(
+        Task.id.label('ancestor_id'),
+        Task.id.label('descendant_id'),
+        db.literal(0).label('depth'),
+        Task.parent_task_id.label('next_id'),
+    )
+    if task_ids is not None:
+        start = start.where(Task.id.in_(task_ids))
+    paths = start.cte('task_paths', recursive=True)
+    paths = paths.union_all(
+        db.select(Task.id, paths.c.descendant_id, paths.c.depth + 1, Task.parent_task_id)
+        .join(paths, Task.id == paths.c.next_id)
+    )
+    return db.select(paths.c.ancestor_id, paths.c.descendant_id, paths.c.depth)
+
+
+def get_subtree_ids(task_id):
+    """Ids of a task and all of its descendants, in one query."""
+    return set(db.session.execute(descendant_ids_query([task_id])).scalars())
+
+
+def get_ancestors(task_id):
+    """Rows (id, project_id, depth) from the task itself up to its root, in one query."""
+    query = ancestors_query(task_id)
+    return db.session.execute(query.order_by(query.selected_columns.depth)).all()
+
+
+def get_root_id(task_id):
+    """Id of the top-level task above task_id (task_id itself for a parent task), or None if it does not exist."""
+    ancestors = get_ancestors(task_id)
+    return ancestors[-1].id if ancestors else None
+
+
+def is_descendant(task_id, ancestor_id):
+    """Whether task_id is ancestor_id or lies anywhere in its subtree."""
+    ancestors = ancestors_query(task_id).subquery()
+    return db.session.execute(
+        db.select(ancestors.c.id).where(ancestors.c.id == ancestor_id).limit(1)
+    ).first() is not None
+
+
+def cascade_deadline(root_ids, new_deadline, include_roots=False):
+    """
+    Pull in the deadline of every task in the subtrees rooted at root_ids that ends after new_deadline.
+    The roots themselves are only updated when include_roots is True.
+    One UPDATE statement, which also bumps the versions of the updated tasks; loaded Task objects
+    are kept in sync. Returns the number of updated rows.
+    """
+    if not new_deadline:
+        return 0
+
+    subtree = descendant_ids_query(root_ids)
+    statement = db.update(Task)\
+        .where(Task.id.in_(subtree), Task.deadline > new_deadline)\
+        .values(deadline=new_deadline, version=Task.version + 1)
+    if not include_roots:
+        statement = statement.where(Task.id.not_in(root_ids))
+
+    result = db.session.execute(statement, execution_options={'synchronize_session': 'fetch'})
+    return result.rowcount
@@ -1,23 +1,17 @@
 from flask_sqlalchemy import SQLAlchemy
 import enum
-from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
+from datetime import datetime
 
 db = SQLAlchemy()
 
-def _calculate_next_due_date(current_deadline, interval, custom_days):
-    #Calculates the next due date based on the recurrence interval.
-    if not current_deadline:
-        return None # Cannot calculate next date without a starting point
 
-    if interval == 'daily':
-        return current_deadline + timedelta(days=1)
-    elif interval == 'weekly':
-        return current_deadline + timedelta(weeks=1)
-    elif interval == 'monthly':
-        return current_deadline + relativedelta(months=1)
-    elif interval == 'custom' and custom_days:
-        return current_deadline + timedelta(days=custom_days)
+def _newest(*timestamps):
+    timestamps = [value for value in timestamps if value is not None]
+    return max(timestamps) if timestamps else None
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
 
 # --- ENUMS ---
 
@@ -49,6 +43,35 @@ comment_mentions = db.Table(
     db.Column('user_id', db.Integer, primary_key=True)  # just store user IDs
 )
 
+# Materialized visibility index: one row per (user, parent task) the user can see.
+# Maintained by app/visibility.py; rebuild with `flask visibility rebuild`.
+task_visibility = db.Table(
+    'task_visibility',
+    db.Column('user_id', db.Integer, primary_key=True),
+    db.Column('root_task_id', db.Integer, primary_key=True, index=True)
+)
+
+# Closure table of the task hierarchy: one row per (ancestor, descendant) pair, including
+# each task with itself at depth 0. Optional (TASK_CLOSURE_ENABLED); maintained by app/closure.py.
+task_closure = db.Table(
+    'task_closure',
+    db.Column('ancestor_id', db.Integer, primary_key=True),
+    db.Column('descendant_id', db.Integer, primary_key=True, index=True),
+    db.Column('depth', db.Integer, nullable=False)
+)
+
+# Deleted tasks and projects, one row per user who could see them, so GET /changes can
+# report deletes. Written by app/changes.py; prune with `flask changes prune`.
+change_tombstones = db.Table(
+    'change_tombstones',
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('user_id', db.Integer, nullable=False),
+    db.Column('entity_type', db.String(20), nullable=False),
+    db.Column('entity_id', db.Integer, nullable=False),
+    db.Column('deleted_at', db.DateTime, nullable=False, server_default=db.func.now()),
+    db.Index('ix_change_tombstones_user_id_deleted_at', 'user_id', 'deleted_at')
+)
+
 # --- MAIN MODELS ---
 
 class Project(db.Model):
@@ -62,6 +85,12 @@ class Project(db.Model):
     owner_id = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+    # Optimistic concurrency: bumped by every edit, checked against If-Match (see app/conditional.py)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # Incremented by every UPDATE of the row, whatever it changes, for the read validators
+    # (see app/conditional.py). Not part of any payload.
+    revision = db.Column(db.Integer, nullable=False, default=1, server_default='1',
+                         onupdate=db.literal_column('revision + 1'))
 
     # Relationship to tasks in this project
     tasks = db.relationship('Task', back_populates='project', cascade="all, delete-orphan")
@@ -79,19 +108,29 @@ class Project(db.Model):
         )
         return [row.Task for row in result]
 
-    def to_json(self):
+    def base_json(self):
+        """Serialize the project's own columns, without collaborators or tasks."""
         return {
             'id': self.id,
             'title': self.title,
             'description': self.description,
             'deadline': self.deadline.isoformat() if self.deadline else None,
             'owner_id': self.owner_id,
-            'collaborator_ids': self.collaborator_ids(),
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'tasks': [task.to_json() for task in self.tasks]
+            'version': self.version,
         }
 
+    def to_json(self):
+        data = self.base_json()
+        data.update({
+            'collaborator_ids': self.collaborator_ids(),
+            'tasks': [task.to_json() for task in self.tasks],
+            # Task writes do not stamp the project row: it is as fresh as the newest task tree in it
+            'updated_at': _isoformat(_newest(self.updated_at, *(task.subtree_updated_at() for task in self.tasks))),
+        })
+        return data
+
 class TaskActivityLog(db.Model):
     """
     Records a log of all changes to task details (title, status, priority, etc.)
@@ -118,6 +157,11 @@ class Task(db.Model):
     Subtasks are modeled with a self-referencing foreign key.
     """
     __tablename__ = 'tasks'
+    __table_args__ = (
+        # One row per materialized occurrence of a recurring series (app/recurrence.py); also
+        # serves lookups by series alone. Rows without an occurrence (NULL) never collide.
+        db.Index('uq_tasks_recurrence_occurrence', 'recurrence_series_id', 'recurrence_occurrence_at', unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -126,7 +170,8 @@ class Task(db.Model):
     status = db.Column(db.Enum(TaskStatusEnum), nullable=False, default=TaskStatusEnum.UNASSIGNED)
     owner_id = db.Column(db.Integer, nullable=False)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=True)
-    parent_task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=True)
+    # Indexed for subtree walks and the subtask_count subquery
+    parent_task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=True, index=True)
     priority = db.Column(db.Integer, nullable=True)  
 
     # Task Recurrance
@@ -134,10 +179,27 @@ class Task(db.Model):
     recurrence_interval = db.Column(db.String(50), nullable=True) 
     recurrence_days = db.Column(db.Integer, nullable=True) #
     recurrence_end_date = db.Column(db.DateTime, nullable=True)
+    # Series a row belongs to (the id of its first task; NULL on that first task) and, for an
+    # occurrence materialized from the virtual expansion, its scheduled deadline (app/recurrence.py)
+    recurrence_series_id = db.Column(db.Integer, nullable=True)
+    recurrence_occurrence_at = db.Column(db.DateTime, nullable=True)
 
     # Timestamps
     created_at = db.Column(db.DateTime, server_default=db.func.now())
-    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+    # Indexed for the incremental feeds (deadline feed, GET /changes)
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now(), index=True)
+
+    # Denormalized child counts, kept in sync at flush time by app/counters.py
+    # (subtask_count is counted when read, see below)
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    attachment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # Optimistic concurrency: bumped by every edit, checked against If-Match (see app/conditional.py)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # Incremented by every UPDATE of the row, whatever it changes, for the read validators
+    # (see app/conditional.py). Not part of any payload.
+    revision = db.Column(db.Integer, nullable=False, default=1, server_default='1',
+                         onupdate=db.literal_column('revision + 1'))
 
     # Relationships
     activity_logs = db.relationship('TaskActivityLog', back_populates='task', lazy='dynamic', cascade="all, delete-orphan")
@@ -155,29 +217,29 @@ class Task(db.Model):
         )
         return [row.user_id for row in result]
 
-    def to_json(self):
-        next_instance_date = None
-        if self.is_recurring:
-            # Check 1: Stop if the recurrence period has already ended
-            if self.recurrence_end_date and datetime.utcnow() >= self.recurrence_end_date:
-                pass # next_instance_date remains None
-            else:
-                # Calculate the next potential deadline
-                next_deadline = _calculate_next_due_date(
-                    self.deadline, 
-                    self.recurrence_interval, 
-                    self.recurrence_days
-                )
-                
-                if next_deadline:
-                    # Check 2: Stop if the *next* deadline is past or at the end date
-                    if self.recurrence_end_date and next_deadline >= self.recurrence_end_date:
-                        pass # next_instance_date remains None
-                    else:
-                        next_instance_date = next_deadline.isoformat()
-        # Filter comments to only include top-level (no parent_comment_id)
-        top_level_comments = [c for c in self.comments if c.parent_comment_id is None]
-
+    def next_recurring_instance(self):
+        """Returns the ISO deadline of the next recurring instance, or None if the series has ended."""
+        if not self.is_recurring:
+            return None
+        # Check 1: Stop if the recurrence period has already ended
+        if self.recurrence_end_date and datetime.utcnow() >= self.recurrence_end_date:
+            return None
+        # Calculate the next potential deadline
+        from .recurrence import calculate_next_due_date
+        next_deadline = calculate_next_due_date(
+            self.deadline, 
+            self.recurrence_interval, 
+            self.recurrence_days
+        )
+        if not next_deadline:
+            return None
+        # Check 2: Stop if the *next* deadline is past or at the end date
+        if self.recurrence_end_date and next_deadline >= self.recurrence_end_date:
+            return None
+        return next_deadline.isoformat()
+
+    def base_json(self):
+        """Serialize the task's own columns, without any related rows."""
         return {
             'id': self.id,
             'title': self.title,
@@ -192,7 +254,23 @@ class Task(db.Model):
             'recurrence_interval': self.recurrence_interval,
             'recurrence_days': self.recurrence_days,
             'recurrence_end_date': self.recurrence_end_date.isoformat() if self.recurrence_end_date else None,
-            'next_recurring_instance': next_instance_date,
+            'next_recurring_instance': self.next_recurring_instance(),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'version': self.version,
+        }
+
+    def subtree_updated_at(self):
+        """Newest updated_at in this task's subtree: subtask writes do not stamp the parent row."""
+        return _newest(self.updated_at, *(subtask.subtree_updated_at() for subtask in self.subtasks))
+
+    def to_json(self):
+        # Filter comments to only include top-level (no parent_comment_id)
+        top_level_comments = [c for c in self.comments if c.parent_comment_id is None]
+
+        data = self.base_json()
+        data.update({
+            'updated_at': _isoformat(self.subtree_updated_at()),
             'collaborator_ids': self.collaborator_ids(),
             'subtasks': [subtask.to_json() for subtask in self.subtasks],
             'subtask_count': len(self.subtasks),
@@ -200,9 +278,8 @@ class Task(db.Model):
             'comment_count': len(self.comments),  # Still count all comments
             'attachments': [attachment.to_json() for attachment in self.attachments],
             'attachment_count': len(self.attachments),
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-        }
+        })
+        return data
 
 class Attachment(db.Model):
     """Represents a file attachment linked to a task."""
@@ -250,8 +327,8 @@ class Comment(db.Model):
         )
         return [row.user_id for row in result]
 
-    def to_json(self):
-        """Serialize the object to a dictionary."""
+    def base_json(self):
+        """Serialize the comment's own columns, without replies or mentions."""
         return {
             'id': self.id,
             'body': self.body,
@@ -259,10 +336,17 @@ class Comment(db.Model):
             'task_id': self.task_id,
             'created_at': self.created_at.isoformat(),
             'parent_comment_id': self.parent_comment_id,
+        }
+
+    def to_json(self):
+        """Serialize the object to a dictionary."""
+        data = self.base_json()
+        data.update({
             'replies': [reply.to_json() for reply in self.replies],
             'reply_count': len(self.replies),
             'mentions': self.get_mentions()
-        }
+        })
+        return data
     
 class ReportHistory(db.Model):
     """Represents a file attachment linked to a task."""
@@ -287,4 +371,16 @@ class ReportHistory(db.Model):
             'project_id': self.project_id,
             'report_type': self.report_type,
             'created_at': self.created_at.isoformat(),
-        }
\ No newline at end of file
+        }
+
+
+# Direct subtasks, counted when read: a stored counter would make every subtask insert or delete
+# update (and stamp) the parent row. Deferred, so it is only queried where it is asked for.
+_Subtask = db.aliased(Task)
+Task.subtask_count = db.column_property(
+    db.select(db.func.count(_Subtask.id))
+    .where(_Subtask.parent_task_id == Task.id)
+    .correlate_except(_Subtask)
+    .scalar_subquery(),
+    deferred=True
+)
@@ -0,0 +1,94 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+# Keyset (seek) pagination helpers.
+# A page is fetched with "WHERE (sort_col, id) is after the last row seen ORDER BY sort_col, id
+# LIMIT n", so every page costs the same no matter how deep the client has scrolled, and the
+# server never materializes more than one page. The position is handed back to the client as an
+# opaque cursor. NULL sort values always come last, in either direction.
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def parse_sort(sort, sort_columns, default='id'):
+    """
+    Parse a sort arg such as 'deadline' or '-priority' (descending).
+    Returns (key, descending). Raises ValueError for unknown keys.
+    """
+    sort = (sort or default).strip()
+    descending = sort.startswith('-')
+    key = sort.lstrip('-')
+    if key not in sort_columns:
+        raise ValueError(f"Invalid sort key: {key}. Use one of: {', '.join(sort_columns)}")
+    return key, descending
+
+
+def parse_limit(limit):
+    """Clamp a requested page size to [1, MAX_PAGE_SIZE]."""
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+def _dump_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _load_value(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(sort_key, descending, value, row_id):
+    """Encode the position of the last row of a page as an opaque, URL-safe string."""
+    payload = {'s': sort_key, 'd': descending, 'v': _dump_value(value), 'id': row_id}
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort_key, descending):
+    """
+    Decode a cursor produced by encode_cursor. Returns (value, row_id).
+    Raises ValueError if the cursor is malformed or was issued for a different sort.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, row_id = _load_value(payload['v']), int(payload['id'])
+        cursor_sort = (payload['s'], bool(payload['d']))
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != (sort_key, descending):
+        raise ValueError("Cursor does not match the requested sort")
+    return value, row_id
+
+
+def keyset_order_by(column, id_column, descending):
+    """ORDER BY clauses matching keyset_after(): sort column (NULLs last), then id as tie-breaker."""
+    if column is id_column:
+        return [id_column.desc() if descending else id_column.asc()]
+    if descending:
+        return [column.desc().nullslast(), id_column.desc()]
+    return [column.asc().nullslast(), id_column.asc()]
+
+
+def keyset_after(column, id_column, descending, value, row_id):
+    """WHERE clause selecting the rows that come after (value, row_id) in keyset_order_by() order."""
+    id_after = id_column < row_id if descending else id_column > row_id
+    if column is id_column:
+        return id_after
+    if value is None:
+        # Already inside the trailing NULL group: only the id tie-breaker is left
+        return and_(column.is_(None), id_after)
+    value_after = column < value if descending else column > value
+    return or_(
+        value_after,
+        and_(column == value, id_after),
+        column.is_(None),
+    )
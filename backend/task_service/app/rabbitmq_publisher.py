@@ -1,5 +1,8 @@
 import pika
 import json
+import queue
+import threading
+import time
 from flask import current_app
 
 
@@ -31,6 +34,96 @@ def publish_to_rabbitmq(queue_name, message):
         return False
 
 
+class ExchangePublisher:
+    """
+    Publishes to a fanout exchange from one background thread per process, over a connection that
+    thread keeps open, so callers only put the message on an in-memory queue and never wait on
+    RabbitMQ. Messages are dropped (and logged) when the queue is full or RabbitMQ is unreachable:
+    they are live notifications, not a durable log.
+    on_tick, if given, is called from the publishing thread every tick_seconds.
+    """
+
+    def __init__(self, rabbitmq_url, exchange_name, queue_size=10000, tick_seconds=10, on_tick=None):
+        self.rabbitmq_url = rabbitmq_url
+        self.exchange_name = exchange_name
+        self.tick_seconds = tick_seconds
+        self.on_tick = on_tick
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def publish(self, message):
+        self._start()
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            print(f"❌ RabbitMQ exchange {self.exchange_name} is backed up, message dropped")
+            return False
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f'{self.exchange_name}-publisher', daemon=True)
+                self._thread.start()
+
+    def _connect(self):
+        connection = pika.BlockingConnection(pika.URLParameters(self.rabbitmq_url))
+        channel = connection.channel()
+        channel.exchange_declare(exchange=self.exchange_name, exchange_type='fanout')
+        return channel
+
+    @staticmethod
+    def _close(channel):
+        try:
+            if channel is not None:
+                channel.connection.close()
+        except Exception:
+            pass
+
+    def _send(self, channel, message):
+        """Publish one message, reconnecting once if the connection went stale. Returns the channel to reuse."""
+        body = json.dumps(message)
+        for attempt in range(2):
+            try:
+                if channel is None:
+                    channel = self._connect()
+                channel.basic_publish(exchange=self.exchange_name, routing_key='', body=body)
+                return channel
+            except Exception as e:
+                self._close(channel)
+                channel = None
+                if attempt:
+                    print(f"❌ Error publishing to RabbitMQ exchange {self.exchange_name}: {e}")
+                    time.sleep(1)
+        return None
+
+    def _run(self):
+        channel = None
+        next_tick = time.monotonic() + self.tick_seconds
+        while True:
+            try:
+                message = self._queue.get(timeout=max(next_tick - time.monotonic(), 0))
+                channel = self._send(channel, message)
+            except queue.Empty:
+                pass
+            if time.monotonic() < next_tick:
+                continue
+            next_tick = time.monotonic() + self.tick_seconds
+            try:
+                # Answer heartbeats while idle so the broker keeps the connection open
+                if channel is not None:
+                    channel.connection.process_data_events(time_limit=0)
+            except Exception:
+                self._close(channel)
+                channel = None
+            if self.on_tick:
+                try:
+                    self.on_tick()
+                except Exception as e:
+                    print(f"❌ Error in RabbitMQ publisher tick: {e}")
+
+
 def publish_status_update(task_id, old_status, new_status, changed_by_id):
     #Publish task status update to notification service
     message = {
@@ -42,6 +135,14 @@ def publish_status_update(task_id, old_status, new_status, changed_by_id):
     
     return publish_to_rabbitmq('task_status_updates', message)
 
+def publish_status_updates(updates, changed_by_id):
+    #Publish many task status updates (a bulk status change) as one message over one connection
+    message = {
+        'updates': [dict(update, changed_by_id=changed_by_id) for update in updates]
+    }
+
+    return publish_to_rabbitmq('task_status_updates', message)
+
 def publish_mention_alert(task_id, comment_id, mentioned_user_id, author_id, comment_body):
     #Publish mention alert message to RabbitMQ for notification service.
     message = {
@@ -0,0 +1,180 @@
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
+from .models import db, Task, TaskStatusEnum
+
+# Virtual expansion of recurring tasks for calendar ranges.
+# A recurring series is stored as a single row, its current occurrence (is_recurring=True); the
+# next row is only created when that occurrence is completed. The occurrences after it are
+# computed here on the fly from recurrence_interval / recurrence_days / recurrence_end_date, with
+# the same chain of calculate_next_due_date steps and end-date rules that completion uses, so
+# the virtual dates are the ones the real rows will get.
+#
+# Every virtual occurrence has a stable id, "<series id>-<scheduled deadline>", where the series
+# id is the id of the series' first task (carried to every later row as recurrence_series_id).
+# A virtual occurrence only becomes a row when it is edited or completed (see
+# service.update_occurrence); that row records its series and scheduled deadline in
+# recurrence_occurrence_at, so the expansion, and the next occurrence created on completion,
+# skip it from then on.
+
+# Widest calendar range one request may expand
+MAX_OCCURRENCE_RANGE = timedelta(days=366)
+
+# Steps walked per series, from its current occurrence to the end of the range
+MAX_SERIES_STEPS = 3660
+
+_OCCURRENCE_FORMAT = '%Y%m%dT%H%M%S'
+_OCCURRENCE_ID = re.compile(r'^(\d+)-(\d{8}T\d{6})$')
+
+
+def calculate_next_due_date(current_deadline, interval, custom_days):
+    """Deadline one recurrence interval after current_deadline, or None if there is no next one."""
+    if not current_deadline:
+        return None # Cannot calculate next date without a starting point
+
+    if interval == 'daily':
+        return current_deadline + timedelta(days=1)
+    elif interval == 'weekly':
+        return current_deadline + timedelta(weeks=1)
+    elif interval == 'monthly':
+        return current_deadline + relativedelta(months=1)
+    elif interval == 'custom' and custom_days:
+        return current_deadline + timedelta(days=custom_days)
+    return None
+
+
+def series_id(task):
+    """Id of the series a task belongs to: its first task's id."""
+    return task.recurrence_series_id or task.id
+
+
+def occurrence_id(series, scheduled):
+    return f"{series}-{scheduled.strftime(_OCCURRENCE_FORMAT)}"
+
+
+def parse_occurrence_id(value):
+    """(series id, scheduled deadline) of an occurrence id. Raises ValueError if it is malformed."""
+    match = _OCCURRENCE_ID.match(str(value))
+    if not match:
+        raise ValueError(f"Invalid occurrence id: {value}")
+    return int(match.group(1)), datetime.strptime(match.group(2), _OCCURRENCE_FORMAT)
+
+
+def series_deadlines(task, now=None):
+    """
+    Scheduled deadlines of the occurrences that follow task (the current row of a series), in
+    order, under the rules applied on completion: none once recurrence_end_date has passed, and
+    only deadlines before it.
+    """
+    now = now or datetime.utcnow()
+    if task.recurrence_end_date and now >= task.recurrence_end_date:
+        return
+    deadline = task.deadline
+    for _ in range(MAX_SERIES_STEPS):
+        deadline = calculate_next_due_date(deadline, task.recurrence_interval, task.recurrence_days)
+        if not deadline or (task.recurrence_end_date and deadline >= task.recurrence_end_date):
+            return
+        yield deadline
+
+
+def materialized_occurrences(series_ids):
+    """{series id: scheduled deadlines of its occurrences that already have a row}, in one query."""
+    materialized = defaultdict(set)
+    series_ids = list(series_ids)
+    if not series_ids:
+        return materialized
+    result = db.session.execute(
+        db.select(Task.recurrence_series_id, Task.recurrence_occurrence_at).where(
+            Task.recurrence_series_id.in_(series_ids),
+            Task.recurrence_occurrence_at.is_not(None)
+        )
+    )
+    for row in result:
+        materialized[row.recurrence_series_id].add(row.recurrence_occurrence_at)
+    return materialized
+
+
+def next_open_deadline(task, materialized):
+    """First occurrence after task that has no row yet, or None when the series is over."""
+    for deadline in series_deadlines(task):
+        if deadline not in materialized:
+            return deadline
+    return None
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _occurrence_json(task, series, scheduled):
+    """A virtual occurrence: the current row's fields, at the occurrence's deadline and not started."""
+    return {
+        'id': occurrence_id(series, scheduled),
+        'virtual': True,
+        'series_id': series,
+        'source_task_id': task.id,
+        'title': task.title,
+        'description': task.description,
+        'status': TaskStatusEnum.UNASSIGNED.value,
+        'deadline': scheduled.isoformat(),
+        'owner_id': task.owner_id,
+        'project_id': task.project_id,
+        'parent_task_id': task.parent_task_id,
+        'priority': task.priority,
+        'is_recurring': True,
+        'recurrence_interval': task.recurrence_interval,
+        'recurrence_days': task.recurrence_days,
+        'recurrence_end_date': _iso(task.recurrence_end_date),
+    }
+
+
+def expand_occurrences(tasks, start, end):
+    """
+    Virtual occurrences with a deadline in [start, end) of the series whose current rows are
+    tasks, ordered by deadline. The current rows themselves, and occurrences that already have
+    a row, are real tasks and are not repeated. Raises ValueError for an invalid range.
+    """
+    if end <= start:
+        raise ValueError("end must be after start")
+    if end - start > MAX_OCCURRENCE_RANGE:
+        raise ValueError(f"A range covers at most {MAX_OCCURRENCE_RANGE.days} days")
+
+    tasks = [task for task in tasks if task.is_recurring and task.deadline]
+    materialized = materialized_occurrences({series_id(task) for task in tasks})
+    occurrences = []
+    for task in tasks:
+        series = series_id(task)
+        for deadline in series_deadlines(task):
+            if deadline >= end:
+                break
+            if deadline >= start and deadline not in materialized[series]:
+                occurrences.append(_occurrence_json(task, series, deadline))
+    occurrences.sort(key=lambda occurrence: (occurrence['deadline'], occurrence['id']))
+    return occurrences
+
+
+def find_occurrence(value):
+    """
+    Resolve an occurrence id to (current row of its series, scheduled deadline, id of the row
+    it was materialized as or None). Returns (None, None, None) if the series has no current row
+    or the deadline is not one of its occurrences. Raises ValueError for a malformed id.
+    """
+    series, scheduled = parse_occurrence_id(value)
+    existing = db.session.execute(
+        db.select(Task.id).where(Task.recurrence_series_id == series, Task.recurrence_occurrence_at == scheduled)
+    ).scalar()
+    task = db.session.execute(
+        db.select(Task).where(
+            Task.is_recurring.is_(True),
+            db.or_(Task.recurrence_series_id == series, db.and_(Task.recurrence_series_id.is_(None), Task.id == series))
+        ).order_by(Task.id.desc()).limit(1)
+    ).scalar()
+    if existing is not None:
+        return task, scheduled, existing
+    if task is None or not task.deadline or scheduled <= task.deadline:
+        return None, None, None
+    for deadline in series_deadlines(task):
+        if deadline >= scheduled:
+            return (task, scheduled, None) if deadline == scheduled else (None, None, None)
+    return None, None, None
@@ -1,7 +1,34 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request
 from . import service
+from .serializers import parse_task_fields, serialize_task_summaries
+from .streaming import wants_ndjson, iter_serialized_tasks, ndjson_response
+from .conditional import task_validator, project_validator, user_projects_validator, not_modified, with_validator, expected_version
+from .cache import read_through, get_payload_cache
+from .changes import get_changes
+from .events import get_event_broker, event_stream
+from .batch import run_batch
+from .encoding import list_response, compress_response
 
 task_bp = Blueprint("task_bp", __name__)
+task_bp.after_request(compress_response)
+
+def _parse_id_list(value, name):
+    """Parse a list of IDs given as a JSON array or a comma-separated string."""
+    if isinstance(value, str):
+        value = [item for item in value.split(',') if item.strip()]
+    if not isinstance(value, list):
+        raise ValueError(f"{name} must be a list of IDs")
+    try:
+        return [int(item) for item in value]
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a list of IDs")
+
+def _requested_fields():
+    """
+    Parse the ?view=summary / ?fields=a,b,c args shared by the task list endpoints.
+    Returns None when the full nested payload was requested.
+    """
+    return parse_task_fields(request.args.get('view'), request.args.get('fields'))
 
 # Settled
 # Health check endpoint
@@ -10,33 +37,184 @@ def health_check():
     """Health check endpoint"""
     return jsonify({"status": "healthy", "service": "task_management"}), 200
 
+@task_bp.route("/tasks/cache/stats", methods=["GET"])
+def get_cache_stats():
+    """Hit/miss statistics of this worker's task and project payload cache"""
+    cache = get_payload_cache()
+    if cache is None:
+        return jsonify({"error": "Payload cache is not configured"}), 404
+    return jsonify(cache.stats()), 200
+
+@task_bp.route("/tasks/batch", methods=["POST"])
+def batch_requests():
+    """
+    Run several requests to this service in one round trip.
+    Body: [{"method": "GET", "path": "/tasks/1"}, {"method": "PUT", "path": "/tasks/2", "body": {...}}, ...]
+    Returns [{"status": 200, "headers": {...}, "body": {...}}, ...] in the same order.
+    Each sub-request is answered like the route it names (errors included); the Authorization
+    header of the batch is passed on to all of them.
+    """
+    try:
+        return jsonify(run_batch(request.get_json(silent=True), excluded_endpoints=('task_bp.stream_task_events',))), 200
+    except ValueError as e:
+        print(f"Error in batch_requests: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error in batch_requests: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@task_bp.route("/tasks/events", methods=["GET"])
+def stream_task_events():
+    """
+    Server-sent events for the tasks a user can see.
+    Events: task.created, task.updated, task.status_changed (with old_status/new_status) and
+    task.deleted, each with task_id, project_id and parent_task_id. A 'resync' event means events
+    were dropped: reload (or call /changes) before listening again.
+
+    Query parameters:
+    - user_id (required): Only events for tasks this user can see
+
+    Returns 503 when this worker already holds SSE_MAX_CONNECTIONS streams; EventSource retries.
+
+    Example: new EventSource('/tasks/events?user_id=1')
+    """
+    user_id = request.args.get('user_id', type=int)
+    if not user_id:
+        return jsonify({"error": "User ID is required"}), 400
+
+    broker = get_event_broker()
+    if broker is None:
+        return jsonify({"error": "Task events are not configured"}), 404
+
+    # Subscribed before the response is returned so no event is missed while it starts.
+    # The stream itself runs without the app context and never touches the database.
+    subscription = broker.subscribe(user_id)
+    if subscription is None:
+        return jsonify({"error": "Too many open event streams, retry later"}), 503, {'Retry-After': '5'}
+    stream = event_stream(
+        subscription,
+        heartbeat=current_app.config.get('SSE_HEARTBEAT_SECONDS', 15),
+        max_seconds=current_app.config.get('SSE_MAX_STREAM_SECONDS', 300)
+    )
+    response = Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Also runs when the client goes away before the stream started
+    response.call_on_close(subscription.close)
+    return response
+
 @task_bp.route("/tasks", methods=["GET"])
 def get_all_tasks():
-    """Get all tasks, filtered by owner_id"""
+    """
+    Get all tasks, filtered by owner_id
+
+    Query parameters:
+    - owner_id (required): ID of the user whose visible tasks are returned
+    - owner_ids: Comma-separated user IDs instead of owner_id; returns {owner_id: [tasks]}
+    - status: Comma-separated statuses (e.g. "Ongoing,Under Review")
+    - priority_min / priority_max: Inclusive priority range
+    - deadline_from / deadline_to: Inclusive deadline window (ISO datetimes)
+    - project_id: Only tasks in this project
+    - collaborator_id: Only tasks this user collaborates on
+    - sort: deadline, priority, title, created_at, updated_at or id; prefix with '-' for descending
+    - limit / cursor: Return one keyset-paginated page as {"tasks": [...], "next_cursor": ...}
+    - view: 'summary' for flat task cards instead of full task trees
+    - fields: Comma-separated summary fields to return (implies view=summary)
+
+    Example: /tasks?owner_id=2&status=Ongoing&sort=-priority&limit=20
+    """
     try:
         owner_id = request.args.get('owner_id', type=int)
         status = request.args.get('status')
+        fields = _requested_fields()
+        filters = {
+            key: request.args.get(key)
+            for key in service.TASK_FILTER_ARGS
+            if request.args.get(key)
+        }
+        sort = request.args.get('sort')
         
         print(f"Getting tasks with owner_id={owner_id}, status={status}")
-        
-        tasks = service.get_all_tasks(owner_id)
+
+        if request.args.get('owner_ids'):
+            owner_ids = _parse_id_list(request.args.get('owner_ids'), 'owner_ids')
+            tasks_by_owner = service.get_tasks_for_owners(owner_ids, fields=fields, filters=filters, sort=sort)
+            return jsonify(tasks_by_owner), 200
+
+        if 'limit' in request.args or 'cursor' in request.args:
+            if not isinstance(owner_id, int):
+                return jsonify({"error": "Owner ID is required"}), 400
+
+            tasks, next_cursor = service.get_tasks_page(
+                owner_id,
+                limit=request.args.get('limit', type=int),
+                cursor=request.args.get('cursor'),
+                filters=filters,
+                sort=sort,
+                fields=fields
+            )
+            return list_response({"tasks": tasks, "next_cursor": next_cursor}, rows_key="tasks"), 200
+        
+        tasks = service.get_all_tasks(owner_id, fields=fields, filters=filters, sort=sort)
 
         if tasks is None or not isinstance(owner_id, int):
             return jsonify({"error": "Owner ID is required"}), 400
 
-        tasks_json = [task.to_json() for task in tasks]
-
-        return jsonify(tasks_json), 200
+        return list_response(tasks), 200
+    except ValueError as e:
+        print(f"Error in get_all_tasks: {e}")
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error in get_all_tasks: {e}")
         return jsonify({"error": str(e)}), 500
 
+@task_bp.route("/tasks/owners:batch", methods=["POST"])
+def get_tasks_for_owners():
+    """
+    Get the visible tasks of many users in one request, grouped by user
+    (POST form of GET /tasks?owner_ids=..., for lists too long for a query string)
+
+    Body: { "owner_ids": [1, 2, 3] }
+    Query parameters: the same filters, sort, view and fields as GET /tasks
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if not data.get('owner_ids'):
+            return jsonify({"error": "owner_ids is required"}), 400
+
+        owner_ids = _parse_id_list(data['owner_ids'], 'owner_ids')
+        filters = {
+            key: request.args.get(key)
+            for key in service.TASK_FILTER_ARGS
+            if request.args.get(key)
+        }
+        print(f"Getting tasks for {len(owner_ids)} owners")
+
+        tasks_by_owner = service.get_tasks_for_owners(
+            owner_ids,
+            fields=_requested_fields(),
+            filters=filters,
+            sort=request.args.get('sort')
+        )
+        return jsonify(tasks_by_owner), 200
+    except ValueError as e:
+        print(f"Error in get_tasks_for_owners: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error in get_tasks_for_owners: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @task_bp.route("/tasks/with-deadlines", methods=["GET"])
 def get_tasks_with_upcoming_deadlines():
     #Get all tasks and subtasks that have upcoming deadlines.
     #Used by notification service for deadline reminders.
+    #Send Accept: application/x-ndjson to stream one task per line instead of a JSON array.
     try:
         print("Getting all tasks with upcoming deadlines for notification service")
+
+        if wants_ndjson():
+            return ndjson_response(iter_serialized_tasks(service.tasks_with_deadlines_query()))
         
         from .models import Task
         from datetime import datetime
@@ -54,7 +232,7 @@ def get_tasks_with_upcoming_deadlines():
         tasks_list = [task.to_json() for task in tasks_with_deadlines]
         
         print(f"Found {len(tasks_list)} tasks/subtasks with upcoming deadlines")
-        return jsonify(tasks_list), 200
+        return list_response(tasks_list), 200
         
     except Exception as e:
         print(f"Error in get_tasks_with_upcoming_deadlines: {e}")
@@ -62,6 +240,65 @@ def get_tasks_with_upcoming_deadlines():
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+@task_bp.route("/tasks/with-deadlines/feed", methods=["GET"])
+def get_deadline_feed():
+    """
+    Lightweight, incremental version of /tasks/with-deadlines for the notification scheduler.
+    Returns {"tasks": [...], "next_cursor": ..., "has_more": bool}; each task only holds
+    id, title, deadline, status, owner_id, parent_task_id and collaborator_ids.
+
+    Query parameters:
+    - deadline_from / deadline_to: Inclusive deadline window (ISO datetimes)
+    - updated_since: next_cursor of a previous call; only tasks changed since then are returned
+      (completed tasks and tasks without a deadline included, so they can be dropped)
+    - limit: Page size; keep calling with next_cursor while has_more is true
+
+    Example: /tasks/with-deadlines/feed?updated_since=eyJzIjoi...
+    """
+    try:
+        tasks, next_cursor, has_more = service.get_deadline_feed(
+            deadline_from=request.args.get('deadline_from'),
+            deadline_to=request.args.get('deadline_to'),
+            updated_since=request.args.get('updated_since'),
+            limit=request.args.get('limit', type=int)
+        )
+        return jsonify({"tasks": tasks, "next_cursor": next_cursor, "has_more": has_more}), 200
+    except ValueError as e:
+        print(f"Error in get_deadline_feed: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error in get_deadline_feed: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@task_bp.route("/changes", methods=["GET"])
+def get_change_feed():
+    """
+    Tasks and projects created, updated or deleted since a cursor, for incremental sync.
+    Returns {"tasks": {"created", "updated", "deleted"}, "projects": {...}, "cursor": ..., "reset": bool}.
+    When reset is true (no cursor, or one past the tombstone retention) nothing is listed:
+    reload the boards, then sync from the returned cursor.
+
+    Query parameters:
+    - user_id (required): Only tasks and projects this user can see
+    - since: cursor of a previous call
+    - view=summary / fields=a,b,c: List task summaries instead of ids (deleted stays ids)
+
+    Example: /changes?user_id=1&since=eyJzIjoi...&view=summary
+    """
+    try:
+        user_id = request.args.get('user_id', type=int)
+        if not user_id:
+            return jsonify({"error": "User ID is required"}), 400
+
+        changes = get_changes(user_id, since=request.args.get('since'), fields=_requested_fields())
+        return jsonify(changes), 200
+    except ValueError as e:
+        print(f"Error in get_change_feed: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error in get_change_feed: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @task_bp.route("/tasks", methods=["POST"])
 def create_task():
     """Create a new task"""
@@ -85,35 +322,167 @@ def create_task():
         print(f"Error in create_task: {e}")
         return jsonify({"error": str(e)}), 500
 
+@task_bp.route("/tasks/bulk", methods=["POST"])
+def create_tasks_bulk():
+    """
+    Create many tasks (e.g. an imported project plan) in one request and one transaction
+
+    Body: { "tasks": [{ "title", "owner_id", ...the fields of POST /tasks...,
+                        "collaborators_to_add": [...], "subtasks": [{ ... }] }] }
+    Subtasks go into their parent's project and default to its owner.
+    Returns the new ids in the same nesting: { "count", "tasks": [{ "id", "subtasks": [...] }] }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        created = service.create_tasks_bulk(data.get('tasks'))
+
+        def count(nodes):
+            return sum(1 + count(node['subtasks']) for node in nodes)
+        return jsonify({"count": count(created), "tasks": created}), 201
+    except ValueError as e:
+        print(f"Error in create_tasks_bulk: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error in create_tasks_bulk: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@task_bp.route("/tasks/status:bulk", methods=["POST"])
+def update_tasks_status():
+    """
+    Change the status of many tasks at once; every transition is checked before any is written
+
+    Body: { "user_id": 1, "updates": [{ "task_id": 1, "status": "Completed" }, ...] }
+       or { "user_id": 1, "task_ids": [1, 2, 3], "status": "Ongoing" }
+    Returns { "updated": [{ "task_id", "old_status", "new_status" }],
+              "recurring": [{ "task_id", "next_task_id" }] }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        updates = data.get('updates')
+        if updates is None and data.get('task_ids') is not None:
+            updates = [
+                {'task_id': task_id, 'status': data.get('status')}
+                for task_id in _parse_id_list(data['task_ids'], 'task_ids')
+            ]
+
+        result, error = service.update_tasks_status(data.get('user_id'), updates)
+        if error:
+            if "not found" in error:
+                return jsonify({"error": error}), 404
+            elif "Forbidden" in error:
+                return jsonify({"error": error}), 403
+            else:
+                return jsonify({"error": error}), 400
+        return jsonify(result), 200
+    except ValueError as e:
+        print(f"Error in update_tasks_status: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error in update_tasks_status: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@task_bp.route("/tasks/occurrences", methods=["GET"])
+def get_task_occurrences():
+    """
+    Upcoming occurrences of the recurring tasks a user can see, for a calendar range.
+    They are virtual (computed, not stored) and have string ids like "12-20261105T090000";
+    the real rows come from GET /tasks as usual.
+
+    Query parameters:
+    - owner_id (required): ID of the user whose visible tasks are expanded
+    - start / end (required): ISO datetimes of the range [start, end), at most a year apart
+    """
+    try:
+        owner_id = request.args.get('owner_id', type=int)
+        if not owner_id:
+            return jsonify({"error": "Owner ID is required"}), 400
+
+        occurrences = service.get_task_occurrences(owner_id, request.args.get('start'), request.args.get('end'))
+        return list_response(occurrences), 200
+    except ValueError as e:
+        print(f"Error in get_task_occurrences: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error in get_task_occurrences: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@task_bp.route("/tasks/occurrences/<occurrence_id>", methods=["PUT"])
+def update_task_occurrence(occurrence_id):
+    """
+    Edit or complete a virtual occurrence (same body as PUT /tasks/<id>).
+    The occurrence becomes a real task, which is returned with its new id.
+    """
+    try:
+        data = request.get_json()
+        print(f"Updating occurrence {occurrence_id} with data: {data}")
+
+        user_id = data.pop('user_id', None)
+        comment = data.pop('comment', None)
+        # A virtual occurrence has no version to check against
+        data.pop('version', None)
+        updated_task, message = service.update_occurrence(occurrence_id, user_id, data, comment)
+        if updated_task is None:
+            if "not found" in message:
+                return jsonify({"error": message}), 404
+            elif "Forbidden" in message:
+                return jsonify({"error": message}), 403
+            elif "Conflict" in message:
+                return jsonify({"error": message}), 409
+            else:
+                return jsonify({"error": message}), 400
+        return jsonify(updated_task), 200
+
+    except ValueError as e:
+        print(f"Error in update_task_occurrence: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error in update_task_occurrence: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @task_bp.route("/tasks/<int:task_id>", methods=["GET"])
 def get_task(task_id):
-    """Get a specific task with its subtasks, comments, and attachments"""
+    """
+    Get a specific task with its subtasks, comments, and attachments
+    Sends a weak ETag; If-None-Match with the current one is answered with 304.
+    The payload is served from the payload cache while the task tree is unchanged.
+    """
     try:
         print(f"Getting task with id={task_id}")
+
+        validator = task_validator(task_id)
+        if not_modified(validator):
+            return not_modified(validator)
         
-        task_details = service.get_task_details(task_id)
+        task_details = read_through('task', task_id, validator, lambda: service.get_task_details(task_id))
         if not task_details:
             return jsonify({"error": "Task not found"}), 404
-        return jsonify(task_details), 200
+        return with_validator(jsonify(task_details), validator), 200
     except Exception as e:
         print(f"Error in get_task: {e}")
         return jsonify({"error": str(e)}), 500
 
 @task_bp.route("/tasks/<int:task_id>", methods=["PUT"])
 def update_task(task_id):
-    """Update a task"""
+    """
+    Update a task
+    Conditional when the client sends the version it read, as If-Match: "<version>" or a
+    "version" field; a stale version gets 409 Conflict. Without a version the last write wins.
+    """
     try:
         data = request.get_json()
         print(f"Updating task {task_id} with data: {data}")
 
         user_id = data.pop('user_id', None)
         comment = data.pop('comment', None)
-        updated_task, message = service.update_task(task_id, user_id, data, comment)
+        version = expected_version(data.pop('version', None))
+        updated_task, message = service.update_task(task_id, user_id, data, comment, expected_version=version)
         if updated_task is None:
             if "not found" in message:
                 return jsonify({"error": message}), 404
             elif "Forbidden" in message:
                 return jsonify({"error": message}), 403
+            elif "Conflict" in message:
+                return jsonify({"error": message}), 409
             else:
                 return jsonify({"error": message}), 400 
         return jsonify(updated_task), 200
@@ -174,6 +543,29 @@ def delete_comment(comment_id):
         print(f"Error in delete_comment: {e}")
         return jsonify({"error": str(e)}), 500
 
+@task_bp.route("/tasks/collaborators:batch", methods=["POST"])
+def get_collaborators_for_tasks():
+    """
+    Get the collaborators of many tasks in one request
+
+    Body: { "task_ids": [1, 2, 3] }
+    Returns: { "1": [user_id, ...], "2": [], ... }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if 'task_ids' not in data:
+            return jsonify({"error": "task_ids is required"}), 400
+
+        task_ids = _parse_id_list(data['task_ids'], 'task_ids')
+        collaborators = service.get_collaborators_for_tasks(task_ids)
+        return jsonify(collaborators), 200
+    except ValueError as e:
+        print(f"Error in get_collaborators_for_tasks: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error in get_collaborators_for_tasks: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @task_bp.route("/tasks/<int:task_id>/collaborators", methods=["GET"])
 def get_task_subtask_collaborators(task_id):
     #Get all collaborators for a task/subtask
@@ -258,7 +650,12 @@ def create_project():
 
 @task_bp.route("/projects/<int:project_id>", methods=["GET"])
 def get_project(project_id):
-    """Get a specific project"""
+    """
+    Get a specific project
+    Sends a weak ETag; If-None-Match with the current one is answered with 304.
+
+    The payload is served from the payload cache while the project is unchanged.
+    """
     try:
         user_id = request.args.get('user_id', type=int)
         
@@ -272,8 +669,13 @@ def get_project(project_id):
                 return jsonify({"error": error}), 404
             else:
                 return jsonify({"error": error}), 403
+
+        validator = project_validator(project_id)
+        if not_modified(validator):
+            return not_modified(validator)
         
-        return jsonify(project.to_json()), 200
+        project_json = read_through('project', project_id, validator, project.to_json)
+        return with_validator(jsonify(project_json), validator), 200
         
     except Exception as e:
         print(f"Error in get_project: {e}")
@@ -291,6 +693,8 @@ def get_project_dashboard(project_id):
     - sort_by: Sort tasks by field (deadline, title, status, priority). Default: deadline
     - collaborator: If 'me', show only tasks where user is a collaborator
     - owner: If 'me', show only tasks where user is the owner
+    - view: 'summary' for flat task cards instead of full task trees
+    - fields: Comma-separated summary fields to return (implies view=summary)
     
     Example: /projects/1/dashboard?user_id=2&status=Ongoing,Under Review&sort_by=deadline&owner=me
     """
@@ -305,6 +709,7 @@ def get_project_dashboard(project_id):
         sort_by = request.args.get('sort_by', 'deadline')
         collaborator_filter = request.args.get('collaborator')
         owner_filter = request.args.get('owner')
+        fields = _requested_fields()
         
         dashboard_data, error = service.get_project_dashboard(
             project_id=project_id,
@@ -312,7 +717,8 @@ def get_project_dashboard(project_id):
             status_filter=status_filter,
             sort_by=sort_by,
             collaborator_filter=collaborator_filter,
-            owner_filter=owner_filter
+            owner_filter=owner_filter,
+            fields=fields
         )
         
         if error:
@@ -323,6 +729,9 @@ def get_project_dashboard(project_id):
         
         return jsonify(dashboard_data), 200
         
+    except ValueError as e:
+        print(f"Error in get_project_dashboard: {e}")
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error in get_project_dashboard: {e}")
         return jsonify({"error": str(e)}), 500
@@ -337,12 +746,18 @@ def get_user_projects(user_id):
     - role: Filter by role ('owner', 'collaborator', or omit for all)
     
     Example: /projects/user/2?role=owner
+
+    Sends a weak ETag; If-None-Match with the current one is answered with 304.
     """
     try:
         role_filter = request.args.get('role')
+
+        validator = user_projects_validator(user_id)
+        if not_modified(validator):
+            return not_modified(validator)
         
         projects = service.get_user_projects(user_id, role_filter)
-        return jsonify(projects), 200
+        return with_validator(list_response(projects), validator), 200
         
     except Exception as e:
         print(f"Error in get_user_projects: {e}")
@@ -353,7 +768,11 @@ def get_user_projects(user_id):
 
 @task_bp.route("/projects/<int:project_id>", methods=["PUT"])
 def update_project(project_id):
-    """Update a project (title, description, deadline, owner, collaborators)"""
+    """
+    Update a project (title, description, deadline, owner, collaborators)
+    Conditional when the client sends the version it read, as If-Match: "<version>" or a
+    "version" field; a stale version gets 409 Conflict. Without a version the last write wins.
+    """
     try:
         data = request.get_json()
         print(f"Updating project {project_id} with data: {data}")
@@ -364,8 +783,10 @@ def update_project(project_id):
         if not user_id:
             return jsonify({"error": "User ID is required in the request body"}), 400
 
+        version = expected_version(data.pop('version', None))
+
         # Pass the remaining data (without user_id) to the service
-        updated_project, message = service.update_project(project_id, user_id, data)
+        updated_project, message = service.update_project(project_id, user_id, data, expected_version=version)
 
         # *** THE CORRECT CHECK ***
         if updated_project is None:
@@ -373,12 +794,17 @@ def update_project(project_id):
                 return jsonify({"error": message}), 404
             elif "Forbidden" in message:
                 return jsonify({"error": message}), 403
+            elif "Conflict" in message:
+                return jsonify({"error": message}), 409
             else:
                 return jsonify({"error": message}), 400
 
         # On success, return the project
         return jsonify(updated_project), 200
 
+    except ValueError as e:
+        print(f"Error in update_project route: {e}")
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error in update_project route: {e}")
         return jsonify({"error": str(e)}), 500
@@ -475,8 +901,26 @@ def remove_project_collaborator(project_id, collaborator_user_id):
 def get_project_tasks(project_id):
     """
     Get all tasks for a project
+
+    Query parameters:
+    - view: 'summary' for flat task cards instead of full task trees
+    - fields: Comma-separated summary fields to return (implies view=summary)
+
+    Send Accept: application/x-ndjson to stream one task per line instead of a JSON array.
+    Sends a weak ETag; If-None-Match with the current one is answered with 304.
     """
     try:
+        fields = _requested_fields()
+        validator = project_validator(project_id)
+        if not_modified(validator):
+            return not_modified(validator)
+
+        if wants_ndjson():
+            ids_query, error = service.get_project_task_ids_query(project_id)
+            if error:
+                return jsonify({"error": error}), 404
+            return with_validator(ndjson_response(iter_serialized_tasks(ids_query, fields)), validator)
+
         tasks, error = service.get_project_tasks(project_id)
         if error:
             if "not found" in error:
@@ -484,9 +928,15 @@ def get_project_tasks(project_id):
             else:
                 return jsonify({"error": error}), 403
         
-        tasks_json = [task.to_json() for task in tasks]
-        return jsonify(tasks_json), 200
+        if fields is not None:
+            tasks_json = serialize_task_summaries([task.id for task in tasks], fields)
+        else:
+            tasks_json = [task.to_json() for task in tasks]
+        return with_validator(list_response(tasks_json), validator), 200
         
+    except ValueError as e:
+        print(f"Error in get_project_tasks: {e}")
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error in get_project_tasks: {e}")
         return jsonify({"error": str(e)}), 500
@@ -601,7 +1051,7 @@ def remove_task_from_project(task_id):
 def get_standalone_tasks():
     """
     Get all standalone tasks (not assigned to any project) for a user
-    Query parameter: user_id
+    Query parameters: user_id, view (optional 'summary'), fields (optional summary fields)
     """
     try:
         user_id = request.args.get('user_id', type=int)
@@ -609,9 +1059,12 @@ def get_standalone_tasks():
         if not user_id:
             return jsonify({"error": "User ID is required"}), 400
         
-        tasks = service.get_standalone_tasks_for_user(user_id)
-        return jsonify(tasks), 200
+        tasks = service.get_standalone_tasks_for_user(user_id, fields=_requested_fields())
+        return list_response(tasks), 200
         
+    except ValueError as e:
+        print(f"Error in get_standalone_tasks: {e}")
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error in get_standalone_tasks: {e}")
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -0,0 +1,374 @@
+from collections import defaultdict
+from sqlalchemy.orm import load_only
+from .models import db, Task, Comment, Attachment, task_collaborators, project_collaborators, comment_mentions
+from .hierarchy import descendant_ids_query, descendant_rows_query
+
+# Batched serializers for task trees.
+# Task.to_json() walks subtasks, collaborators, comments, replies and mentions one
+# relationship at a time, which costs several queries per node. The helpers here
+# prefetch a whole forest with a fixed number of queries and then assemble the same
+# JSON shape in memory.
+#
+# Writes only stamp updated_at on the task they change, never on its parents or project (so
+# writers of sibling tasks do not contend on those rows). The updated_at of a serialized task
+# tree, task summary or project is therefore derived on read: the newest timestamp among the row
+# itself and everything below it, whichever view it is read through (here, and in Task.to_json()
+# and Project.to_json() for the routes that still serialize through the model).
+
+
+def _newest(*timestamps):
+    timestamps = [value for value in timestamps if value is not None]
+    return max(timestamps) if timestamps else None
+
+
+class TaskForest:
+    """
+    Prefetched task subtrees, loaded in five queries no matter how many tasks they contain:
+    tasks, collaborators, comments, comment mentions and attachments.
+    """
+
+    def __init__(self, root_ids):
+        self.root_ids = list(dict.fromkeys(root_ids))
+        self.tasks = {}
+        self.children = defaultdict(list)
+        self.collaborators = defaultdict(list)
+        self.comments = defaultdict(list)
+        self.replies = defaultdict(list)
+        self.mentions = defaultdict(list)
+        self.attachments = defaultdict(list)
+        self.comment_counts = defaultdict(int)
+        self._freshness = {}
+
+        if self.root_ids:
+            self._load()
+
+    def _load(self):
+        tasks = db.session.execute(
+            db.select(Task)
+            .where(Task.id.in_(descendant_ids_query(self.root_ids)))
+            .order_by(Task.id)
+        ).scalars().all()
+
+        for task in tasks:
+            self.tasks[task.id] = task
+            if task.parent_task_id:
+                self.children[task.parent_task_id].append(task)
+
+        task_ids = list(self.tasks)
+        if not task_ids:
+            return
+
+        result = db.session.execute(
+            db.select(task_collaborators.c.task_id, task_collaborators.c.user_id)
+            .where(task_collaborators.c.task_id.in_(task_ids))
+            .order_by(task_collaborators.c.task_id, task_collaborators.c.user_id)
+        )
+        for row in result:
+            self.collaborators[row.task_id].append(row.user_id)
+
+        comments = db.session.execute(
+            db.select(Comment).where(Comment.task_id.in_(task_ids)).order_by(Comment.id)
+        ).scalars().all()
+        for comment in comments:
+            self.comment_counts[comment.task_id] += 1
+            if comment.parent_comment_id is None:
+                self.comments[comment.task_id].append(comment)
+            else:
+                self.replies[comment.parent_comment_id].append(comment)
+
+        if comments:
+            result = db.session.execute(
+                db.select(comment_mentions.c.comment_id, comment_mentions.c.user_id)
+                .where(comment_mentions.c.comment_id.in_(
+                    db.select(Comment.id).where(Comment.task_id.in_(task_ids))
+                ))
+                .order_by(comment_mentions.c.comment_id, comment_mentions.c.user_id)
+            )
+            for row in result:
+                self.mentions[row.comment_id].append(row.user_id)
+
+        attachments = db.session.execute(
+            db.select(Attachment).where(Attachment.task_id.in_(task_ids)).order_by(Attachment.id)
+        ).scalars().all()
+        for attachment in attachments:
+            self.attachments[attachment.task_id].append(attachment)
+
+    def comment_json(self, comment):
+        """Same shape as Comment.to_json(), built from the prefetched rows."""
+        replies = self.replies.get(comment.id, [])
+        data = comment.base_json()
+        data.update({
+            'replies': [self.comment_json(reply) for reply in replies],
+            'reply_count': len(replies),
+            'mentions': list(self.mentions.get(comment.id, [])),
+        })
+        return data
+
+    def updated_at(self, task_id):
+        """Newest updated_at in the subtree of task_id: when anything in that tree last changed."""
+        if task_id not in self._freshness:
+            self._freshness[task_id] = _newest(
+                self.tasks[task_id].updated_at,
+                *(self.updated_at(subtask.id) for subtask in self.children.get(task_id, []))
+            )
+        return self._freshness[task_id]
+
+    def task_json(self, task_id):
+        """Same shape as Task.to_json(), built from the prefetched rows."""
+        task = self.tasks[task_id]
+        subtasks = self.children.get(task_id, [])
+        attachments = self.attachments.get(task_id, [])
+        data = task.base_json()
+        data.update({
+            'updated_at': _iso(self.updated_at(task_id)),
+            'collaborator_ids': list(self.collaborators.get(task_id, [])),
+            'subtasks': [self.task_json(subtask.id) for subtask in subtasks],
+            'subtask_count': len(subtasks),
+            'comments': [self.comment_json(comment) for comment in self.comments.get(task_id, [])],
+            'comment_count': self.comment_counts.get(task_id, 0),
+            'attachments': [attachment.to_json() for attachment in attachments],
+            'attachment_count': len(attachments),
+        })
+        return data
+
+    def to_json(self, task_ids=None):
+        """Serialize the given tasks (default: the roots), in order, skipping ids that were not loaded."""
+        if task_ids is None:
+            task_ids = self.root_ids
+        return [self.task_json(task_id) for task_id in task_ids if task_id in self.tasks]
+
+
+def serialize_task_forest(root_ids):
+    """Serialize the tasks in root_ids, with their full subtrees, in a fixed number of queries."""
+    return TaskForest(root_ids).to_json()
+
+
+def serialize_tasks(tasks):
+    """Serialize already-loaded Task rows, preserving their order."""
+    return serialize_task_forest([task.id for task in tasks])
+
+
+def project_task_ids(project_id):
+    """Ids of every task (and subtask) assigned to a project, matching Project.tasks."""
+    result = db.session.execute(
+        db.select(Task.id).where(Task.project_id == project_id).order_by(Task.id)
+    )
+    return [row.id for row in result]
+
+
+def _project_updated_at(project, forest, task_ids):
+    """Newest of the project's own updated_at and those of the task trees in it."""
+    return _newest(project.updated_at, *(forest.updated_at(task_id) for task_id in task_ids if task_id in forest.tasks))
+
+
+def serialize_project(project, forest=None):
+    """
+    Same shape as Project.to_json(). Pass a forest that already covers the project's
+    tasks to reuse it instead of loading a new one.
+    """
+    task_ids = project_task_ids(project.id)
+    if forest is None:
+        forest = TaskForest(task_ids)
+
+    data = project.base_json()
+    data.update({
+        'collaborator_ids': project.collaborator_ids(),
+        'tasks': forest.to_json(task_ids),
+        'updated_at': _iso(_project_updated_at(project, forest, task_ids)),
+    })
+    return data
+
+
+def serialize_projects(projects):
+    """
+    Same shape as Project.to_json() for a list of projects, in a fixed number of queries:
+    collaborators and task ids are fetched for all projects at once and one forest covers every task.
+    """
+    project_ids = [project.id for project in projects]
+    if not project_ids:
+        return []
+
+    collaborators = defaultdict(list)
+    result = db.session.execute(
+        db.select(project_collaborators.c.project_id, project_collaborators.c.user_id)
+        .where(project_collaborators.c.project_id.in_(project_ids))
+    )
+    for row in result:
+        collaborators[row.project_id].append(row.user_id)
+
+    task_ids = defaultdict(list)
+    result = db.session.execute(
+        db.select(Task.project_id, Task.id).where(Task.project_id.in_(project_ids)).order_by(Task.id)
+    )
+    for row in result:
+        task_ids[row.project_id].append(row.id)
+
+    forest = TaskForest([task_id for ids in task_ids.values() for task_id in ids])
+
+    projects_json = []
+    for project in projects:
+        data = project.base_json()
+        data.update({
+            'collaborator_ids': collaborators.get(project.id, []),
+            'tasks': forest.to_json(task_ids.get(project.id, [])),
+            'updated_at': _iso(_project_updated_at(project, forest, task_ids.get(project.id, []))),
+        })
+        projects_json.append(data)
+    return projects_json
+
+
+# ==================== SUMMARY / SPARSE FIELDSETS ====================
+# List views only render a card, so they can ask for a flat projection of each task
+# (?view=summary or ?fields=a,b,c) instead of the full nested tree. Summaries only read
+# the requested task columns (child counts are denormalized onto the task row) plus
+# collaborators when asked for; subtasks, comments, attachments and mentions are never loaded.
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+# Task columns each summary field needs to be loaded
+_SUMMARY_COLUMNS = {
+    'id': ('id',),
+    'title': ('title',),
+    'description': ('description',),
+    'status': ('status',),
+    'deadline': ('deadline',),
+    'owner_id': ('owner_id',),
+    'project_id': ('project_id',),
+    'parent_task_id': ('parent_task_id',),
+    'priority': ('priority',),
+    'is_recurring': ('is_recurring',),
+    'recurrence_interval': ('recurrence_interval',),
+    'recurrence_days': ('recurrence_days',),
+    'recurrence_end_date': ('recurrence_end_date',),
+    'next_recurring_instance': (
+        'is_recurring', 'deadline', 'recurrence_interval', 'recurrence_days', 'recurrence_end_date'
+    ),
+    'created_at': ('created_at',),
+    'version': ('version',),
+    # Counters (see app/counters.py); subtask_count is a subquery in the same SELECT
+    'subtask_count': ('subtask_count',),
+    'comment_count': ('comment_count',),
+    'attachment_count': ('attachment_count',),
+}
+
+# Fields that are not columns of the task row (updated_at is the newest in the subtree)
+_SUMMARY_RELATED_FIELDS = ('updated_at', 'collaborator_ids')
+
+_SUMMARY_FORMATTERS = {
+    'status': lambda task: task.status.value,
+    'deadline': lambda task: _iso(task.deadline),
+    'recurrence_end_date': lambda task: _iso(task.recurrence_end_date),
+    'next_recurring_instance': lambda task: task.next_recurring_instance(),
+    'created_at': lambda task: _iso(task.created_at),
+}
+
+TASK_SUMMARY_FIELDS = tuple(_SUMMARY_COLUMNS) + _SUMMARY_RELATED_FIELDS
+
+# What ?view=summary returns: enough to render a task card or calendar entry
+DEFAULT_SUMMARY_FIELDS = (
+    'id', 'title', 'status', 'deadline', 'owner_id', 'project_id', 'parent_task_id',
+    'priority', 'is_recurring', 'next_recurring_instance', 'updated_at', 'version',
+    'collaborator_ids', 'subtask_count', 'comment_count', 'attachment_count',
+)
+
+
+def parse_task_fields(view=None, fields=None):
+    """
+    Resolve the ?view= and ?fields= query args of a task list endpoint.
+    Returns None for the full nested payload, otherwise the list of summary fields
+    (always including 'id'). Raises ValueError for an unknown view or field.
+    """
+    if fields:
+        requested = [field.strip() for field in fields.split(',') if field.strip()]
+        unknown = [field for field in requested if field not in TASK_SUMMARY_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return list(dict.fromkeys(['id'] + requested))
+
+    if not view or view == 'full':
+        return None
+    if view == 'summary':
+        return list(DEFAULT_SUMMARY_FIELDS)
+    raise ValueError(f"Unknown view: {view}")
+
+
+def serialize_task_summaries(task_ids, fields):
+    """
+    Serialize tasks as flat summaries holding only the requested fields, in the order of task_ids.
+    Costs one query for the task columns, plus one each for updated_at and collaborator_ids
+    when requested.
+    """
+    task_ids = list(dict.fromkeys(task_ids))
+    if not task_ids:
+        return []
+
+    columns = {'id'}
+    for field in fields:
+        columns.update(_SUMMARY_COLUMNS.get(field, ()))
+
+    tasks = db.session.execute(
+        db.select(Task)
+        .options(load_only(*[getattr(Task, column) for column in columns]))
+        .where(Task.id.in_(task_ids))
+    ).scalars().all()
+    tasks_by_id = {task.id: task for task in tasks}
+
+    related = {}
+    if 'updated_at' in fields:
+        # Same value as in the full payload (TaskForest.updated_at): one aggregate over the subtrees
+        subtrees = descendant_rows_query(task_ids).subquery()
+        result = db.session.execute(
+            db.select(subtrees.c.root_id, db.func.max(Task.updated_at))
+            .join(Task, Task.id == subtrees.c.id)
+            .group_by(subtrees.c.root_id)
+        )
+        related['updated_at'] = {root_id: _iso(updated_at) for root_id, updated_at in result}
+    if 'collaborator_ids' in fields:
+        collaborators = defaultdict(list)
+        result = db.session.execute(
+            db.select(task_collaborators.c.task_id, task_collaborators.c.user_id)
+            .where(task_collaborators.c.task_id.in_(task_ids))
+            .order_by(task_collaborators.c.task_id, task_collaborators.c.user_id)
+        )
+        for row in result:
+            collaborators[row.task_id].append(row.user_id)
+        related['collaborator_ids'] = collaborators
+
+    summaries = []
+    for task_id in task_ids:
+        task = tasks_by_id.get(task_id)
+        if task is None:
+            continue
+        summary = {}
+        for field in fields:
+            if field == 'collaborator_ids':
+                summary[field] = list(related[field].get(task_id, []))
+            elif field == 'updated_at':
+                summary[field] = related[field].get(task_id)
+            elif field in _SUMMARY_FORMATTERS:
+                summary[field] = _SUMMARY_FORMATTERS[field](task)
+            else:
+                summary[field] = getattr(task, field)
+        summaries.append(summary)
+    return summaries
+
+
+def serialize_task_list(task_ids, fields=None):
+    """Serialize a task list as full nested trees, or as summaries when fields are given."""
+    if fields is None:
+        return serialize_task_forest(task_ids)
+    return serialize_task_summaries(task_ids, fields)
+
+
+def serialize_project_summary(project):
+    """Project columns and collaborators, without the nested task list."""
+    project_tasks = descendant_ids_query(db.select(Task.id).where(Task.project_id == project.id))
+    newest_task = db.session.execute(
+        db.select(db.func.max(Task.updated_at)).where(Task.id.in_(project_tasks))
+    ).scalar()
+    data = project.base_json()
+    data['collaborator_ids'] = project.collaborator_ids()
+    data['updated_at'] = _iso(_newest(project.updated_at, newest_task))
+    return data
@@ -1,12 +1,20 @@
-from .models import db, Project, Task, Attachment, TaskStatusEnum, project_collaborators, task_collaborators, Comment, comment_mentions, TaskActivityLog
-from sqlalchemy import or_
-from sqlalchemy.orm import aliased
-from datetime import datetime, timedelta, timezone
-from dateutil.relativedelta import relativedelta
+from .models import db, Project, Task, Attachment, TaskStatusEnum, project_collaborators, task_collaborators, task_visibility, Comment, comment_mentions, TaskActivityLog
+from datetime import datetime, timezone
 from .rabbitmq_publisher import publish_status_update
+from .pagination import parse_sort, parse_limit, encode_cursor, decode_cursor, keyset_order_by, keyset_after
+from .visibility import refresh_task_visibility, mark_tasks_changed
+from .hierarchy import closure_enabled, descendant_ids_query, get_subtree_ids, get_ancestors, ancestor_rows_query, cascade_deadline
+from .closure import refresh_task_closure
+from .events import mark_tasks_created
+from .recurrence import series_id, materialized_occurrences, next_open_deadline, expand_occurrences, find_occurrence
+from .cache import invalidate_task_payloads, invalidate_project_payloads
+from .changes import database_now, CHANGE_FEED_OVERLAP
+from .serializers import TaskForest, serialize_task_forest, serialize_task_list, serialize_task_summaries, serialize_project, serialize_projects, serialize_project_summary, project_task_ids
 from werkzeug.utils import secure_filename
 from flask import current_app
 import uuid
+from sqlalchemy.exc import IntegrityError
+from collections import defaultdict
 
 # Helper function to parse datetime strings from frontend
 def parse_datetime_from_frontend(datetime_str):
@@ -40,88 +48,391 @@ def parse_datetime_from_frontend(datetime_str):
         print(f"Error parsing datetime '{datetime_str}': {e}")
         return None
 
+# Query args accepted by GET /tasks to narrow the visible task list
+TASK_FILTER_ARGS = ('status', 'priority_min', 'priority_max', 'deadline_from', 'deadline_to',
+                    'project_id', 'collaborator_id')
+
+# Sort keys accepted by GET /tasks (prefix with '-' for descending)
+TASK_SORT_COLUMNS = {
+    'id': Task.id,
+    'deadline': Task.deadline,
+    'priority': Task.priority,
+    'title': Task.title,
+    'created_at': Task.created_at,
+    'updated_at': Task.updated_at,
+}
+
+def _visible_parent_tasks_query(user_id):
+    """
+    Query of parent tasks visible to a user: owner, direct collaborator,
+    or collaborator on one of the task's subtasks.
+    A single indexed lookup on the task_visibility table.
+    """
+    refresh_task_visibility()
+    return db.session.query(Task.id)\
+        .join(task_visibility, task_visibility.c.root_task_id == Task.id)\
+        .filter(task_visibility.c.user_id == user_id)
+
+def _parse_int_filter(filters, key):
+    value = filters.get(key)
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {key}: {value}")
+
+def _parse_datetime_filter(filters, key):
+    value = filters.get(key)
+    if not value:
+        return None
+    parsed = value if isinstance(value, datetime) else parse_datetime_from_frontend(value)
+    if parsed is None:
+        raise ValueError(f"Invalid {key}: {value}")
+    return parsed
+
+def _apply_task_filters(query, filters):
+    """
+    Narrow a Task query with the GET /tasks filters (see TASK_FILTER_ARGS).
+    All filters are combined with AND. Raises ValueError for malformed values.
+    """
+    if not filters:
+        return query
+
+    if filters.get('status'):
+        status_enums = []
+        for status_str in str(filters['status']).split(','):
+            try:
+                status_enums.append(TaskStatusEnum(status_str.strip()))
+            except ValueError:
+                raise ValueError(f"Invalid status: {status_str.strip()}")
+        query = query.filter(Task.status.in_(status_enums))
+
+    priority_min = _parse_int_filter(filters, 'priority_min')
+    if priority_min is not None:
+        query = query.filter(Task.priority >= priority_min)
+    priority_max = _parse_int_filter(filters, 'priority_max')
+    if priority_max is not None:
+        query = query.filter(Task.priority <= priority_max)
+
+    deadline_from = _parse_datetime_filter(filters, 'deadline_from')
+    if deadline_from is not None:
+        query = query.filter(Task.deadline >= deadline_from)
+    deadline_to = _parse_datetime_filter(filters, 'deadline_to')
+    if deadline_to is not None:
+        query = query.filter(Task.deadline <= deadline_to)
+
+    project_id = _parse_int_filter(filters, 'project_id')
+    if project_id is not None:
+        query = query.filter(Task.project_id == project_id)
+
+    collaborator_id = _parse_int_filter(filters, 'collaborator_id')
+    if collaborator_id is not None:
+        query = query.filter(
+            db.session.query(task_collaborators)
+              .filter(task_collaborators.c.task_id == Task.id)
+              .filter(task_collaborators.c.user_id == collaborator_id)
+              .exists()
+        )
+
+    return query
+
 # Settled
-def get_all_tasks(user_id):
+def get_all_tasks(user_id, fields=None, filters=None, sort=None):
+    """
+    Get every parent task visible to a user (owner, collaborator, or collaborator on a subtask).
+    Returns full nested task trees, or flat summaries when a list of fields is given.
+    filters narrows the list (see TASK_FILTER_ARGS); sort is a key of TASK_SORT_COLUMNS.
+    """
     if not user_id:
         return []
 
-    # Alias for subtasks
-    SubTask = aliased(Task)
-
-    # Step 1: find parent_task_ids where user is a collaborator on a subtask
-    subtask_collab_query = db.session.query(SubTask.parent_task_id)\
-        .join(task_collaborators, task_collaborators.c.task_id == SubTask.id)\
-        .filter(task_collaborators.c.user_id == user_id)\
-        .filter(SubTask.parent_task_id.isnot(None))\
-        .distinct()
-
-    # Step 2: main query for parent tasks
-    tasks_query = db.session.query(Task)\
-        .filter(Task.parent_task_id.is_(None))\
-        .filter(
-            or_(
-                Task.owner_id == user_id,  # owner
-                db.session.query(task_collaborators)
-                  .filter(task_collaborators.c.task_id == Task.id)
-                  .filter(task_collaborators.c.user_id == user_id)
-                  .exists(),  # direct collaborator
-                Task.id.in_(subtask_collab_query)  # collaborator on subtasks
-            )
-        ).distinct()
+    tasks_query = _apply_task_filters(_visible_parent_tasks_query(user_id), filters)
+    if sort:
+        sort_key, descending = parse_sort(sort, TASK_SORT_COLUMNS)
+        tasks_query = tasks_query.order_by(
+            *keyset_order_by(TASK_SORT_COLUMNS[sort_key], Task.id, descending)
+        )
 
-    return tasks_query.all()
+    root_ids = [row.id for row in tasks_query.all()]
+    return serialize_task_list(root_ids, fields)
+
+def get_tasks_page(user_id, limit=None, cursor=None, filters=None, sort=None, fields=None):
+    """
+    One keyset-paginated page of the tasks visible to a user.
+    Returns (tasks, next_cursor); next_cursor is None on the last page.
+    Only limit + 1 ids are read per call, so cost and memory do not grow with the result size.
+    """
+    if not user_id:
+        return [], None
+
+    sort_key, descending = parse_sort(sort, TASK_SORT_COLUMNS)
+    sort_column = TASK_SORT_COLUMNS[sort_key]
+    limit = parse_limit(limit)
+
+    tasks_query = _apply_task_filters(_visible_parent_tasks_query(user_id), filters)
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_key, descending)
+        tasks_query = tasks_query.filter(keyset_after(sort_column, Task.id, descending, value, last_id))
+
+    rows = tasks_query.add_columns(sort_column)\
+        .order_by(*keyset_order_by(sort_column, Task.id, descending))\
+        .limit(limit + 1)\
+        .all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_row = rows[-1]
+        next_cursor = encode_cursor(sort_key, descending, last_row[1], last_row[0])
+
+    return serialize_task_list([row[0] for row in rows], fields), next_cursor
+
+def _visible_parent_task_pairs(user_ids):
+    """
+    Set-based version of _visible_parent_tasks_query for many users at once.
+    Returns a subquery of (user_id, task_id) rows, one per parent task each user can see.
+    """
+    refresh_task_visibility()
+    return db.select(task_visibility.c.user_id, task_visibility.c.root_task_id.label('task_id'))\
+        .where(task_visibility.c.user_id.in_(user_ids))\
+        .subquery('visible_tasks')
+
+def get_tasks_for_owners(owner_ids, fields=None, filters=None, sort=None):
+    """
+    Batch version of get_all_tasks for a team, department or company schedule.
+    Resolves visibility for every user in one query and serializes each task once,
+    even when several members share it.
+    Returns {owner_id: [tasks]} with an entry (possibly empty) for every requested owner.
+    """
+    owner_ids = list(dict.fromkeys(int(owner_id) for owner_id in owner_ids))
+    if not owner_ids:
+        return {}
+
+    pairs = _visible_parent_task_pairs(owner_ids)
+    tasks_query = db.session.query(pairs.c.user_id, Task.id)\
+        .join(Task, Task.id == pairs.c.task_id)
+    tasks_query = _apply_task_filters(tasks_query, filters)
+
+    sort_key, descending = parse_sort(sort, TASK_SORT_COLUMNS)
+    tasks_query = tasks_query.order_by(
+        *keyset_order_by(TASK_SORT_COLUMNS[sort_key], Task.id, descending)
+    )
+
+    task_ids_by_owner = {owner_id: [] for owner_id in owner_ids}
+    for user_id, task_id in tasks_query.all():
+        task_ids_by_owner[user_id].append(task_id)
+
+    all_task_ids = [task_id for task_ids in task_ids_by_owner.values() for task_id in task_ids]
+    serialized = {task['id']: task for task in serialize_task_list(all_task_ids, fields)}
+
+    return {
+        owner_id: [serialized[task_id] for task_id in task_ids if task_id in serialized]
+        for owner_id, task_ids in task_ids_by_owner.items()
+    }
+
+def get_task_occurrences(user_id, start, end):
+    """
+    Virtual occurrences, within [start, end), of the recurring tasks visible to a user (at any
+    depth), for calendar views. Real rows (current occurrences included) come from GET /tasks
+    as usual. Costs two queries. Raises ValueError for a missing or invalid range.
+    """
+    start = _parse_datetime_filter({'start': start}, 'start')
+    end = _parse_datetime_filter({'end': end}, 'end')
+    if start is None or end is None:
+        raise ValueError("start and end are required")
+
+    visible = descendant_ids_query(_visible_parent_tasks_query(user_id))
+    tasks = db.session.execute(
+        db.select(Task).where(Task.id.in_(visible), Task.is_recurring.is_(True), Task.deadline.is_not(None))
+    ).scalars().all()
+    return expand_occurrences(tasks, start, end)
+
+def update_occurrence(occurrence_id, user_id, task_data, comment):
+    """
+    Edit or complete a virtual occurrence: the occurrence is materialized as a row (a copy of
+    its series' current row and subtasks, at the occurrence's deadline, not recurring itself)
+    and then updated with update_task, in the same transaction. An occurrence that already has
+    a row is simply updated, including when a concurrent request materializes it first (the
+    unique index on the occurrence rejects the second copy). Returns update_task's (task, message).
+    Raises ValueError for a malformed occurrence id.
+    """
+    try:
+        task, scheduled, existing_id = find_occurrence(occurrence_id)
+        if existing_id is not None:
+            return update_task(existing_id, user_id, task_data, comment)
+        if task is None:
+            return None, "Occurrence not found"
+
+        is_collaborator = db.session.execute(
+            db.select(task_collaborators.c.task_id).where(
+                task_collaborators.c.task_id == task.id,
+                task_collaborators.c.user_id == user_id
+            ).limit(1)
+        ).first() is not None
+        if task.owner_id != user_id and not is_collaborator:
+            return None, "Forbidden: You do not have permission to edit this task."
+
+        try:
+            copies = _copy_task_trees([task], [_occurrence_values(task, scheduled, is_recurring=False, occurrence_at=scheduled)])
+        except IntegrityError:
+            # Materialized by a concurrent request: update the row it created
+            db.session.rollback()
+            _, _, existing_id = find_occurrence(occurrence_id)
+            if existing_id is None:
+                raise
+            return update_task(existing_id, user_id, task_data, comment)
+        result, message = update_task(copies[task.id], user_id, task_data, comment)
+        if result is None:
+            # Nothing to keep: the occurrence stays virtual
+            db.session.rollback()
+        return result, message
+    except Exception as e:
+        print(f"Error in update_occurrence: {e}")
+        db.session.rollback()
+        raise e
+
+# Page size of the deadline feed (rows are small, so pages can be larger than task list pages)
+DEADLINE_FEED_PAGE_SIZE = 500
+DEADLINE_FEED_MAX_PAGE_SIZE = 2000
+
+def get_deadline_feed(deadline_from=None, deadline_to=None, updated_since=None, limit=None):
+    """
+    Flat rows (id, title, deadline, status, owner_id, parent_task_id, collaborator_ids) for the
+    notification scheduler, ordered by (updated_at, id).
+
+    Without updated_since this is a snapshot of every non-completed task with a deadline in the
+    window. With the cursor returned by a previous call, only tasks updated since then are returned,
+    including ones that were completed or lost their deadline so the consumer can drop them.
+    Returns (tasks, next_cursor, has_more); pass next_cursor back as updated_since on the next call.
+
+    Like GET /changes, next_cursor never passes the database clock minus CHANGE_FEED_OVERLAP, so a
+    task stamped by a transaction still in flight is returned by a later call: rows of the last few
+    seconds can be returned twice, and consumers de-duplicate by id. Adding or removing
+    collaborators stamps the task, so collaborator_ids changes are fed too.
+    Costs three or four queries per page. Raises ValueError for a malformed window or cursor.
+    """
+    filters = {'deadline_from': deadline_from, 'deadline_to': deadline_to}
+    window_start = _parse_datetime_filter(filters, 'deadline_from')
+    window_end = _parse_datetime_filter(filters, 'deadline_to')
+    limit = DEADLINE_FEED_PAGE_SIZE if limit is None else max(1, min(int(limit), DEADLINE_FEED_MAX_PAGE_SIZE))
+    horizon = (database_now() - CHANGE_FEED_OVERLAP, 0)
+
+    in_window = Task.deadline.isnot(None)
+    if window_start:
+        in_window = db.and_(in_window, Task.deadline >= window_start)
+    if window_end:
+        in_window = db.and_(in_window, Task.deadline <= window_end)
+
+    query = db.select(
+        Task.id, Task.title, Task.deadline, Task.status,
+        Task.owner_id, Task.parent_task_id, Task.updated_at
+    )
+    if updated_since:
+        value, last_id = decode_cursor(updated_since, 'updated_at', False)
+        query = query.where(
+            keyset_after(Task.updated_at, Task.id, False, value, last_id),
+            db.or_(Task.deadline.is_(None), in_window)
+        )
+        latest = None
+    else:
+        query = query.where(in_window, Task.status != TaskStatusEnum.COMPLETED)
+        # A complete snapshot covers every task up to the most recently updated one, so the
+        # next call does not report the completed and deadline-less tasks it skipped.
+        # Read before the snapshot: a task changed in between is reported twice, never lost.
+        latest = db.session.execute(
+            db.select(Task.updated_at, Task.id)
+            .order_by(*keyset_order_by(Task.updated_at, Task.id, True))
+            .limit(1)
+        ).first()
+
+    rows = db.session.execute(
+        query.order_by(*keyset_order_by(Task.updated_at, Task.id, False)).limit(limit + 1)
+    ).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if has_more or latest is None:
+        position = (rows[-1].updated_at, rows[-1].id) if rows else None
+    else:
+        position = (latest.updated_at, latest.id)
+    if position is None:
+        next_cursor = updated_since
+    else:
+        if position > horizon:
+            # Caught up with the recent past: resume from the horizon on the next poll
+            position, has_more = horizon, False
+        next_cursor = encode_cursor('updated_at', False, *position)
+    if not rows:
+        return [], next_cursor, False
+
+    collaborators = get_collaborators_for_tasks([row.id for row in rows])
+    tasks = [{
+        'id': row.id,
+        'title': row.title,
+        'deadline': row.deadline.isoformat() if row.deadline else None,
+        'status': row.status.value,
+        'owner_id': row.owner_id,
+        'parent_task_id': row.parent_task_id,
+        'collaborator_ids': collaborators[row.id],
+    } for row in rows]
+    return tasks, next_cursor, has_more
+
+def _task_values(task_data):
+    """Column values of a new task from its request data (deadlines are UTC ISO strings or datetimes)."""
+    # Parse deadline if provided (now expects UTC ISO format from frontend)
+    deadline = None
+    if task_data.get('deadline'):
+        if isinstance(task_data['deadline'], str):
+            deadline = parse_datetime_from_frontend(task_data['deadline'])
+        elif isinstance(task_data['deadline'], datetime):
+            deadline = task_data['deadline']
+
+    # Parse recurrence end date if provided (now expects UTC ISO format from frontend)
+    recurrence_end_date = None
+    if task_data.get('recurrence_end_date'):
+        if isinstance(task_data['recurrence_end_date'], str):
+            recurrence_end_date = parse_datetime_from_frontend(task_data['recurrence_end_date'])
+        elif isinstance(task_data['recurrence_end_date'], datetime):
+            recurrence_end_date = task_data['recurrence_end_date']
+
+    status = TaskStatusEnum.UNASSIGNED
+    if task_data.get('status'):
+        try:
+            # Directly find the enum member by its value (e.g., 'Under Review')
+            status = TaskStatusEnum(task_data['status'])
+        except ValueError:
+            status = TaskStatusEnum.UNASSIGNED
+
+    return dict(
+        title=task_data['title'],
+        description=task_data.get('description'),
+        deadline=deadline,
+        status=status,
+        owner_id=task_data['owner_id'],
+        project_id=task_data.get('project_id'),
+        parent_task_id=task_data.get('parent_task_id'),
+        priority=task_data.get('priority'),
+        is_recurring=task_data.get('is_recurring', False),
+        recurrence_interval=task_data.get('recurrence_interval'),
+        recurrence_days=task_data.get('recurrence_days'),
+        recurrence_end_date=recurrence_end_date
+    )
 
 def create_task(task_data):
     #Create a new task
     try:
         print(f"Creating task with data: {task_data}")
 
-        # Parse deadline if provided (now expects UTC ISO format from frontend)
-        deadline = None
-        if task_data.get('deadline'):
-            if isinstance(task_data['deadline'], str):
-                deadline = parse_datetime_from_frontend(task_data['deadline'])
-            elif isinstance(task_data['deadline'], datetime):
-                deadline = task_data['deadline']
-
-        # Parse recurrence end date if provided (now expects UTC ISO format from frontend)
-        recurrence_end_date = None
-        if task_data.get('recurrence_end_date'):
-            if isinstance(task_data['recurrence_end_date'], str):
-                recurrence_end_date = parse_datetime_from_frontend(task_data['recurrence_end_date'])
-            elif isinstance(task_data['recurrence_end_date'], datetime):
-                recurrence_end_date = task_data['recurrence_end_date']
-
-        status = TaskStatusEnum.UNASSIGNED
-        if task_data.get('status'):
-            try:
-                # Directly find the enum member by its value (e.g., 'Under Review')
-                status = TaskStatusEnum(task_data['status'])
-            except ValueError:
-                status = TaskStatusEnum.UNASSIGNED
         # Create new task
-        new_task = Task(
-            title=task_data['title'],
-            description=task_data.get('description'),
-            deadline=deadline,
-            status=status,
-            owner_id=task_data['owner_id'],
-            project_id=task_data.get('project_id'),
-            parent_task_id=task_data.get('parent_task_id'),
-            priority=task_data.get('priority'),
-            is_recurring=task_data.get('is_recurring', False),
-            recurrence_interval=task_data.get('recurrence_interval'),
-            recurrence_days=task_data.get('recurrence_days'),
-            recurrence_end_date=recurrence_end_date
-        )
+        new_task = Task(**_task_values(task_data))
         
         #Add to database
         db.session.add(new_task)
         db.session.flush()
 
-        if new_task.project_id:
-            project = Project.query.get(new_task.project_id)
-            _touch_project(project)
+        # The project's freshness is derived from its tasks; only its cached payload goes
+        invalidate_project_payloads([new_task.project_id])
         
         collaborators_to_add = set(task_data.get('collaborators_to_add', []))
         collaborators_to_add.add(new_task.owner_id)
@@ -136,55 +447,38 @@ def create_task(task_data):
         db.session.rollback()
         raise e
 
-def _log_task_activity(user_id, task_id, field, old_val, new_val):
+def update_task(task_id, user_id, task_data, comment, expected_version=None):
     """
-    Helper function to create and add a log entry to the session.
-    We convert values to string for generic storage.
+    Update an existing task in one transaction.
+    The whole request is validated before anything is written; the field changes are then
+    logged with one multi-row INSERT, the optional comment is added in the same transaction,
+    and the status update is published once the commit succeeded.
+    expected_version (from If-Match) makes the write conditional: a stale one is a Conflict.
+    Without it the write is unconditional and the last one wins.
     """
-    if old_val is None:
-        old_val = "None"
-    if new_val is None:
-        new_val = "None"
-        
-    log_entry = TaskActivityLog(
-        task_id=task_id,
-        user_id=user_id,
-        field_changed=str(field).lower(),
-        old_value=str(old_val),
-        new_value=str(new_val),
-        timestamp=datetime.utcnow()
-    )
-    db.session.add(log_entry)
-
-def update_task(task_id, user_id, task_data, comment):
-    #Update an existing task
     try:
-        task = Task.query.get(task_id)
+        task = db.session.get(Task, task_id)
         if not task:
             return None, "Task not found"
 
         # Check if tasks belongs to user
         is_owner = (task.owner_id == user_id)
-        is_collaborator = user_id in task.collaborator_ids()
-
         if not is_owner:
+            is_collaborator = db.session.execute(
+                db.select(task_collaborators.c.task_id).where(
+                    task_collaborators.c.task_id == task_id,
+                    task_collaborators.c.user_id == user_id
+                ).limit(1)
+            ).first() is not None
             if not is_collaborator:
                 return None, "Forbidden: You do not have permission to edit this task."
             # Check if collaborator is trying to change anything *other* than status
             if any(field != 'status' for field in task_data):
                 return None, "Forbidden: Collaborators can only update the task's status."
 
-        # Track status change for RabbitMQ (your existing logic)
-        old_status_for_rabbitmq = None
-        status_changed_for_rabbitmq = False
+        if expected_version is not None and expected_version != task.version:
+            return None, _version_conflict('task', task.version)
 
-        _update_timestamps_cascade(task)
-
-        current_time = db.func.now() # Your existing logic
-
-        # --- MODIFIED: We iterate field by field to log changes ---
-
-        fields_to_skip = ['id', 'owner_id', 'collaborators_to_add', 'collaborators_to_remove']
         if task.status == TaskStatusEnum.COMPLETED:
             # Find all fields in the update request that are NOT 'status'
             non_status_fields = [key for key in task_data.keys() if key != 'status']
@@ -193,6 +487,10 @@ def update_task(task_id, user_id, task_data, comment):
             if non_status_fields:
                 return None, f"Cannot edit fields ({', '.join(non_status_fields)}) on a completed task. You can only change its status."
 
+        # --- Collect the changes as (attribute, logged field, old value, new value) before writing anything ---
+        changes = []
+        old_status = task.status
+        fields_to_skip = ['id', 'owner_id', 'collaborators_to_add', 'collaborators_to_remove', 'version']
         for field, data in task_data.items():
             if field in fields_to_skip:
                 continue
@@ -200,258 +498,341 @@ def update_task(task_id, user_id, task_data, comment):
             if field == 'deadline' and data:
                 new_deadline = parse_datetime_from_frontend(data) if isinstance(data, str) else data
                 if new_deadline and new_deadline != task.deadline:
-                    # --- LOGGING ---
-                    _log_task_activity(user_id, task.id, 'deadline', task.deadline, new_deadline)
-                    # --- END LOGGING ---
-                    task.deadline = new_deadline
-                    _cascade_parent_deadline_to_subtasks(task, task.deadline)
+                    changes.append(('deadline', 'deadline', task.deadline, new_deadline))
 
             elif field == 'recurring_end_date' and data:
                 new_recur_end = parse_datetime_from_frontend(data) if isinstance(data, str) else data
                 if new_recur_end and new_recur_end != task.recurrence_end_date:
-                    # --- LOGGING ---
-                    _log_task_activity(user_id, task.id, 'recurring_end_date', task.recurrence_end_date, new_recur_end)
-                    # --- END LOGGING ---
-                    task.recurrence_end_date = new_recur_end
-                    
+                    changes.append(('recurrence_end_date', 'recurring_end_date', task.recurrence_end_date, new_recur_end))
+
             elif field == 'status':
                 try:
                     new_status_enum = TaskStatusEnum(data)
-                    
-                    if task.status != new_status_enum:
-                        # Validate subtasks before completing
-                        if new_status_enum == TaskStatusEnum.COMPLETED:
-                            if not _are_all_subtasks_completed(task):
-                                return None, "Cannot mark task as completed while it has incomplete subtasks."
-                        
-                        # --- LOGGING ---
-                        _log_task_activity(user_id, task.id, 'status', task.status.value, data)
-                        # --- END LOGGING ---
-
-                        # Keep your RabbitMQ logic
-                        old_status_for_rabbitmq = task.status.value
-                        status_changed_for_rabbitmq = True
-                        
-                        task.status = new_status_enum
-                    
                 except ValueError:
                     return None, "Invalid status value"
-                    
+                if task.status != new_status_enum:
+                    # Validate subtasks before completing
+                    if new_status_enum == TaskStatusEnum.COMPLETED and not _are_all_subtasks_completed(task):
+                        return None, "Cannot mark task as completed while it has incomplete subtasks."
+                    changes.append(('status', 'status', task.status, new_status_enum))
+
             elif hasattr(task, field):
-                # --- LOGGING for all other generic fields (title, description, priority, etc) ---
+                # All other generic fields (title, description, priority, etc)
                 old_val = getattr(task, field)
                 if old_val != data:
-                    _log_task_activity(user_id, task.id, field, old_val, data)
-                    setattr(task, field, data)
-                # --- END LOGGING ---
-        if comment and isinstance(comment, str) and comment.strip():
-            comment_data = {
-                'body': comment.strip(),
-                'author_id': user_id,
-                'mention_ids': []  # Add mentions if needed
-            }
-            try:
-                add_comment(task_id, comment_data)
-                print(f"✓ Comment added for task {task_id}")
-            except Exception as comment_err:
-                print(f"⚠️ Failed to add comment: {comment_err}")
-        db.session.commit()
+                    changes.append((field, field, old_val, data))
+
+        # First write, before anything is flushed: a stale expected_version fails here, with
+        # nothing else written yet
+        if not _bump_version(Task, task.id, expected_version):
+            db.session.rollback()
+            current = db.session.get(Task, task_id)
+            if current is None:
+                return None, "Task not found"
+            return None, _version_conflict('task', current.version)
+
+        # --- Apply them, collecting the activity log rows ---
+        # Stamped before anything is flushed, so it goes out with the field changes
+        _update_timestamps_cascade(task)
+        activity = []
+        for attribute, logged_field, old_val, new_val in changes:
+            if attribute == 'status':
+                activity.append(_activity_row(user_id, task.id, 'status', old_val.value, new_val.value))
+            else:
+                activity.append(_activity_row(user_id, task.id, logged_field, old_val, new_val))
+            setattr(task, attribute, new_val)
+            if attribute == 'deadline':
+                _cascade_parent_deadline_to_subtasks(task, new_val)
 
-        # --- MODIFIED: Handle Owner/Collaborator changes with logging ---
+        # --- Owner/Collaborator changes ---
         if is_owner:
             collaborators_to_add = set(task_data.get('collaborators_to_add', []))
 
             new_owner_id = task_data.get('owner_id')
             if new_owner_id and int(new_owner_id) != task.owner_id:
-                # --- LOGGING ---
-                _log_task_activity(user_id, task.id, 'owner_id', task.owner_id, new_owner_id)
-                # --- END LOGGING ---
+                activity.append(_activity_row(user_id, task.id, 'owner_id', task.owner_id, new_owner_id))
                 task.owner_id = int(new_owner_id)
-                collaborators_to_add.add(task.owner_id) # Your existing logic
+                collaborators_to_add.add(task.owner_id)
 
             if collaborators_to_add:
-                # --- LOGGING ---
                 # Log the IDs of users being added
-                _log_task_activity(user_id, task.id, 'collaborators_added', '', ", ".join(map(str, collaborators_to_add)))
-                # --- END LOGGING ---
-                _add_collaborators_to_parents(task, collaborators_to_add) # Your existing logic
+                activity.append(_activity_row(user_id, task.id, 'collaborators_added', '', ", ".join(map(str, collaborators_to_add))))
+                _add_collaborators_to_parents(task, collaborators_to_add)
 
             collaborators_to_remove = set(task_data.get('collaborators_to_remove', []))
             if collaborators_to_remove:
-                # --- LOGGING ---
                 # Log the IDs of users being removed
-                _log_task_activity(user_id, task.id, 'collaborators_removed', '', ", ".join(map(str, collaborators_to_remove)))
-                # --- END LOGGING ---
-                _remove_collaborators_from_subtasks(task, collaborators_to_remove) # Your existing logic
+                activity.append(_activity_row(user_id, task.id, 'collaborators_removed', '', ", ".join(map(str, collaborators_to_remove))))
+                _remove_collaborators_from_subtasks(task, collaborators_to_remove)
+
+        if activity:
+            db.session.execute(TaskActivityLog.__table__.insert(), activity)
 
-        #RECURRENCE LOGIC (Your existing logic)
+        new_comment, mention_ids = None, None
+        if comment and isinstance(comment, str) and comment.strip():
+            new_comment, mention_ids = _add_comment(task, {
+                'body': comment.strip(),
+                'author_id': user_id,
+                'mention_ids': []  # Add mentions if needed
+            })
+            print(f"✓ Comment added for task {task_id}")
+
+        #RECURRENCE LOGIC
         if 'status' in task_data and task.status == TaskStatusEnum.COMPLETED:
             if task.is_recurring:
-                _create_next_recurring_task(task)
+                _create_next_recurring_tasks([task])
 
-        # Commit all changes (Task updates AND new Log entries)
+        # One commit for the task, its log entries, its comment and the cascades
         db.session.commit()
 
-        # Publish to RabbitMQ if status changed (Your existing logic)
-        if status_changed_for_rabbitmq:
+        if mention_ids:
+            _publish_mention_alerts(new_comment, mention_ids)
+
+        # Publish to RabbitMQ if status changed
+        if task.status != old_status:
             try:
                 from .rabbitmq_publisher import publish_status_update
                 
                 publish_status_update(
                     task_id=task.id,
-                    old_status=old_status_for_rabbitmq,
+                    old_status=old_status.value,
                     new_status=task.status.value,
                     changed_by_id=user_id
                 )
             except Exception as e:
                 print(f"⚠️ Failed to publish to RabbitMQ: {e}")
 
-        return task.to_json(), "Task updated successfully"
+        return serialize_task_forest([task.id])[0], "Task updated successfully"
     
     except Exception as e:
         print(f"Error in update_task: {e}")
         db.session.rollback()
         raise e
 
-def _create_next_recurring_task(completed_task):
-    #Creates the next instance of a recurring task.
-    if completed_task.recurrence_end_date and datetime.utcnow() >= completed_task.recurrence_end_date:
-        print(f"Recurrence for task {completed_task.id} ended. Current time is past recurrence end date.")
-        # Mark the old task as no longer the active recurring one
-        completed_task.is_recurring = False
-        return
+def update_tasks_status(user_id, updates):
+    """
+    Change the status of many tasks in one transaction (POST /tasks/status:bulk).
+    updates is a list of {"task_id", "status"}. All transitions are checked before anything is
+    written, with the rules of update_task: the user owns or collaborates on every task, and a
+    task is only completed if each of its subtasks is completed already or in the same request.
+    The statuses, the activity log rows and the next instances of completed recurring tasks are
+    then written with a few set-based statements, committed once, and announced to the
+    notification service in one message.
+    Returns ({"updated": [...], "recurring": [...]}, None), or (None, error) if a transition is
+    refused, in which case nothing is written. Raises ValueError for a malformed request.
+    """
+    if not user_id:
+        raise ValueError("user_id is required")
+    if not isinstance(updates, list) or not updates:
+        raise ValueError("updates must be a non-empty list")
+    if len(updates) > MAX_BULK_TASKS:
+        raise ValueError(f"A bulk request updates at most {MAX_BULK_TASKS} tasks")
+
+    new_statuses = {}
+    for update in updates:
+        if not isinstance(update, dict) or update.get('task_id') is None or 'status' not in update:
+            raise ValueError("Each update needs a task_id and a status")
+        try:
+            task_id = int(update['task_id'])
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid task_id: {update['task_id']!r}")
+        if task_id in new_statuses:
+            raise ValueError(f"Task {task_id} is listed more than once")
+        try:
+            new_statuses[task_id] = TaskStatusEnum(update['status'])
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid status value for task {task_id}")
 
-    next_deadline = _calculate_next_due_date(
-        completed_task.deadline, 
-        completed_task.recurrence_interval, 
-        completed_task.recurrence_days
-    )
-    if completed_task.recurrence_end_date and next_deadline and next_deadline >= completed_task.recurrence_end_date:
-        print(f"Recurrence for task {completed_task.id} stopping. Next deadline {next_deadline} is past recurrence end date {completed_task.recurrence_end_date}.")
-        # Mark the old task as no longer the active recurring one
-        completed_task.is_recurring = False
-        return # Do not create the new task
-
-    new_task = Task(
-        title=completed_task.title,
-        description=completed_task.description,
-        deadline=next_deadline,
-        status=TaskStatusEnum.UNASSIGNED,
-        owner_id=completed_task.owner_id,
-        project_id=completed_task.project_id,
-        parent_task_id=completed_task.parent_task_id,
-        priority=completed_task.priority,
-        is_recurring=True,
-        recurrence_interval=completed_task.recurrence_interval,
-        recurrence_days=completed_task.recurrence_days,
-        recurrence_end_date=completed_task.recurrence_end_date
-    )
+    try:
+        tasks = {task.id: task for task in Task.query.filter(Task.id.in_(list(new_statuses)))}
+        missing = [task_id for task_id in new_statuses if task_id not in tasks]
+        if missing:
+            return None, f"Task not found: {missing}"
+
+        collaborating = set(db.session.execute(
+            db.select(task_collaborators.c.task_id).where(
+                task_collaborators.c.task_id.in_(list(tasks)),
+                task_collaborators.c.user_id == user_id
+            )
+        ).scalars())
+        forbidden = [task_id for task_id, task in tasks.items() if task.owner_id != user_id and task_id not in collaborating]
+        if forbidden:
+            return None, f"Forbidden: You do not have permission to edit tasks {forbidden}."
+
+        changes = [(tasks[task_id], status) for task_id, status in new_statuses.items() if tasks[task_id].status != status]
+        completing = [task.id for task, status in changes if status == TaskStatusEnum.COMPLETED]
+        if completing:
+            subtasks = db.session.execute(
+                db.select(Task.id, Task.parent_task_id, Task.status).where(Task.parent_task_id.in_(completing))
+            ).all()
+            blocked = sorted({
+                row.parent_task_id for row in subtasks
+                if new_statuses.get(row.id, row.status) != TaskStatusEnum.COMPLETED
+            })
+            if blocked:
+                return None, f"Cannot mark tasks {blocked} as completed while they have incomplete subtasks."
+
+        updated, activity = [], []
+        for task, status in changes:
+            updated.append({'task_id': task.id, 'old_status': task.status.value, 'new_status': status.value})
+            activity.append(_activity_row(user_id, task.id, 'status', task.status.value, status.value))
+            task.status = status
+
+        recurring = {}
+        if changes:
+            db.session.execute(TaskActivityLog.__table__.insert(), activity)
+            # Edits prepared against the old versions (If-Match) must now fail
+            db.session.execute(
+                db.update(Task).where(Task.id.in_([task.id for task, _ in changes])).values(version=Task.version + 1)
+            )
+            _update_timestamps_cascade_many([task for task, _ in changes])
+            recurring = _create_next_recurring_tasks([
+                task for task, status in changes if status == TaskStatusEnum.COMPLETED and task.is_recurring
+            ])
+        db.session.commit()
 
-    # --- FIX: Add and flush the new task to get its ID ---
-    db.session.add(new_task)
-    db.session.flush() # This assigns an ID to new_task without committing
-
-    # --- Now this block will work correctly ---
-    collaborator_ids_to_copy = completed_task.collaborator_ids()
-    if collaborator_ids_to_copy: # Check if there are any collaborators
-        # You can build a list of dictionaries for a bulk insert
-        new_collaborators = [
-            {'task_id': new_task.id, 'user_id': user_id}
-            for user_id in collaborator_ids_to_copy
-        ]
-        db.session.execute(task_collaborators.insert(), new_collaborators)
+        if updated:
+            try:
+                from .rabbitmq_publisher import publish_status_updates
+                publish_status_updates(updated, changed_by_id=user_id)
+            except Exception as e:
+                print(f"⚠️ Failed to publish to RabbitMQ: {e}")
+
+        return {
+            'updated': updated,
+            'recurring': [{'task_id': task_id, 'next_task_id': next_id} for task_id, next_id in recurring.items()]
+        }, None
+    except Exception as e:
+        print(f"Error in update_tasks_status: {e}")
+        db.session.rollback()
+        raise
 
-    # --- Subtask copying logic remains the same ---
-    for subtask_to_copy in completed_task.subtasks:
-        # (Consider implementing the relative deadline logic here)
-        new_subtask_deadline = subtask_to_copy.deadline # Or calculate a new one
+def _create_next_recurring_tasks(completed_tasks):
+    """
+    Create the next instances of completed recurring tasks: the next instances, copies of their
+    subtasks and the collaborators of both are inserted with one statement each.
+    Occurrences that were already materialized from the calendar expansion are skipped.
+    Returns {completed task id: id of its next instance}. Does NOT commit.
+    """
+    materialized = materialized_occurrences({series_id(task) for task in completed_tasks})
+    sources, rows = [], []
+    for task in completed_tasks:
+        # Whatever happens, the completed task is no longer the active recurring one
+        task.is_recurring = False
+        next_deadline = next_open_deadline(task, materialized[series_id(task)])
+        if not next_deadline:
+            continue
+        sources.append(task)
+        rows.append(_occurrence_values(task, next_deadline, is_recurring=True))
+    return _copy_task_trees(sources, rows)
+
+def _occurrence_values(task, deadline, is_recurring, occurrence_at=None):
+    """Column values of a new occurrence of task's series, not started yet."""
+    return dict(
+        title=task.title,
+        description=task.description,
+        deadline=deadline,
+        status=TaskStatusEnum.UNASSIGNED,
+        owner_id=task.owner_id,
+        project_id=task.project_id,
+        parent_task_id=task.parent_task_id,
+        priority=task.priority,
+        is_recurring=is_recurring,
+        recurrence_interval=task.recurrence_interval,
+        recurrence_days=task.recurrence_days,
+        recurrence_end_date=task.recurrence_end_date,
+        recurrence_series_id=series_id(task),
+        recurrence_occurrence_at=occurrence_at
+    )
 
-        new_subtask = Task(
-            title=subtask_to_copy.title,
-            description=subtask_to_copy.description,
-            deadline=new_subtask_deadline,
+def _copy_task_trees(sources, rows):
+    """
+    Inserts rows as copies of the sources, with copies of their direct subtasks and of the
+    collaborators of both, using one statement each. Returns {source id: id of its copy}.
+    Does NOT commit.
+    """
+    if not rows:
+        return {}
+
+    next_ids = dict(zip((task.id for task in sources), _insert_tasks(rows)))
+
+    subtasks = db.session.execute(
+        db.select(Task.id, Task.title, Task.description, Task.deadline, Task.owner_id,
+                  Task.project_id, Task.priority, Task.parent_task_id)
+        .where(Task.parent_task_id.in_(list(next_ids)))
+        .order_by(Task.id)
+    ).all()
+    subtask_ids = _insert_tasks([
+        dict(
+            title=subtask.title,
+            description=subtask.description,
+            deadline=subtask.deadline,
             status=TaskStatusEnum.UNASSIGNED,
-            owner_id=subtask_to_copy.owner_id,
-            project_id=subtask_to_copy.project_id,
-            priority=subtask_to_copy.priority,
-            parent_task=new_task
+            owner_id=subtask.owner_id,
+            project_id=subtask.project_id,
+            priority=subtask.priority,
+            parent_task_id=next_ids[subtask.parent_task_id]
         )
-        
-        db.session.add(new_subtask)
-        db.session.flush() # Flush to get the subtask's ID
-
-        subtask_collaborator_ids = subtask_to_copy.collaborator_ids()
-        if subtask_collaborator_ids:
-            new_sub_collaborators = [
-                {'task_id': new_subtask.id, 'user_id': user_id}
-                for user_id in subtask_collaborator_ids
-            ]
-            db.session.execute(task_collaborators.insert(), new_sub_collaborators)
-    
-    # Mark the old task as no longer the active recurring one
-    completed_task.is_recurring = False
-
-def _calculate_next_due_date(current_deadline, interval, custom_days):
-    #Calculates the next due date based on the recurrence interval.
-    if not current_deadline:
-        return None # Cannot calculate next date without a starting point
-
-    if interval == 'daily':
-        return current_deadline + timedelta(days=1)
-    elif interval == 'weekly':
-        return current_deadline + timedelta(weeks=1)
-    elif interval == 'monthly':
-        return current_deadline + relativedelta(months=1)
-    elif interval == 'custom' and custom_days:
-        return current_deadline + timedelta(days=custom_days)
-    
-    return None
+        for subtask in subtasks
+    ])
+    copies = dict(next_ids)
+    copies.update(zip((subtask.id for subtask in subtasks), subtask_ids))
+
+    links = db.session.execute(
+        db.select(task_collaborators.c.task_id, task_collaborators.c.user_id)
+        .where(task_collaborators.c.task_id.in_(list(copies)))
+    ).all()
+    if links:
+        db.session.execute(task_collaborators.insert(), [
+            {'task_id': copies[link.task_id], 'user_id': link.user_id} for link in links
+        ])
+    return next_ids
 
 def _add_collaborators_to_parents(task, collaborator_ids):
     """
     Helper function to add a set of collaborators to a task and cascade up to all its parents.
+    The chain of parents is read with one recursive query, and the missing
+    task/project collaborator rows are inserted in one statement each.
     """
     if not collaborator_ids:
         return
 
-    updated_project_ids = set()
+    ancestors = get_ancestors(task.id)
+    task_ids = [row.id for row in ancestors]
+    project_ids = list(dict.fromkeys(row.project_id for row in ancestors if row.project_id))
+    collaborator_ids = sorted(collaborator_ids)
 
-    current_task_node = task
-    while current_task_node:
-        result = db.session.execute(
-            db.select(task_collaborators.c.user_id).where(
-                task_collaborators.c.task_id == current_task_node.id
-            )
+    result = db.session.execute(
+        db.select(task_collaborators.c.task_id, task_collaborators.c.user_id).where(
+            task_collaborators.c.task_id.in_(task_ids),
+            task_collaborators.c.user_id.in_(collaborator_ids)
         )
-        existing_collab_ids = {row.user_id for row in result}
-        
-        new_for_this_task = collaborator_ids - existing_collab_ids
-        
-        if new_for_this_task:
-            db.session.execute(task_collaborators.insert(), [
-                {'task_id': current_task_node.id, 'user_id': collab_id} for collab_id in new_for_this_task
-            ])
-        
-        project_id = current_task_node.project_id
+    )
+    existing_task_collabs = {(row.task_id, row.user_id) for row in result}
+    new_task_collabs = [
+        {'task_id': task_id, 'user_id': collab_id}
+        for task_id in task_ids for collab_id in collaborator_ids
+        if (task_id, collab_id) not in existing_task_collabs
+    ]
+    if new_task_collabs:
+        db.session.execute(task_collaborators.insert(), new_task_collabs)
+        _touch_tasks({row['task_id'] for row in new_task_collabs})
 
-        if project_id and project_id not in updated_project_ids:
-            result = db.session.execute(
-                db.select(project_collaborators.c.user_id).where(
-                    project_collaborators.c.project_id == project_id
-                )
+    if project_ids:
+        result = db.session.execute(
+            db.select(project_collaborators.c.project_id, project_collaborators.c.user_id).where(
+                project_collaborators.c.project_id.in_(project_ids),
+                project_collaborators.c.user_id.in_(collaborator_ids)
             )
-            existing_project_collab_ids = {row.user_id for row in result}
-            new_for_this_project = collaborator_ids - existing_project_collab_ids
-
-            if new_for_this_project:
-                db.session.execute(project_collaborators.insert(), [
-                    {'project_id': project_id, 'user_id': collab_id} for collab_id in new_for_this_project
-                ])
-            updated_project_ids.add(project_id)
-        if current_task_node.parent_task_id:
-            current_task_node = Task.query.get(current_task_node.parent_task_id)
-        else:
-            current_task_node = None
+        )
+        existing_project_collabs = {(row.project_id, row.user_id) for row in result}
+        new_project_collabs = [
+            {'project_id': project_id, 'user_id': collab_id}
+            for project_id in project_ids for collab_id in collaborator_ids
+            if (project_id, collab_id) not in existing_project_collabs
+        ]
+        if new_project_collabs:
+            db.session.execute(project_collaborators.insert(), new_project_collabs)
 
 def _remove_collaborators_from_subtasks(task, collaborator_ids):
     """
@@ -472,12 +853,10 @@ def _remove_collaborators_from_subtasks(task, collaborator_ids):
 
     # 4. If there are any collaborators left to remove, execute the delete operation
     if safe_list_to_remove:
-        db.session.execute(
-            task_collaborators.delete().where(
-                task_collaborators.c.task_id.in_(task_ids_to_update) &
-                task_collaborators.c.user_id.in_(safe_list_to_remove)
-            )
-        )
+        removed = task_collaborators.c.task_id.in_(task_ids_to_update) & \
+            task_collaborators.c.user_id.in_(safe_list_to_remove)
+        _touch_tasks(db.select(task_collaborators.c.task_id).where(removed))
+        db.session.execute(task_collaborators.delete().where(removed))
 
 def _are_all_subtasks_completed(task):
     """Check if status of all subtasks of a task are completed"""
@@ -489,44 +868,39 @@ def _are_all_subtasks_completed(task):
     return True
 
 def _cascade_parent_deadline_to_subtasks(task, new_deadline):
-    """Recursively update subtasks' deadlines if they exceed the new parent deadline"""
-    for subtask in task.subtasks:
-        if subtask.deadline and new_deadline and subtask.deadline > new_deadline:
-            subtask.deadline = new_deadline
-        _cascade_parent_deadline_to_subtasks(subtask, new_deadline)
+    """Pull in the deadlines of all subtasks (at any depth) that exceed the new parent deadline, in one UPDATE"""
+    cascade_deadline([task.id], new_deadline)
 
 def _update_timestamps_cascade(task):
     """
-    Updates the updated_at timestamp for the given task,
-    its parent task (if any), and its project (if any).
-    Adds the updated objects to the session but does NOT commit.
+    Updates the updated_at timestamp of the given task and drops the cached payloads of the task,
+    its ancestors and its project on commit. Does NOT commit.
+    The parent tasks and the project are not written: their freshness is derived from their
+    subtrees when they are read (see app/serializers.py), so writers of sibling tasks do not
+    queue up on the same parent or project row.
     """
     if not task:
         return
 
-    current_time = db.func.now()
-    objects_to_update = set() # Use a set to avoid adding the same object multiple times
-
     # Update the task itself
-    task.updated_at = current_time
-    objects_to_update.add(task)
-
-    # Find and update the parent task
-    if task.parent_task_id:
-        parent_task = Task.query.get(task.parent_task_id)
-        if parent_task:
-            parent_task.updated_at = current_time
-            objects_to_update.add(parent_task)
-
-    # Find and update the project
-    if task.project_id:
-        project = Project.query.get(task.project_id)
-        if project:
-            project.updated_at = current_time
-            objects_to_update.add(project)
+    task.updated_at = db.func.now()
+    _update_timestamps_cascade_many([task])
 
-    # Add all modified objects to the session
-    db.session.add_all(list(objects_to_update))
+def _update_timestamps_cascade_many(tasks):
+    """
+    _update_timestamps_cascade for many tasks that are being modified, with one ancestor query
+    for the cache invalidation (the tasks themselves are stamped by the onupdate of their own
+    UPDATE). Does NOT commit.
+    """
+    task_ids = [task.id for task in tasks]
+    if any(task.parent_task_id for task in tasks):
+        ancestors = db.session.execute(ancestor_rows_query(task_ids)).all()
+        invalidate_task_payloads({row.id for row in ancestors})
+        invalidate_project_payloads({row.project_id for row in ancestors})
+    else:
+        # Top-level tasks have no ancestors to look up
+        invalidate_task_payloads(task_ids)
+        invalidate_project_payloads({task.project_id for task in tasks})
 
 def delete_task(task_id, user_id):
     #Delete a task by ID
@@ -556,11 +930,11 @@ def delete_task(task_id, user_id):
 def get_task_details(task_id):
     #Fetch a task with its subtasks, comments, and attachments
     try:
-        task = Task.query.filter_by(id=task_id).first()
-        if not task:
+        task_json = serialize_task_forest([task_id])
+        if not task_json:
             return None
 
-        return task.to_json()
+        return task_json[0]
         
     except Exception as e:
         print(f"Error in get_task_details: {e}")
@@ -574,52 +948,14 @@ def add_comment(task_id, data):
         if not task_to_update:
             return None, "Task not found"
 
-        #Create new comment
-        new_comment = Comment(
-            body=data['body'],
-            author_id=data['author_id'],
-            task_id=task_id,
-            parent_comment_id=data.get('parent_comment_id')
-        )
-        
-        db.session.add(new_comment)
-        db.session.flush()
-
-        #Process mentions (if any)
-        mention_ids = data.get('mention_ids', [])
-        if mention_ids:
-            #Save mention relationships to database
-            mention_entries = [
-                {'comment_id': new_comment.id, 'user_id': user_id}
-                for user_id in set(mention_ids)
-            ]
-            db.session.execute(comment_mentions.insert(), mention_entries)
-            
-            #Publish mention alerts to RabbitMQ
-            from .rabbitmq_publisher import publish_mention_alert
-            
-            print(f"📝 Processing {len(set(mention_ids))} mention(s) for comment {new_comment.id}")
-            
-            for mentioned_user_id in set(mention_ids):
-                #Skip self-mentions
-                if mentioned_user_id == data['author_id']:
-                    print(f"⏭️  Skipping self-mention for user {mentioned_user_id}")
-                    continue
-                
-                try:
-                    publish_mention_alert(
-                        task_id=task_id,
-                        comment_id=new_comment.id,
-                        mentioned_user_id=mentioned_user_id,
-                        author_id=data['author_id'],
-                        comment_body=data['body']
-                    )
-                except Exception as publish_error:
-                    print(f"⚠️  Failed to publish mention alert: {publish_error}")
-
+        new_comment, mention_ids = _add_comment(task_to_update, data)
         _update_timestamps_cascade(task_to_update)
 
         db.session.commit()
+
+        # Alerts go out once the comment they point to is committed
+        if mention_ids:
+            _publish_mention_alerts(new_comment, mention_ids)
         
         return new_comment.to_json(), "Comment added successfully"
         
@@ -628,6 +964,56 @@ def add_comment(task_id, data):
         db.session.rollback()
         raise e
 
+def _add_comment(task, data):
+    """
+    Adds a comment and its mentions to the session. Does NOT commit.
+    Returns (comment, mentioned user ids) so the caller can publish the alerts after its commit.
+    """
+    #Create new comment
+    new_comment = Comment(
+        body=data['body'],
+        author_id=data['author_id'],
+        task_id=task.id,
+        parent_comment_id=data.get('parent_comment_id')
+    )
+    
+    db.session.add(new_comment)
+    db.session.flush()
+
+    #Process mentions (if any)
+    mention_ids = set(data.get('mention_ids', []))
+    if mention_ids:
+        #Save mention relationships to database
+        mention_entries = [
+            {'comment_id': new_comment.id, 'user_id': user_id}
+            for user_id in mention_ids
+        ]
+        db.session.execute(comment_mentions.insert(), mention_entries)
+    return new_comment, mention_ids
+
+def _publish_mention_alerts(comment, mention_ids):
+    #Publish mention alerts to RabbitMQ
+    from .rabbitmq_publisher import publish_mention_alert
+    
+    print(f"📝 Processing {len(mention_ids)} mention(s) for comment {comment.id}")
+    
+    for mentioned_user_id in mention_ids:
+        #Skip self-mentions
+        if mentioned_user_id == comment.author_id:
+            print(f"⏭️  Skipping self-mention for user {mentioned_user_id}")
+            continue
+        
+        try:
+            publish_mention_alert(
+                task_id=comment.task_id,
+                comment_id=comment.id,
+                mentioned_user_id=mentioned_user_id,
+                author_id=comment.author_id,
+                comment_body=comment.body
+            )
+        except Exception as publish_error:
+            print(f"⚠️  Failed to publish mention alert: {publish_error}")
+
 def delete_comment(comment_id):
     #Delete a comment by ID
     try:
@@ -666,12 +1052,28 @@ def get_task_collaborators(task_id):
         print(f"Error in get_task_collaborators: {e}")
         raise e
 
+def get_collaborators_for_tasks(task_ids):
+    """
+    Batch version of get_task_collaborators.
+    Returns {task_id: [user_id, ...]} from a single query, with an entry (possibly empty) for every task id.
+    """
+    task_ids = list(dict.fromkeys(int(task_id) for task_id in task_ids))
+    collaborators = {task_id: [] for task_id in task_ids}
+    if not task_ids:
+        return collaborators
+
+    result = db.session.execute(
+        db.select(task_collaborators.c.task_id, task_collaborators.c.user_id)
+        .where(task_collaborators.c.task_id.in_(task_ids))
+        .order_by(task_collaborators.c.task_id, task_collaborators.c.user_id)
+    )
+    for row in result:
+        collaborators[row.task_id].append(row.user_id)
+    return collaborators
+
 def _get_all_subtask_ids(task_id):
-    ids = {task_id}
-    children = Task.query.filter_by(parent_task_id=task_id).all()
-    for child in children:
-        ids.update(_get_all_subtask_ids(child.id))
-    return ids
+    """Ids of a task and all of its subtasks at any depth, from one recursive query"""
+    return get_subtree_ids(task_id) | {task_id}
 
 def add_attachment(task_id, file, input_filename):
     """Add an attachment to a task"""
@@ -835,7 +1237,7 @@ def get_project_by_id(project_id, user_id):
         raise
 
 def get_project_dashboard(project_id, user_id, status_filter=None, sort_by='deadline', 
-                          collaborator_filter=None, owner_filter=None):
+                          collaborator_filter=None, owner_filter=None, fields=None):
     """
     Get project dashboard with tasks, collaborators, and filtering/sorting
     
@@ -846,6 +1248,7 @@ def get_project_dashboard(project_id, user_id, status_filter=None, sort_by='dead
         sort_by: Sort tasks by field (deadline, title, status)
         collaborator_filter: If 'me', show only tasks where user is a collaborator
         owner_filter: If 'me', show only tasks where user is the owner
+        fields: Summary fields to return per task (None for full task trees)
     """
     try:
         # Get project with authorization
@@ -896,17 +1299,27 @@ def get_project_dashboard(project_id, user_id, status_filter=None, sort_by='dead
         elif sort_by == 'priority':
             tasks_query = tasks_query.order_by(Task.priority.desc().nullslast())
         
-        tasks = tasks_query.all()
+        task_ids = [row.id for row in tasks_query.with_entities(Task.id).all()]
         
         # Get project collaborators
         collaborator_ids = project.collaborator_ids()
+
+        if fields is not None:
+            # Summary view: flat task cards, and the project without its nested task list
+            project_json = serialize_project_summary(project)
+            tasks_json = serialize_task_summaries(task_ids, fields)
+        else:
+            # One prefetched forest covers both the project's task list and the filtered tasks
+            forest = TaskForest(project_task_ids(project_id))
+            project_json = serialize_project(project, forest)
+            tasks_json = forest.to_json(task_ids)
         
         # Build response
         dashboard_data = {
-            'project': project.to_json(),
-            'tasks': [task.to_json() for task in tasks],
+            'project': project_json,
+            'tasks': tasks_json,
             'collaborators': collaborator_ids,
-            'task_count': len(tasks)
+            'task_count': len(task_ids)
         }
         
         return dashboard_data, None
@@ -922,93 +1335,50 @@ def get_user_projects(user_id, role_filter=None):
     Args:
         user_id: ID of the user
         role_filter: 'owner', 'collaborator', or None for all
+
+    Projects, the user's role and parent task counts come from one grouped query;
+    the nested project payloads are then serialized in a fixed number of queries.
     """
     try:
-        projects_data = []
-        
+        membership = project_collaborators.alias('membership')
+        is_owner = Project.owner_id == user_id
+        is_collaborator = membership.c.user_id.isnot(None)
+
         if role_filter == 'owner':
-            # Get only projects owned by user
-            owned_projects = Project.query.filter_by(owner_id=user_id).all()
-            for project in owned_projects:
-                project_dict = project.to_json()
-                project_dict['user_role'] = 'owner'
-                
-                # Add task count
-                task_count = Task.query.filter(
-                    Task.project_id == project.id,
-                    Task.parent_task_id.is_(None)
-                ).count()
-                project_dict['task_count'] = task_count
-                
-                projects_data.append(project_dict)
-        
+            user_role = db.literal('owner')
+            condition = is_owner
         elif role_filter == 'collaborator':
-            # Get only projects where user is a collaborator
-            result = db.session.execute(
-                project_collaborators.select().where(
-                    project_collaborators.c.user_id == user_id
-                )
-            )
-            collab_project_ids = [row.project_id for row in result]
-            
-            for project_id in collab_project_ids:
-                project = Project.query.get(project_id)
-                if project:
-                    project_dict = project.to_json()
-                    project_dict['user_role'] = 'collaborator'
-                    
-                    # Add task count
-                    task_count = Task.query.filter(
-                        Task.project_id == project.id,
-                        Task.parent_task_id.is_(None)
-                    ).count()
-                    project_dict['task_count'] = task_count
-                    
-                    projects_data.append(project_dict)
-        
+            user_role = db.literal('collaborator')
+            condition = is_collaborator
         else:
-            # Get all projects (owned + collaborating)
-            # First, get owned projects
-            owned_projects = Project.query.filter_by(owner_id=user_id).all()
-            for project in owned_projects:
-                project_dict = project.to_json()
-                project_dict['user_role'] = 'owner'
-                
-                # Add task count
-                task_count = Task.query.filter(
-                    Task.project_id == project.id,
-                    Task.parent_task_id.is_(None)
-                ).count()
-                project_dict['task_count'] = task_count
-                
-                projects_data.append(project_dict)
-            
-            # Then, get projects where user is a collaborator
-            result = db.session.execute(
-                project_collaborators.select().where(
-                    project_collaborators.c.user_id == user_id
-                )
+            # Owners who are also listed as collaborators are reported once, as owner
+            user_role = db.case((is_owner, 'owner'), else_='collaborator')
+            condition = db.or_(is_owner, is_collaborator)
+
+        rows = db.session.execute(
+            db.select(
+                Project,
+                user_role.label('user_role'),
+                db.func.count(Task.id).label('task_count')
             )
-            collab_project_ids = [row.project_id for row in result]
-            
-            for project_id in collab_project_ids:
-                # Skip if already added as owner
-                if any(p['id'] == project_id for p in projects_data):
-                    continue
-                
-                project = Project.query.get(project_id)
-                if project:
-                    project_dict = project.to_json()
-                    project_dict['user_role'] = 'collaborator'
-                    
-                    # Add task count
-                    task_count = Task.query.filter(
-                        Task.project_id == project.id,
-                        Task.parent_task_id.is_(None)
-                    ).count()
-                    project_dict['task_count'] = task_count
-                    
-                    projects_data.append(project_dict)
+            .outerjoin(membership, db.and_(
+                membership.c.project_id == Project.id,
+                membership.c.user_id == user_id
+            ))
+            .outerjoin(Task, db.and_(
+                Task.project_id == Project.id,
+                Task.parent_task_id.is_(None)
+            ))
+            .where(condition)
+            .group_by(Project.id)
+            # Owned projects first, as before
+            .order_by(db.case((is_owner, 0), else_=1), Project.id)
+        ).all()
+
+        projects_data = serialize_projects([row.Project for row in rows])
+        for project_dict, row in zip(projects_data, rows):
+            project_dict['user_role'] = row.user_role
+            project_dict['task_count'] = row.task_count
         
         return projects_data
         
@@ -1017,8 +1387,12 @@ def get_user_projects(user_id, role_filter=None):
         raise
 
 # Done update
-def update_project(project_id, user_id, project_data):
-    """Update a project (title, description, deadline, owner, collaborators)"""
+def update_project(project_id, user_id, project_data, expected_version=None):
+    """
+    Update a project (title, description, deadline, owner, collaborators)
+    expected_version (from If-Match) makes the write conditional: a stale one is a Conflict.
+    Without it the write is unconditional and the last one wins.
+    """
     try:
         project = Project.query.get(project_id)
         
@@ -1028,13 +1402,24 @@ def update_project(project_id, user_id, project_data):
         # Check if user is the owner
         if project.owner_id != user_id:
             return None, "Forbidden: Only the project owner can update the project"
+
+        if expected_version is not None and expected_version != project.version:
+            return None, _version_conflict('project', project.version)
+
+        # First write, before anything is flushed: a stale expected_version fails here
+        if not _bump_version(Project, project.id, expected_version):
+            db.session.rollback()
+            current = db.session.get(Project, project_id)
+            if current is None:
+                return None, "Project not found"
+            return None, _version_conflict('project', current.version)
         
         _touch_project(project)
 
         # --- Handle standard field updates ---
         for field, data in project_data.items():
             # Skip fields that are handled manually below
-            if field in ['id', 'owner_id', 'collaborators_to_add', 'collaborators_to_remove']:
+            if field in ['id', 'owner_id', 'collaborators_to_add', 'collaborators_to_remove', 'version']:
                 continue
 
             if field == 'deadline':
@@ -1053,29 +1438,24 @@ def update_project(project_id, user_id, project_data):
                 setattr(project, field, data)
 
         # --- Handle Collaborator Changes ---
-        collaborators_to_add = project_data.get('collaborators_to_add', [])
-        if collaborators_to_add:
-            for collab_id in collaborators_to_add:
-                if int(collab_id) != project.owner_id:
-                    try:
-                        add_project_collaborator(project_id, user_id, int(collab_id))
-                    except Exception as add_err:
-                        print(f"Warning: Failed to add collaborator {collab_id}: {add_err}")
-
-        collaborators_to_remove = project_data.get('collaborators_to_remove', [])
-        if collaborators_to_remove:
-            for collab_id in collaborators_to_remove:
-                if int(collab_id) != user_id:
-                    try:
-                        remove_project_collaborator(project_id, user_id, int(collab_id))
-                    except Exception as remove_err:
-                        print(f"Warning: Failed to remove collaborator {collab_id}: {remove_err}")
+        # Set-based, whatever the number of collaborators and tasks
+        collaborators_to_add = [
+            int(collab_id) for collab_id in project_data.get('collaborators_to_add', [])
+            if int(collab_id) != project.owner_id
+        ]
+        _add_project_collaborators(project, collaborators_to_add)
+
+        collaborators_to_remove = [
+            int(collab_id) for collab_id in project_data.get('collaborators_to_remove', [])
+            if int(collab_id) != user_id
+        ]
+        _remove_project_collaborators(project, collaborators_to_remove)
         
         _touch_project(project)
 
         db.session.commit()
         # Return the updated project and a success message
-        return project.to_json(), "Project updated successfully"
+        return serialize_project(project), "Project updated successfully"
         
     except Exception as e:
         print(f"Error updating project: {e}")
@@ -1085,8 +1465,8 @@ def update_project(project_id, user_id, project_data):
 
 def _cascade_project_deadline_to_tasks(project_id, new_project_deadline):
     """
-    Updates deadlines for all parent tasks in a project and recursively cascades
-    to their subtasks by calling _cascade_parent_deadline_to_subtasks.
+    Updates deadlines for all parent tasks in a project and cascades to their
+    subtasks at any depth, with a single set-based UPDATE.
     """
     # Do nothing if the new project deadline is cleared (set to None)
     if not new_project_deadline:
@@ -1094,28 +1474,15 @@ def _cascade_project_deadline_to_tasks(project_id, new_project_deadline):
         return
 
     try:
-        # Step 1: Get only the PARENT tasks in the project
-        parent_tasks = Task.query.filter(
+        # The PARENT tasks in the project; their subtrees are resolved by the recursive query
+        parent_task_ids = db.select(Task.id).where(
             Task.project_id == project_id,
             Task.parent_task_id.is_(None)
-        ).all()
-
-        if not parent_tasks:
-            return  # No parent tasks in this project
-
-        updated_parent_count = 0
-        for task in parent_tasks:
-            # Step 2: Update the parent task itself if its deadline is later
-            if task.deadline and task.deadline > new_project_deadline:
-                task.deadline = new_project_deadline
-                updated_parent_count += 1
-            
-            # Step 3: Call the *existing* recursive helper for its subtasks
-            # This will check all children, grandchildren, etc.
-            _cascade_parent_deadline_to_subtasks(task, new_project_deadline)
+        )
+        updated_count = cascade_deadline(parent_task_ids, new_project_deadline, include_roots=True)
 
-        if updated_parent_count > 0:
-            print(f"Cascaded new project deadline to {updated_parent_count} parent tasks (and their subtasks).")
+        if updated_count > 0:
+            print(f"Cascaded new project deadline to {updated_count} tasks and subtasks.")
 
     except Exception as e:
         # Log the error but don't block the main update
@@ -1157,26 +1524,9 @@ def add_project_collaborator(project_id, user_id, collaborator_user_id):
         if project.owner_id != user_id:
             return None, "Forbidden: Only the project owner can add collaborators"
         
-        # Check if already a collaborator
-        existing = db.session.execute(
-            project_collaborators.select().where(
-                project_collaborators.c.project_id == project_id,
-                project_collaborators.c.user_id == collaborator_user_id
-            )
-        ).first()
-        
-        if existing:
+        if not _add_project_collaborators(project, [collaborator_user_id]):
             return None, "User is already a collaborator on this project"
 
-        _touch_project(project)
-
-        # Add collaborator
-        db.session.execute(
-            project_collaborators.insert().values(
-                project_id=project_id,
-                user_id=collaborator_user_id
-            )
-        )
         db.session.commit()
         
         return {"message": "Collaborator added successfully"}, None
@@ -1186,6 +1536,29 @@ def add_project_collaborator(project_id, user_id, collaborator_user_id):
         db.session.rollback()
         raise
 
+def _add_project_collaborators(project, collaborator_ids):
+    """
+    Add the users of collaborator_ids who are not collaborators of the project yet, with one INSERT.
+    Returns the ids that were added. Does NOT commit.
+    """
+    collaborator_ids = {int(collab_id) for collab_id in collaborator_ids}
+    if not collaborator_ids:
+        return []
+
+    existing = set(db.session.execute(
+        db.select(project_collaborators.c.user_id).where(
+            project_collaborators.c.project_id == project.id,
+            project_collaborators.c.user_id.in_(collaborator_ids)
+        )
+    ).scalars())
+    added = sorted(collaborator_ids - existing)
+    if added:
+        _touch_project(project)
+        db.session.execute(project_collaborators.insert(), [
+            {'project_id': project.id, 'user_id': collab_id} for collab_id in added
+        ])
+    return added
+
 # ==================== EDIT PROJECT & GET/ MANAGE TASKS FUNCTIONS ====================
 def get_project_tasks(project_id):
     """
@@ -1209,23 +1582,32 @@ def get_project_tasks(project_id):
         print(f"Error getting project tasks: {e}")
         raise
 
+def get_project_task_ids_query(project_id):
+    """
+    SELECT of the ids of a project's parent tasks, in get_project_tasks order,
+    for streaming responses. Returns (query, error).
+    """
+    project = Project.query.get(project_id)
+    if not project:
+        return None, "Project not found"
+    return db.select(Task.id).where(
+        Task.project_id == project_id,
+        Task.parent_task_id.is_(None)
+    ).order_by(Task.id.desc()), None
+
+def tasks_with_deadlines_query():
+    """SELECT of the ids of every non-completed task and subtask with a deadline (GET /tasks/with-deadlines)."""
+    return db.select(Task.id).where(
+        Task.deadline.isnot(None),
+        Task.status != TaskStatusEnum.COMPLETED
+    ).order_by(Task.id)
+
 def remove_collaborator_from_project_tasks(project_id, user_id):
     """
     Remove a user from all tasks and subtasks in a project when they are removed as collaborator
     """
     try:
-        # Get all tasks in the project (including subtasks)
-        tasks = Task.query.filter(Task.project_id == project_id).all()
-        
-        for task in tasks:
-            # Remove from task_collaborators if present
-            db.session.execute(
-                task_collaborators.delete().where(
-                    task_collaborators.c.task_id == task.id,
-                    task_collaborators.c.user_id == user_id
-                )
-            )
-        
+        _remove_collaborators_from_project_tasks(project_id, [user_id])
         db.session.commit()
         return True
         
@@ -1234,6 +1616,27 @@ def remove_collaborator_from_project_tasks(project_id, user_id):
         db.session.rollback()
         raise
 
+def _project_subtree_ids_query(project_id):
+    """SELECT of the ids of a project's tasks and, at any depth, of their subtasks."""
+    return descendant_ids_query(db.select(Task.id).where(Task.project_id == project_id))
+
+def _remove_collaborators_from_project_tasks(project_id, collaborator_ids):
+    """
+    Delete the links of collaborator_ids to every task in the project's subtree, in one DELETE.
+    Owners keep the link to their own tasks. Does NOT commit.
+    """
+    owns_task = db.exists().where(
+        Task.id == task_collaborators.c.task_id,
+        Task.owner_id == task_collaborators.c.user_id
+    )
+    removed = db.and_(
+        task_collaborators.c.task_id.in_(_project_subtree_ids_query(project_id)),
+        task_collaborators.c.user_id.in_(list(collaborator_ids)),
+        ~owns_task
+    )
+    _touch_tasks(db.select(task_collaborators.c.task_id).where(removed))
+    db.session.execute(task_collaborators.delete().where(removed))
+
 def add_existing_task_to_project(task_id, project_id, user_id):
     """
     Add an existing standalone task to a project
@@ -1280,11 +1683,7 @@ def add_existing_task_to_project(task_id, project_id, user_id):
                 return None, "Forbidden: Task has collaborators not in the project"
             else:
                 # Add missing collaborators to the project
-                for collab_id in missing_collaborators:
-                    try:
-                        add_project_collaborator(project_id, project.owner_id, collab_id)
-                    except Exception as add_err:
-                        print(f"Warning: Failed to add collaborator {collab_id} to project {project_id}: {add_err}")
+                _add_project_collaborators(project, missing_collaborators)
 
         # Assign task to project
         task.project_id = project_id
@@ -1384,15 +1783,9 @@ def create_task_in_project(task_data, project_id, user_id):
         # 2. The task creator IS the project owner
         if collaborators_not_in_project and is_project_owner:
             print(f"Project owner adding new users ({collaborators_not_in_project}) to project {project_id}.")
-            # Only loop over the NEW collaborators
-            for collab_id in collaborators_not_in_project:
-                try:
-                    add_project_collaborator(project_id, project.owner_id, collab_id)
-                except Exception as add_err:
-                    # This is fine, e.g., "User is already a collaborator" if logic raced
-                    print(f"Warning: Failed to add collaborator {collab_id} to project {project_id}: {add_err}")
-        
-        _touch_project(project)
+            # Only the NEW collaborators; any added meanwhile are skipped
+            _add_project_collaborators(project, collaborators_not_in_project)
+            db.session.commit()
 
         return new_task, None
         
@@ -1401,18 +1794,179 @@ def create_task_in_project(task_data, project_id, user_id):
         db.session.rollback()
         raise
 
-def get_standalone_tasks_for_user(user_id):
+def _insert_tasks(rows):
+    """
+    INSERT rows of task columns (all with the same keys) with one executemany and return the new ids, in order.
+    Does for them what the flush hooks do for ORM inserts: closure table, visibility and live events. Parents must be inserted before their subtasks. Does NOT commit.
+    """
+    if not rows:
+        return []
+    # Core insert: every row goes into one statement (the ORM would split rows by their NULL columns)
+    task_ids = db.session.execute(
+        Task.__table__.insert().returning(Task.__table__.c.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+
+    parent_ids = [row.get('parent_task_id') for row in rows]
+    if closure_enabled():
+        refresh_task_closure(task_ids)
+    mark_tasks_changed(task_ids + parent_ids)
+    mark_tasks_created(task_ids)
+    return task_ids
+
+# Upper bound on the tasks (subtasks included) created by one POST /tasks/bulk
+MAX_BULK_TASKS = 1000
+
+def _bulk_task_levels(tasks_data):
+    """
+    Validate a bulk payload and split it by nesting depth: levels[0] holds the listed tasks,
+    levels[n] the subtasks of levels[n-1], as (task_data, index of the parent in the previous level).
+    Subtasks default to their parent's owner. Raises ValueError.
+    """
+    if not isinstance(tasks_data, list) or not tasks_data:
+        raise ValueError("tasks must be a non-empty list")
+
+    levels, level, count = [], [(task_data, None) for task_data in tasks_data], 0
+    while level:
+        count += len(level)
+        if count > MAX_BULK_TASKS:
+            raise ValueError(f"A bulk request creates at most {MAX_BULK_TASKS} tasks")
+        next_level = []
+        for index, (task_data, _) in enumerate(level):
+            if not isinstance(task_data, dict) or not task_data.get('title'):
+                raise ValueError("Missing field: Title")
+            if not task_data.get('owner_id'):
+                raise ValueError(f"Owner ID is required (task '{task_data['title']}')")
+            if not isinstance(task_data.get('collaborators_to_add') or [], list):
+                raise ValueError(f"collaborators_to_add must be a list (task '{task_data['title']}')")
+            subtasks = task_data.get('subtasks') or []
+            if not isinstance(subtasks, list):
+                raise ValueError(f"subtasks must be a list (task '{task_data['title']}')")
+            for subtask in subtasks:
+                if isinstance(subtask, dict):
+                    subtask = dict(subtask, owner_id=subtask.get('owner_id') or task_data['owner_id'])
+                next_level.append((subtask, index))
+        levels.append(level)
+        level = next_level
+    return levels
+
+def create_tasks_bulk(tasks_data):
+    """
+    Create many tasks, each with optional 'collaborators_to_add' and nested 'subtasks', in one transaction.
+    Every nesting level is inserted with one executemany; subtasks go into their parent's project.
+    The collaborators (and owner) of each new task are then added to it, to every task above it and
+    to their projects with one INSERT per table, which is what _add_collaborators_to_parents does
+    for a single task, and the affected projects are touched once.
+    Returns the new ids in the shape of the request: [{"id", "subtasks": [...]}, ...].
+    Raises ValueError for an invalid payload, an unknown parent task or an unknown project.
+    """
+    levels = _bulk_task_levels(tasks_data)
+    try:
+        # Existing tasks the top-level tasks go under, each with the chain of tasks above it
+        parent_ids = {task_data['parent_task_id'] for task_data, _ in levels[0] if task_data.get('parent_task_id')}
+        chains = defaultdict(list)
+        if parent_ids:
+            for row in db.session.execute(ancestor_rows_query(list(parent_ids))):
+                chains[row.task_id].append((row.id, row.project_id))
+            missing = parent_ids - set(chains)
+            if missing:
+                raise ValueError(f"Parent task not found: {sorted(missing)}")
+
+        project_ids = {task_data['project_id'] for task_data, _ in levels[0] if task_data.get('project_id')}
+        if project_ids:
+            found = set(db.session.execute(db.select(Project.id).where(Project.id.in_(project_ids))).scalars())
+            if project_ids - found:
+                raise ValueError(f"Project not found: {sorted(project_ids - found)}")
+
+        created, previous, new_ids = [], [], []
+        task_pairs, project_pairs = set(), set()
+        for level in levels:
+            rows = []
+            for task_data, parent_index in level:
+                values = _task_values(task_data)
+                if parent_index is not None:
+                    values['parent_task_id'] = previous[parent_index]['id']
+                    values['project_id'] = previous[parent_index]['project_id']
+                rows.append(values)
+
+            task_ids = _insert_tasks(rows)
+
+            current = []
+            for (task_data, parent_index), values, task_id in zip(level, rows, task_ids):
+                if parent_index is None:
+                    chain = chains.get(values['parent_task_id'], [])
+                    siblings = created
+                else:
+                    parent = previous[parent_index]
+                    chain = [(parent['id'], parent['project_id'])] + parent['chain']
+                    siblings = parent['node']['subtasks']
+                node = {'id': task_id, 'subtasks': []}
+                siblings.append(node)
+                current.append({'id': task_id, 'project_id': values['project_id'], 'chain': chain, 'node': node})
+                new_ids.append(task_id)
+
+                collaborator_ids = set(task_data.get('collaborators_to_add') or []) | {values['owner_id']}
+                for ancestor_id, project_id in [(task_id, values['project_id'])] + chain:
+                    task_pairs.update((ancestor_id, user_id) for user_id in collaborator_ids)
+                    if project_id:
+                        project_pairs.update((project_id, user_id) for user_id in collaborator_ids)
+            previous = current
+
+        # Only the existing tasks and projects can already have some of the links
+        existing_task_ids = {task_id for chain in chains.values() for task_id, _ in chain}
+        user_ids = {user_id for _, user_id in task_pairs}
+        if existing_task_ids:
+            result = db.session.execute(
+                db.select(task_collaborators.c.task_id, task_collaborators.c.user_id).where(
+                    task_collaborators.c.task_id.in_(existing_task_ids),
+                    task_collaborators.c.user_id.in_(user_ids)
+                )
+            )
+            task_pairs -= {(row.task_id, row.user_id) for row in result}
+        touched_project_ids = {project_id for project_id, _ in project_pairs}
+        if touched_project_ids:
+            result = db.session.execute(
+                db.select(project_collaborators.c.project_id, project_collaborators.c.user_id).where(
+                    project_collaborators.c.project_id.in_(touched_project_ids),
+                    project_collaborators.c.user_id.in_(user_ids)
+                )
+            )
+            project_pairs -= {(row.project_id, row.user_id) for row in result}
+
+        if task_pairs:
+            db.session.execute(task_collaborators.insert(), [
+                {'task_id': task_id, 'user_id': user_id} for task_id, user_id in sorted(task_pairs)
+            ])
+        if project_pairs:
+            db.session.execute(project_collaborators.insert(), [
+                {'project_id': project_id, 'user_id': user_id} for project_id, user_id in sorted(project_pairs)
+            ])
+
+        invalidate_task_payloads(existing_task_ids)
+        invalidate_project_payloads(touched_project_ids)
+
+        db.session.commit()
+        print(f"Created {len(new_ids)} tasks in bulk")
+        return created
+    except Exception as e:
+        print(f"Error in create_tasks_bulk: {e}")
+        db.session.rollback()
+        raise
+
+def get_standalone_tasks_for_user(user_id, fields=None):
     """
     Get all tasks owned by user that are not assigned to any project (standalone tasks)
+    Returns flat summaries instead of full task trees when a list of fields is given.
     """
     try:
-        tasks = Task.query.filter(
-            Task.owner_id == user_id,
-            Task.project_id.is_(None),
-            Task.parent_task_id.is_(None)  # Only parent tasks
-        ).order_by(Task.id.desc()).all()
+        task_ids = db.session.execute(
+            db.select(Task.id).where(
+                Task.owner_id == user_id,
+                Task.project_id.is_(None),
+                Task.parent_task_id.is_(None)  # Only parent tasks
+            ).order_by(Task.id.desc())
+        ).scalars().all()
         
-        return [task.to_json() for task in tasks]
+        return serialize_task_list(task_ids, fields)
         
     except Exception as e:
         print(f"Error getting standalone tasks: {e}")
@@ -1438,29 +1992,7 @@ def remove_project_collaborator(project_id, user_id, collaborator_user_id):
         if collaborator_user_id == project.owner_id:
             return None, "Cannot remove the project owner from collaborators"
         
-        _touch_project(project)
-
-        tasks_to_unassign = Task.query.filter(
-            Task.project_id == project_id,
-            Task.owner_id == collaborator_user_id
-        ).all()
-        
-        if tasks_to_unassign:
-            print(f"Found {len(tasks_to_unassign)} tasks owned by user {collaborator_user_id}. Un-assigning them from project {project_id}.")
-            for task in tasks_to_unassign:
-                task.project_id = None  # Remove task from project
-                db.session.add(task)
-        
-        # Remove from project tasks first (CASCADE)
-        remove_collaborator_from_project_tasks(project_id, collaborator_user_id)
-        
-        # Remove from project collaborators
-        db.session.execute(
-            project_collaborators.delete().where(
-                project_collaborators.c.project_id == project_id,
-                project_collaborators.c.user_id == collaborator_user_id
-            )
-        )
+        _remove_project_collaborators(project, [collaborator_user_id])
         db.session.commit()
         
         return {"message": "Collaborator removed successfully from project and all tasks"}, None
@@ -1470,30 +2002,93 @@ def remove_project_collaborator(project_id, user_id, collaborator_user_id):
         db.session.rollback()
         raise
 
+def _remove_project_collaborators(project, collaborator_ids):
+    """
+    Remove collaborator_ids from a project with three set-based statements, whatever its size:
+    the project's tasks they own leave the project, their links to every task in the project's
+    subtree are deleted, and so are their project_collaborators rows. Does NOT commit.
+    """
+    collaborator_ids = sorted({int(collab_id) for collab_id in collaborator_ids})
+    if not collaborator_ids:
+        return
+
+    _touch_project(project)
+
+    unassigned = db.session.execute(
+        db.update(Task)
+        .where(Task.project_id == project.id, Task.owner_id.in_(collaborator_ids))
+        .values(project_id=None)
+    ).rowcount
+    if unassigned:
+        print(f"Un-assigned {unassigned} tasks owned by users {collaborator_ids} from project {project.id}.")
+
+    # After the un-assignment, so the tasks they own keep their links (CASCADE)
+    _remove_collaborators_from_project_tasks(project.id, collaborator_ids)
+
+    db.session.execute(
+        project_collaborators.delete().where(
+            project_collaborators.c.project_id == project.id,
+            project_collaborators.c.user_id.in_(collaborator_ids)
+        )
+    )
+
+def _bump_version(model, row_id, expected_version=None):
+    """
+    Bump a task's or project's version with one UPDATE. With an expected_version it is a
+    compare-and-swap that only matches while the row is still at that version; without one the
+    write is unconditional (last write wins). Call it before anything else of the write is
+    flushed: the row lock it takes is then held until the commit, and a concurrent writer of the
+    same row waits for it and re-checks the version. Returns False when no row matched (a stale
+    version, or a deleted row). Does NOT commit.
+    """
+    conditions = [model.id == row_id]
+    if expected_version is not None:
+        conditions.append(model.version == expected_version)
+    result = db.session.execute(
+        db.update(model)
+        .where(*conditions)
+        .values(version=model.version + 1)
+    )
+    return result.rowcount == 1
+
+def _version_conflict(kind, current_version):
+    return f"Conflict: The {kind} was changed by someone else (it is now at version {current_version}). Reload it and try again."
+
 def _touch_project(project):
     """
-    Manually updates a project's updated_at timestamp.
-    Does NOT commit.
+    Manually updates a project's updated_at timestamp, for changes to the project itself
+    (collaborators, tasks moved in or out) that cannot be derived from its tasks' timestamps.
+    The project's cached payload is dropped on commit. Does NOT commit.
     """
     if project:
+        invalidate_project_payloads([project.id])
         project.updated_at = db.func.now()
         db.session.add(project)
 
-def _log_task_activity(user_id, task_id, field, old_val, new_val):
+def _touch_tasks(task_ids):
+    """
+    Stamp updated_at on tasks whose collaborators changed, in one UPDATE, so the deadline feed and
+    GET /changes report them. task_ids may be a list of ids or a SELECT of ids. Does NOT commit.
     """
-    Helper function to create and add a log entry to the session.
+    db.session.execute(
+        db.update(Task).where(Task.id.in_(task_ids)).values(updated_at=db.func.now()),
+        execution_options={'synchronize_session': 'fetch'}
+    )
+
+def _activity_row(user_id, task_id, field, old_val, new_val):
+    """
+    Values of one task_activity_log row, for inserting many at once.
     We convert values to string for generic storage.
     """
     if old_val is None:
         old_val = "None"
     if new_val is None:
         new_val = "None"
-        
-    log_entry = TaskActivityLog(
-        task_id=task_id,
-        user_id=user_id,
-        field_changed=str(field).lower(),
-        old_value=str(old_val),
-        new_value=str(new_val)
-    )
-    db.session.add(log_entry)
+
+    return {
+        'task_id': task_id,
+        'user_id': user_id,
+        'field_changed': str(field).lower(),
+        'old_value': str(old_val),
+        'new_value': str(new_val)
+    }
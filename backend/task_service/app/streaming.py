@@ -0,0 +1,50 @@
+import json
+from flask import Response, request, stream_with_context
+from .models import db
+from .serializers import serialize_task_list
+
+# NDJSON streaming for large task lists.
+# jsonify() builds the whole array in memory before the first byte is sent. When a client
+# asks for Accept: application/x-ndjson, list endpoints instead read task ids from a
+# server-side cursor (yield_per), serialize them one batch at a time with the batched
+# serializers, and send one JSON document per line as each batch is ready. Only one batch of
+# tasks is held in the worker at any time, and consumers can process rows as they arrive.
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Task ids fetched from the cursor and serialized per round trip
+STREAM_BATCH_SIZE = 200
+
+
+def wants_ndjson():
+    """Whether the client prefers NDJSON over a JSON array (JSON wins ties and */*)."""
+    best = request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+
+def iter_serialized_tasks(ids_query, fields=None, batch_size=None):
+    """
+    Yield serialized tasks for a SELECT of task ids, in query order: full nested trees,
+    or summaries when fields are given. Ids are streamed from a server-side cursor and
+    serialized batch_size at a time; loaded rows are released after each batch.
+    """
+    batch_size = batch_size or STREAM_BATCH_SIZE
+    result = db.session.execute(ids_query, execution_options={'yield_per': batch_size})
+    for task_ids in result.scalars().partitions():
+        yield from serialize_task_list(list(task_ids), fields)
+        # Nothing is written while streaming, so the identity map can be dropped
+        db.session.expunge_all()
+
+
+def ndjson_response(rows, status=200):
+    """Stream an iterable of JSON-serializable rows as application/x-ndjson, one row per line."""
+    def generate():
+        try:
+            for row in rows:
+                yield json.dumps(row, separators=(',', ':')) + '\n'
+        except Exception as e:
+            # Headers are already sent: the client sees a truncated stream
+            print(f"Error while streaming NDJSON: {e}")
+            raise
+
+    return Response(stream_with_context(generate()), status=status, mimetype=NDJSON_MIMETYPE)
@@ -0,0 +1,282 @@
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event
+from sqlalchemy.orm import aliased, attributes
+from .models import db, Project, Task, task_collaborators, task_visibility, project_collaborators
+from .hierarchy import root_rows_query
+
+# Materialized per-user task visibility.
+# A user can see a parent task if they own it, collaborate on it, or collaborate on one of
+# its subtasks. Evaluating that rule on every GET /tasks costs an OR over three subqueries,
+# so it is materialized in task_visibility(user_id, root_task_id) instead.
+#
+# The index is kept current from session events rather than from each service function:
+# every write that can change visibility (new, deleted or re-parented tasks, owner changes,
+# task_collaborators inserts and deletes) marks the affected tasks, and the marked parent
+# tasks are recomputed set-based just before the transaction commits. That covers
+# _add_collaborators_to_parents, _remove_collaborators_from_subtasks, ownership changes and
+# the project membership cascades alike. Code that inserts tasks with Core statements must
+# call mark_tasks_changed() for the new ids.
+
+_PENDING_KEY = 'task_visibility_pending'
+_REBUILD_KEY = 'task_visibility_rebuild'
+
+
+def visible_task_pairs(root_ids=None):
+    """
+    SELECT of (user_id, root_task_id) for every parent task and user who can see it,
+    computed from tasks and task_collaborators. Restricted to root_ids when given.
+    This is the definition task_visibility materializes.
+    """
+    SubTask = aliased(Task)
+    ParentTask = aliased(Task)
+
+    owned = db.select(Task.owner_id.label('user_id'), Task.id.label('root_task_id'))\
+        .where(Task.parent_task_id.is_(None))
+
+    direct = db.select(task_collaborators.c.user_id, Task.id.label('root_task_id'))\
+        .join(Task, Task.id == task_collaborators.c.task_id)\
+        .where(Task.parent_task_id.is_(None))
+
+    via_subtask = db.select(task_collaborators.c.user_id, ParentTask.id.label('root_task_id'))\
+        .join(SubTask, SubTask.id == task_collaborators.c.task_id)\
+        .join(ParentTask, ParentTask.id == SubTask.parent_task_id)\
+        .where(ParentTask.parent_task_id.is_(None))
+
+    if root_ids is not None:
+        owned = owned.where(Task.id.in_(root_ids))
+        direct = direct.where(Task.id.in_(root_ids))
+        via_subtask = via_subtask.where(ParentTask.id.in_(root_ids))
+
+    # UNION removes the duplicates where a user is both owner and collaborator
+    return db.union(owned, direct, via_subtask)
+
+
+def mark_tasks_changed(task_ids, session=None):
+    """Queue tasks whose ownership, parent or collaborators changed; their parent tasks are refreshed at commit."""
+    session = session or db.session
+    session.info.setdefault(_PENDING_KEY, set()).update(
+        task_id for task_id in task_ids if task_id is not None
+    )
+
+
+def refresh_task_visibility(session=None):
+    """
+    Recompute the index rows of every task marked in this transaction (and of their parents).
+    Costs two statements whatever the number of tasks. Called before commit and before reads.
+    """
+    session = session or db.session
+    session.flush()
+
+    if session.info.pop(_REBUILD_KEY, False):
+        rebuild_task_visibility(session)
+        return
+
+    task_ids = session.info.pop(_PENDING_KEY, None)
+    if not task_ids:
+        return
+
+    # A parent task's rows depend on its subtasks' collaborators, so refresh the parents too
+    parent_ids = session.execute(
+        db.select(Task.parent_task_id).where(
+            Task.id.in_(task_ids),
+            Task.parent_task_id.isnot(None)
+        )
+    ).scalars().all()
+    root_ids = set(task_ids) | set(parent_ids)
+
+    session.execute(
+        task_visibility.delete().where(task_visibility.c.root_task_id.in_(root_ids))
+    )
+    session.execute(
+        task_visibility.insert().from_select(
+            ['user_id', 'root_task_id'], visible_task_pairs(root_ids)
+        )
+    )
+
+
+def rebuild_task_visibility(session=None):
+    """Recompute the whole index from tasks and task_collaborators. Returns the number of rows. Does NOT commit."""
+    session = session or db.session
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_REBUILD_KEY, None)
+
+    session.execute(task_visibility.delete())
+    session.execute(
+        task_visibility.insert().from_select(['user_id', 'root_task_id'], visible_task_pairs())
+    )
+    return session.execute(
+        db.select(db.func.count()).select_from(task_visibility)
+    ).scalar()
+
+
+def verify_task_visibility(session=None):
+    """
+    Compare the index with the visibility rule.
+    Returns (missing, extra): sets of (user_id, root_task_id) pairs absent from / stale in the index.
+    """
+    session = session or db.session
+    expected = visible_task_pairs().subquery('expected')
+    actual = db.select(task_visibility.c.user_id, task_visibility.c.root_task_id)
+    expected_pairs = db.select(expected.c.user_id, expected.c.root_task_id)
+
+    missing = {tuple(row) for row in session.execute(expected_pairs.except_(actual))}
+    extra = {tuple(row) for row in session.execute(actual.except_(expected_pairs))}
+    return missing, extra
+
+
+def task_audiences(task_ids, session=None):
+    """
+    {task_id: set of user ids} of the users who can see each task, at any depth: those who see
+    its parent task (per task_visibility) plus the owner and collaborators of that task's project.
+    One query whatever the number of tasks.
+    """
+    session = session or db.session
+    task_ids = list(task_ids)
+    if not task_ids:
+        return {}
+    roots = root_rows_query(task_ids).subquery()
+
+    viewers = db.select(roots.c.task_id, task_visibility.c.user_id)\
+        .join(task_visibility, task_visibility.c.root_task_id == roots.c.root_id)
+    owners = db.select(roots.c.task_id, Project.owner_id)\
+        .join(Project, Project.id == roots.c.project_id)
+    members = db.select(roots.c.task_id, project_collaborators.c.user_id)\
+        .join(project_collaborators, project_collaborators.c.project_id == roots.c.project_id)
+
+    audiences = {task_id: set() for task_id in task_ids}
+    for task_id, user_id in session.execute(db.union(viewers, owners, members)):
+        audiences[task_id].add(user_id)
+    return audiences
+
+
+# ==================== CHANGE TRACKING ====================
+
+def _inserted_task_ids(statement, parameters):
+    """task_ids written by an INSERT into task_collaborators, or None if they cannot be known up front."""
+    if getattr(statement, 'select', None) is not None:
+        return None
+
+    rows = parameters if isinstance(parameters, (list, tuple)) else [parameters or {}]
+    task_ids = {row.get('task_id') for row in rows}
+    # Values given with .values(...): 'task_id', or 'task_id_m0', 'task_id_m1'... for multi-row VALUES
+    for key, value in statement.compile().params.items():
+        if key == 'task_id' or key.startswith('task_id_m'):
+            task_ids.add(value)
+    return task_ids
+
+
+def _updates_visibility_columns(statement, parameters):
+    """Whether an UPDATE on tasks sets owner_id or parent_task_id (the only columns visibility depends on)."""
+    rows = parameters if isinstance(parameters, (list, tuple)) else [parameters or {}]
+    keys = set(statement.compile().params)
+    for row in rows:
+        keys.update(row)
+    return bool(keys & {'owner_id', 'parent_task_id'})
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _track_core_writes(orm_execute_state):
+    statement = orm_execute_state.statement
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table_name = getattr(getattr(statement, 'table', None), 'name', None)
+    session = orm_execute_state.session
+
+    if table_name == task_collaborators.name:
+        if orm_execute_state.is_insert:
+            task_ids = _inserted_task_ids(statement, orm_execute_state.parameters)
+        elif statement.whereclause is not None:
+            # Collect the affected tasks before the rows are gone
+            task_ids = session.execute(
+                db.select(task_collaborators.c.task_id).where(statement.whereclause).distinct()
+            ).scalars().all()
+        else:
+            task_ids = None
+    elif table_name == Task.__tablename__ and not orm_execute_state.is_insert:
+        if orm_execute_state.is_update and not _updates_visibility_columns(statement, orm_execute_state.parameters):
+            return
+        if statement.whereclause is None:
+            task_ids = None
+        else:
+            rows = session.execute(
+                db.select(Task.id, Task.parent_task_id).where(statement.whereclause)
+            ).all()
+            task_ids = {task_id for row in rows for task_id in row}
+    else:
+        return
+
+    if task_ids is None:
+        session.info[_REBUILD_KEY] = True
+    else:
+        mark_tasks_changed(task_ids, session)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_task_changes(session, flush_context):
+    task_ids = set()
+    for task in list(session.new) + list(session.deleted):
+        if isinstance(task, Task):
+            task_ids.update((task.id, task.parent_task_id))
+
+    for task in session.dirty:
+        if not isinstance(task, Task):
+            continue
+        owner_history = attributes.get_history(task, 'owner_id')
+        parent_history = attributes.get_history(task, 'parent_task_id')
+        parent_task_history = attributes.get_history(
+            task, 'parent_task', passive=attributes.PASSIVE_NO_INITIALIZE
+        )
+        if owner_history.has_changes():
+            task_ids.add(task.id)
+        if parent_history.has_changes() or parent_task_history.has_changes():
+            task_ids.update((task.id, task.parent_task_id))
+            task_ids.update(parent_history.deleted or ())
+            task_ids.update(parent.id for parent in parent_task_history.deleted or () if parent is not None)
+
+    if task_ids:
+        mark_tasks_changed(task_ids, session)
+
+
+@event.listens_for(db.session, 'before_commit')
+def _refresh_before_commit(session):
+    if session.info.get(_PENDING_KEY) or session.info.get(_REBUILD_KEY) or session.new or session.dirty or session.deleted:
+        refresh_task_visibility(session)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_REBUILD_KEY, None)
+
+
+# ==================== CLI ====================
+
+visibility_cli = AppGroup('visibility', help='Maintain the task_visibility index.')
+
+
+@visibility_cli.command('rebuild')
+def rebuild_command():
+    """Recompute task_visibility from tasks and collaborators."""
+    count = rebuild_task_visibility()
+    db.session.commit()
+    click.echo(f"task_visibility rebuilt: {count} rows")
+
+
+@visibility_cli.command('verify')
+@click.option('--fix', is_flag=True, help='Rebuild the index if drift is found.')
+def verify_command(fix):
+    """Report rows missing from or stale in task_visibility."""
+    missing, extra = verify_task_visibility()
+    click.echo(f"task_visibility: {len(missing)} missing, {len(extra)} stale rows")
+    for user_id, root_task_id in sorted(missing):
+        click.echo(f"  missing: user {user_id} -> task {root_task_id}")
+    for user_id, root_task_id in sorted(extra):
+        click.echo(f"  stale:   user {user_id} -> task {root_task_id}")
+
+    if missing or extra:
+        if not fix:
+            raise SystemExit(1)
+        count = rebuild_task_visibility()
+        db.session.commit()
+        click.echo(f"task_visibility rebuilt: {count} rows")
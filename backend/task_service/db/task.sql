@@ -4,6 +4,9 @@ DROP FUNCTION IF EXISTS trigger_set_timestamp();
 DROP TABLE IF EXISTS task_activity_log CASCADE;
 DROP TABLE IF EXISTS attachments CASCADE;
 DROP TABLE IF EXISTS task_collaborators CASCADE;
+DROP TABLE IF EXISTS task_visibility CASCADE;
+DROP TABLE IF EXISTS task_closure CASCADE;
+DROP TABLE IF EXISTS change_tombstones CASCADE;
 DROP TABLE IF EXISTS project_collaborators CASCADE;
 DROP TABLE IF EXISTS comment_mentions CASCADE;
 DROP TABLE IF EXISTS tasks CASCADE;
@@ -20,6 +23,8 @@ CREATE TABLE projects (
     description TEXT,
     deadline TIMESTAMP,
     owner_id INT NOT NULL,
+    version INT NOT NULL DEFAULT 1,
+    revision INT NOT NULL DEFAULT 1,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -38,9 +43,18 @@ CREATE TABLE tasks (
     recurrence_interval VARCHAR(50),
     recurrence_days INT,
     recurrence_end_date TIMESTAMP,
+    recurrence_series_id INT,
+    recurrence_occurrence_at TIMESTAMP,
+    comment_count INT NOT NULL DEFAULT 0,
+    attachment_count INT NOT NULL DEFAULT 0,
+    version INT NOT NULL DEFAULT 1,
+    revision INT NOT NULL DEFAULT 1,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+CREATE INDEX ix_tasks_updated_at ON tasks (updated_at);
+CREATE INDEX ix_tasks_parent_task_id ON tasks (parent_task_id);
+CREATE UNIQUE INDEX uq_tasks_recurrence_occurrence ON tasks (recurrence_series_id, recurrence_occurrence_at);
 
 CREATE TABLE task_activity_log (
     id SERIAL PRIMARY KEY,
@@ -80,6 +94,36 @@ CREATE TABLE task_collaborators (
     PRIMARY KEY (task_id, user_id)
 );
 
+-- Materialized index of the parent tasks each user can see (owner, collaborator,
+-- or collaborator on a subtask). Maintained by the task service; `flask visibility rebuild`
+CREATE TABLE task_visibility (
+    user_id INT NOT NULL,
+    root_task_id INT NOT NULL,
+    PRIMARY KEY (user_id, root_task_id)
+);
+CREATE INDEX ix_task_visibility_root_task_id ON task_visibility (root_task_id);
+
+-- Closure table of the task hierarchy (each task is its own ancestor at depth 0).
+-- Used when TASK_CLOSURE_ENABLED is set; `flask closure rebuild`
+CREATE TABLE task_closure (
+    ancestor_id INT NOT NULL,
+    descendant_id INT NOT NULL,
+    depth INT NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id)
+);
+CREATE INDEX ix_task_closure_descendant_id ON task_closure (descendant_id);
+
+-- Deleted tasks and projects, one row per user who could see them (GET /changes).
+-- Written by the task service; `flask changes prune` drops rows past the retention period
+CREATE TABLE change_tombstones (
+    id SERIAL PRIMARY KEY,
+    user_id INT NOT NULL,
+    entity_type VARCHAR(20) NOT NULL,
+    entity_id INT NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+CREATE INDEX ix_change_tombstones_user_id_deleted_at ON change_tombstones (user_id, deleted_at);
+
 CREATE TABLE comment_mentions (
     comment_id INT NOT NULL REFERENCES comments(id) ON DELETE CASCADE,
     user_id INT NOT NULL,
@@ -97,10 +141,12 @@ CREATE TABLE report_history (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Stamps updated_at and counts the row's revisions (read validators, see app/conditional.py)
 CREATE FUNCTION trigger_set_timestamp()
 RETURNS TRIGGER AS $$
 BEGIN
   NEW.updated_at = NOW();
+  NEW.revision = OLD.revision + 1;
   RETURN NEW;
 END;
 $$ LANGUAGE plpgsql;
@@ -303,3 +349,31 @@ VALUES
 (8, 3, '2025-10-29 08:00:00', 'status', 'Ongoing', 'Completed'),   -- Task 8: Ongoing -> Completed
 -- SGT Date: 2025-10-30 (Thursday)
 (8, 3, '2025-10-30 08:00:00', 'priority', '5', '6');               -- Task 8: P5 -> P6
+
+-- Populate the visibility index for the sample data
+INSERT INTO task_visibility (user_id, root_task_id)
+SELECT owner_id, id FROM tasks WHERE parent_task_id IS NULL
+UNION
+SELECT tc.user_id, t.id FROM task_collaborators tc
+JOIN tasks t ON t.id = tc.task_id
+WHERE t.parent_task_id IS NULL
+UNION
+SELECT tc.user_id, p.id FROM task_collaborators tc
+JOIN tasks s ON s.id = tc.task_id
+JOIN tasks p ON p.id = s.parent_task_id
+WHERE p.parent_task_id IS NULL;
+
+-- Populate the hierarchy closure table for the sample data
+INSERT INTO task_closure (ancestor_id, descendant_id, depth)
+WITH RECURSIVE task_paths (ancestor_id, descendant_id, depth, next_id) AS (
+    SELECT id, id, 0, parent_task_id FROM tasks
+    UNION ALL
+    SELECT t.id, p.descendant_id, p.depth + 1, t.parent_task_id
+    FROM tasks t JOIN task_paths p ON t.id = p.next_id
+)
+SELECT ancestor_id, descendant_id, depth FROM task_paths;
+
+-- Populate the denormalized child counters for the sample data
+UPDATE tasks t SET
+    comment_count = (SELECT COUNT(*) FROM comments c WHERE c.task_id = t.id),
+    attachment_count = (SELECT COUNT(*) FROM attachments a WHERE a.task_id = t.id);
@@ -188,7 +188,7 @@ class TestGetAllTasksUnit(TestTaskRoutesUnit):
     @patch('app.routes.service.get_all_tasks')
     def test_get_all_tasks_success(self, mock_get_all_tasks):
         """Test successfully retrieving all tasks for a user"""
-        mock_get_all_tasks.return_value = [self.mock_task1, self.mock_task2]
+        mock_get_all_tasks.return_value = [self.mock_task1.to_json(), self.mock_task2.to_json()]
         
         response = self.client.get('/api/tasks?owner_id=1')
         
@@ -197,7 +197,7 @@ class TestGetAllTasksUnit(TestTaskRoutesUnit):
         self.assertEqual(len(data), 2)
         self.assertEqual(data[0]['title'], 'Test Task 1')
         self.assertEqual(data[1]['title'], 'Test Task 2')
-        mock_get_all_tasks.assert_called_once_with(1)
+        mock_get_all_tasks.assert_called_once_with(1, fields=None, filters={}, sort=None)
     
     @patch('app.routes.service.get_all_tasks')
     def test_get_all_tasks_no_owner_id(self, mock_get_all_tasks):
@@ -1945,31 +1945,31 @@ class TestServiceFunctions(TestTaskRoutesIntegration):
         subtask_ids = _get_all_subtask_ids(1)
         self.assertEqual(subtask_ids, {1, 2, 3, 4})
 
-    def test_calculate_next_due_date(self):
+    def testcalculate_next_due_date(self):
         """Test calculating the next due date for a recurring task"""
-        from app.service import _calculate_next_due_date
+        from app.recurrence import calculate_next_due_date
         from datetime import datetime, timedelta
         from dateutil.relativedelta import relativedelta
 
         start_date = datetime(2024, 1, 1)
 
         # Test daily recurrence
-        self.assertEqual(_calculate_next_due_date(start_date, 'daily', None), start_date + timedelta(days=1))
+        self.assertEqual(calculate_next_due_date(start_date, 'daily', None), start_date + timedelta(days=1))
 
         # Test weekly recurrence
-        self.assertEqual(_calculate_next_due_date(start_date, 'weekly', None), start_date + timedelta(weeks=1))
+        self.assertEqual(calculate_next_due_date(start_date, 'weekly', None), start_date + timedelta(weeks=1))
 
         # Test monthly recurrence
-        self.assertEqual(_calculate_next_due_date(start_date, 'monthly', None), start_date + relativedelta(months=1))
+        self.assertEqual(calculate_next_due_date(start_date, 'monthly', None), start_date + relativedelta(months=1))
 
         # Test custom recurrence
-        self.assertEqual(_calculate_next_due_date(start_date, 'custom', 5), start_date + timedelta(days=5))
+        self.assertEqual(calculate_next_due_date(start_date, 'custom', 5), start_date + timedelta(days=5))
 
         # Test no recurrence
-        self.assertIsNone(_calculate_next_due_date(start_date, 'none', None))
+        self.assertIsNone(calculate_next_due_date(start_date, 'none', None))
 
         # Test no start date
-        self.assertIsNone(_calculate_next_due_date(None, 'daily', None))
+        self.assertIsNone(calculate_next_due_date(None, 'daily', None))
 
 
 
@@ -2237,38 +2237,38 @@ class TestRecurringTasks(TestTaskRoutesIntegration):
         self.assertIsNotNone(task.recurrence_end_date)
 
     def test_calculate_next_due_date_daily(self):
-        from app.service import _calculate_next_due_date
+        from app.recurrence import calculate_next_due_date
         from datetime import datetime
         start = datetime(2025, 1, 1, 10, 0, 0)
-        result = _calculate_next_due_date(start, 'daily', None)
+        result = calculate_next_due_date(start, 'daily', None)
         self.assertEqual(result.day, 2)
 
     def test_calculate_next_due_date_weekly(self):
-        from app.service import _calculate_next_due_date
+        from app.recurrence import calculate_next_due_date
         from datetime import datetime
         start = datetime(2025, 1, 1, 10, 0, 0)
-        result = _calculate_next_due_date(start, 'weekly', None)
+        result = calculate_next_due_date(start, 'weekly', None)
         self.assertEqual(result.day, 8)
 
     def test_calculate_next_due_date_monthly(self):
-        from app.service import _calculate_next_due_date
+        from app.recurrence import calculate_next_due_date
         from datetime import datetime
         start = datetime(2025, 1, 1, 10, 0, 0)
-        result = _calculate_next_due_date(start, 'monthly', None)
+        result = calculate_next_due_date(start, 'monthly', None)
         self.assertEqual(result.month, 2)
 
     def test_calculate_next_due_date_custom(self):
-        from app.service import _calculate_next_due_date
+        from app.recurrence import calculate_next_due_date
         from datetime import datetime
         start = datetime(2025, 1, 1, 10, 0, 0)
-        result = _calculate_next_due_date(start, 'custom', 10)
+        result = calculate_next_due_date(start, 'custom', 10)
         self.assertEqual(result.day, 11)
 
     def test_calculate_next_due_date_none(self):
-        from app.service import _calculate_next_due_date
+        from app.recurrence import calculate_next_due_date
         from datetime import datetime
         start = datetime(2025, 1, 1, 10, 0, 0)
-        result = _calculate_next_due_date(start, 'none', None)
+        result = calculate_next_due_date(start, 'none', None)
         self.assertIsNone(result)
 
 
@@ -2797,6 +2797,2133 @@ class TestModelsToJson(TestTaskRoutesIntegration):
         self.assertEqual(json_data['filename'], "test.pdf")
 
 
+class TestTaskForestSerializer(TestTaskRoutesIntegration):
+    """Tests for the batched task-tree serializer"""
+
+    def _build_tree(self, title, depth, breadth, parent=None):
+        """Create a task tree with a collaborator, a comment thread and an attachment on every node"""
+        task = Task(title=title, owner_id=1, project_id=1, parent_task=parent)
+        db.session.add(task)
+        db.session.flush()
+        db.session.execute(task_collaborators.insert().values(task_id=task.id, user_id=2))
+
+        comment = Comment(body=f"Comment on {title}", author_id=1, task_id=task.id)
+        db.session.add(comment)
+        db.session.flush()
+        reply = Comment(body="Reply", author_id=2, task_id=task.id, parent_comment_id=comment.id)
+        db.session.add(reply)
+        db.session.flush()
+        db.session.execute(comment_mentions.insert().values(comment_id=reply.id, user_id=1))
+        db.session.add(Attachment(filename="a.pdf", url="key", task_id=task.id))
+
+        if depth > 0:
+            for i in range(breadth):
+                self._build_tree(f"{title}.{i}", depth - 1, breadth, task)
+        return task
+
+    def _count_queries(self, func):
+        from sqlalchemy import event
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            result = func()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+        return result, len(statements)
+
+    def test_forest_matches_to_json(self):
+        from app.serializers import serialize_task_forest
+        root = self._build_tree("Root", depth=2, breadth=2)
+        db.session.commit()
+
+        expected = root.to_json()
+        db.session.expire_all()
+        self.assertEqual(serialize_task_forest([root.id]), [expected])
+
+    def test_project_matches_to_json(self):
+        from app.serializers import serialize_project
+        self._build_tree("Root", depth=1, breadth=2)
+        db.session.commit()
+
+        expected = self.project.to_json()
+        db.session.expire_all()
+        self.assertEqual(serialize_project(Project.query.get(1)), expected)
+
+    def test_query_count_is_constant(self):
+        from app.serializers import serialize_task_forest
+        small = self._build_tree("Small", depth=0, breadth=0)
+        large = self._build_tree("Large", depth=3, breadth=3)
+        db.session.commit()
+        db.session.expire_all()
+
+        _, small_count = self._count_queries(lambda: serialize_task_forest([small.id]))
+        db.session.expire_all()
+        result, large_count = self._count_queries(lambda: serialize_task_forest([large.id]))
+
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(result[0]['subtask_count'], 3)
+
+    def test_unknown_ids_are_skipped(self):
+        from app.serializers import serialize_task_forest
+        self.assertEqual(serialize_task_forest([]), [])
+        self.assertEqual(serialize_task_forest([999]), [])
+
+    def test_get_task_details_uses_forest(self):
+        root = self._build_tree("Root", depth=1, breadth=1)
+        db.session.commit()
+
+        details = service.get_task_details(root.id)
+        self.assertEqual(details['subtasks'][0]['title'], "Root.0")
+        self.assertEqual(details['comments'][0]['replies'][0]['mentions'], [1])
+        self.assertEqual(details['comment_count'], 2)
+
+
+class TestTaskSummaryViews(TestTaskRoutesIntegration):
+    """Tests for ?view=summary and ?fields= on the task list endpoints"""
+
+    _build_tree = TestTaskForestSerializer._build_tree
+
+    def test_summary_view_on_get_all_tasks(self):
+        self._build_tree("Root", depth=1, breadth=2)
+        db.session.commit()
+
+        response = self.client.get('/tasks?owner_id=1&view=summary')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(len(data), 1)
+        self.assertNotIn('comments', data[0])
+        self.assertNotIn('subtasks', data[0])
+        self.assertEqual(data[0]['subtask_count'], 2)
+        self.assertEqual(data[0]['comment_count'], 2)
+        self.assertEqual(data[0]['attachment_count'], 1)
+        self.assertEqual(data[0]['collaborator_ids'], [2])
+
+    def test_sparse_fields(self):
+        root = self._build_tree("Root", depth=0, breadth=0)
+        db.session.commit()
+
+        response = self.client.get('/tasks/standalone?user_id=1&fields=title,comment_count')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data), [])
+
+        response = self.client.get('/projects/1/tasks?fields=title,comment_count')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data), [{'id': root.id, 'title': 'Root', 'comment_count': 2}])
+
+    def test_unknown_field_returns_400(self):
+        response = self.client.get('/tasks?owner_id=1&fields=title,secret')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/projects/1/dashboard?user_id=1&view=everything')
+        self.assertEqual(response.status_code, 400)
+
+    def test_summary_does_not_load_threads(self):
+        from app.serializers import serialize_task_summaries, DEFAULT_SUMMARY_FIELDS
+        root = self._build_tree("Root", depth=2, breadth=2)
+        db.session.commit()
+        db.session.expire_all()
+
+        statements = []
+        from sqlalchemy import event
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            serialize_task_summaries([root.id], list(DEFAULT_SUMMARY_FIELDS))
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+        sql = "\n".join(statements)
+        self.assertNotIn("comment_mentions", sql)
+        self.assertNotIn("comments.body", sql)
+        self.assertNotIn("attachments.url", sql)
+
+    def test_dashboard_summary(self):
+        self._build_tree("Root", depth=1, breadth=1)
+        db.session.commit()
+
+        response = self.client.get('/projects/1/dashboard?user_id=1&view=summary')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertNotIn('tasks', data['project'])
+        self.assertEqual(data['task_count'], 1)
+        self.assertEqual(data['tasks'][0]['subtask_count'], 1)
+
+
+class TestTaskListFiltersAndPagination(TestTaskRoutesIntegration):
+    """Tests for GET /tasks filters, sorting and keyset pagination"""
+
+    def _create_tasks(self):
+        base = datetime(2025, 11, 1, 8, 0, 0)
+        specs = [
+            ("A", TaskStatusEnum.ONGOING, 3, base + timedelta(days=3), 1),
+            ("B", TaskStatusEnum.ONGOING, 8, base + timedelta(days=1), None),
+            ("C", TaskStatusEnum.COMPLETED, 5, None, 1),
+            ("D", TaskStatusEnum.UNASSIGNED, 8, base + timedelta(days=1), None),
+            ("E", TaskStatusEnum.UNDER_REVIEW, None, base + timedelta(days=7), 1),
+            ("F", TaskStatusEnum.ONGOING, 1, None, None),
+            ("G", TaskStatusEnum.ONGOING, 10, base + timedelta(days=2), None),
+        ]
+        tasks = []
+        for title, status, priority, deadline, project_id in specs:
+            task = Task(title=title, owner_id=1, status=status, priority=priority,
+                        deadline=deadline, project_id=project_id)
+            db.session.add(task)
+            tasks.append(task)
+        # A task owned by someone else that user 1 collaborates on
+        shared = Task(title="Shared", owner_id=2, status=TaskStatusEnum.ONGOING, priority=4)
+        db.session.add(shared)
+        db.session.flush()
+        db.session.execute(task_collaborators.insert().values(task_id=shared.id, user_id=1))
+        db.session.commit()
+        return tasks, shared
+
+    def _titles(self, query):
+        response = self.client.get(f'/tasks?owner_id=1&fields=title&{query}')
+        self.assertEqual(response.status_code, 200)
+        return [task['title'] for task in json.loads(response.data)]
+
+    def _paginate(self, query, limit):
+        titles, cursor, pages = [], None, 0
+        while True:
+            url = f'/tasks?owner_id=1&fields=title&limit={limit}&{query}'
+            if cursor:
+                url += f'&cursor={cursor}'
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.data)
+            self.assertLessEqual(len(data['tasks']), limit)
+            titles.extend(task['title'] for task in data['tasks'])
+            pages += 1
+            cursor = data['next_cursor']
+            if not cursor:
+                return titles, pages
+
+    def test_filters(self):
+        self._create_tasks()
+        self.assertEqual(sorted(self._titles('status=Ongoing')), ['A', 'B', 'F', 'G', 'Shared'])
+        self.assertEqual(sorted(self._titles('priority_min=5&priority_max=8')), ['B', 'C', 'D'])
+        self.assertEqual(
+            sorted(self._titles('deadline_from=2025-11-02T12:00:00Z&deadline_to=2025-11-04T08:00:00Z')),
+            ['A', 'G']
+        )
+        self.assertEqual(sorted(self._titles('project_id=1')), ['A', 'C', 'E'])
+        self.assertEqual(self._titles('collaborator_id=1'), ['Shared'])
+        self.assertEqual(sorted(self._titles('status=Ongoing&project_id=1')), ['A'])
+
+    def test_sort_nulls_last(self):
+        self._create_tasks()
+        self.assertEqual(self._titles('sort=deadline'), ['B', 'D', 'G', 'A', 'E', 'C', 'F', 'Shared'])
+        self.assertEqual(self._titles('sort=-priority'), ['G', 'D', 'B', 'C', 'Shared', 'A', 'F', 'E'])
+
+    def test_keyset_pages_cover_full_result(self):
+        self._create_tasks()
+        for sort in ('deadline', '-deadline', 'priority', '-priority', 'title', '-id'):
+            expected = self._titles(f'sort={sort}')
+            titles, pages = self._paginate(f'sort={sort}', limit=3)
+            self.assertEqual(titles, expected, sort)
+            self.assertEqual(pages, 3)
+
+    def test_pagination_with_filters(self):
+        self._create_tasks()
+        titles, _ = self._paginate('status=Ongoing&sort=title', limit=2)
+        self.assertEqual(titles, ['A', 'B', 'F', 'G', 'Shared'])
+
+    def test_invalid_arguments_return_400(self):
+        self._create_tasks()
+        for query in ('sort=owner', 'status=Done', 'priority_min=high',
+                      'deadline_from=yesterday', 'limit=2&cursor=garbage'):
+            response = self.client.get(f'/tasks?owner_id=1&{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+    def test_cursor_is_bound_to_sort(self):
+        self._create_tasks()
+        response = self.client.get('/tasks?owner_id=1&limit=2&sort=deadline')
+        cursor = json.loads(response.data)['next_cursor']
+        response = self.client.get(f'/tasks?owner_id=1&limit=2&sort=priority&cursor={cursor}')
+        self.assertEqual(response.status_code, 400)
+
+    def test_page_requires_owner_id(self):
+        response = self.client.get('/tasks?limit=5')
+        self.assertEqual(response.status_code, 400)
+
+
+class TestTasksForOwnersBatch(TestTaskRoutesIntegration):
+    """Tests for fetching the tasks of many owners in one request"""
+
+    def _create_tasks(self):
+        own1 = Task(title="Own 1", owner_id=1, priority=2)
+        own2 = Task(title="Own 2", owner_id=2, priority=9)
+        shared = Task(title="Shared", owner_id=1, priority=5)
+        parent = Task(title="Parent", owner_id=3, priority=7)
+        db.session.add_all([own1, own2, shared, parent])
+        db.session.flush()
+        subtask = Task(title="Sub", owner_id=3, parent_task_id=parent.id)
+        db.session.add(subtask)
+        db.session.flush()
+        db.session.execute(task_collaborators.insert().values(task_id=shared.id, user_id=2))
+        db.session.execute(task_collaborators.insert().values(task_id=subtask.id, user_id=2))
+        db.session.commit()
+
+    def _titles(self, data):
+        return {owner_id: [task['title'] for task in tasks] for owner_id, tasks in data.items()}
+
+    def test_grouped_by_owner(self):
+        self._create_tasks()
+        response = self.client.get('/tasks?owner_ids=1,2,4&fields=title&sort=-priority')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._titles(json.loads(response.data)), {
+            '1': ['Shared', 'Own 1'],
+            '2': ['Own 2', 'Parent', 'Shared'],
+            '4': [],
+        })
+
+    def test_matches_single_owner_lists(self):
+        self._create_tasks()
+        data = service.get_tasks_for_owners([1, 2, 3])
+        for owner_id in (1, 2, 3):
+            self.assertEqual(data[owner_id], service.get_all_tasks(owner_id))
+
+    def test_post_body_with_filters(self):
+        self._create_tasks()
+        response = self.client.post('/tasks/owners:batch?view=summary&priority_min=5',
+                                    json={'owner_ids': [1, 2]})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(sorted(task['title'] for task in data['2']), ['Own 2', 'Parent', 'Shared'])
+        self.assertEqual([task['title'] for task in data['1']], ['Shared'])
+        self.assertNotIn('subtasks', data['1'][0])
+
+    def test_query_count_independent_of_owner_count(self):
+        self._create_tasks()
+        from sqlalchemy import event
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            service.get_tasks_for_owners([1], fields=['id', 'title'])
+            small = len(statements)
+            statements.clear()
+            service.get_tasks_for_owners(list(range(1, 40)), fields=['id', 'title'])
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+        self.assertEqual(len(statements), small)
+
+    def test_invalid_owner_ids_return_400(self):
+        self.assertEqual(self.client.get('/tasks?owner_ids=1,two').status_code, 400)
+        self.assertEqual(self.client.post('/tasks/owners:batch', json={}).status_code, 400)
+        self.assertEqual(
+            self.client.post('/tasks/owners:batch', json={'owner_ids': 'x'}).status_code, 400
+        )
+
+
+class TestCollaboratorsBatch(TestTaskRoutesIntegration):
+    """Tests for the bulk collaborator lookup"""
+
+    def _create_tasks(self):
+        tasks = [Task(title=f"Task {i}", owner_id=1) for i in range(3)]
+        db.session.add_all(tasks)
+        db.session.flush()
+        for task, user_ids in zip(tasks, ([3, 2], [4], [])):
+            for user_id in user_ids:
+                db.session.execute(task_collaborators.insert().values(task_id=task.id, user_id=user_id))
+        db.session.commit()
+        return [task.id for task in tasks]
+
+    def test_batch_lookup(self):
+        task_ids = self._create_tasks()
+        response = self.client.post('/tasks/collaborators:batch', json={'task_ids': task_ids + [999]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data), {
+            str(task_ids[0]): [2, 3],
+            str(task_ids[1]): [4],
+            str(task_ids[2]): [],
+            '999': [],
+        })
+
+    def test_matches_single_task_lookup(self):
+        task_ids = self._create_tasks()
+        batch = service.get_collaborators_for_tasks(task_ids)
+        for task_id in task_ids:
+            single = [row['user_id'] for row in service.get_task_collaborators(task_id)]
+            self.assertEqual(batch[task_id], sorted(single))
+
+    def test_invalid_body_returns_400(self):
+        self.assertEqual(self.client.post('/tasks/collaborators:batch', json={}).status_code, 400)
+        response = self.client.post('/tasks/collaborators:batch', json={'task_ids': ['a']})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/tasks/collaborators:batch', json={'task_ids': []})
+        self.assertEqual(json.loads(response.data), {})
+
+
+class TestTaskVisibilityIndex(TestTaskRoutesIntegration):
+    """Tests for the materialized task_visibility index"""
+
+    def _visible(self, user_id):
+        return sorted(task['title'] for task in service.get_all_tasks(user_id, fields=['title']))
+
+    def _assert_in_sync(self):
+        from app.visibility import verify_task_visibility
+        self.assertEqual(verify_task_visibility(), (set(), set()))
+
+    def test_maintained_by_service_writes(self):
+        parent = service.create_task({'title': 'Parent', 'owner_id': 1})
+        subtask = service.create_task({
+            'title': 'Sub', 'owner_id': 1, 'parent_task_id': parent.id, 'collaborators_to_add': [2]
+        })
+        self._assert_in_sync()
+        self.assertEqual(self._visible(2), ['Parent'])
+
+        service.update_task(parent.id, 1, {'collaborators_to_remove': [2]}, None)
+        self._assert_in_sync()
+        self.assertEqual(self._visible(2), [])
+
+        service.update_task(parent.id, 1, {'owner_id': 3}, None)
+        self._assert_in_sync()
+        self.assertEqual(self._visible(3), ['Parent'])
+
+        subtask.status = TaskStatusEnum.COMPLETED
+        db.session.commit()
+        service.delete_task(parent.id, 3)
+        self._assert_in_sync()
+        self.assertEqual(self._visible(1), [])
+        self.assertEqual(self._visible(3), [])
+
+    def test_maintained_by_project_membership_changes(self):
+        task = service.create_task_in_project({'title': 'Project task', 'owner_id': 1,
+                                               'collaborators_to_add': [4]}, 1, 1)[0]
+        self.assertEqual(self._visible(4), ['Project task'])
+
+        service.remove_project_collaborator(1, 1, 4)
+        self._assert_in_sync()
+        self.assertEqual(self._visible(4), [])
+        self.assertEqual(self._visible(1), ['Project task'])
+
+    def test_maintained_by_core_collaborator_writes(self):
+        parent = Task(title="Parent", owner_id=1)
+        db.session.add(parent)
+        db.session.flush()
+        subtask = Task(title="Sub", owner_id=1, parent_task_id=parent.id)
+        db.session.add(subtask)
+        db.session.flush()
+        db.session.execute(task_collaborators.insert(), [{'task_id': subtask.id, 'user_id': 5}])
+        db.session.commit()
+        self.assertEqual(self._visible(5), ['Parent'])
+
+        db.session.execute(task_collaborators.delete().where(task_collaborators.c.user_id == 5))
+        db.session.commit()
+        self.assertEqual(self._visible(5), [])
+        self._assert_in_sync()
+
+    def test_rolled_back_changes_are_not_indexed(self):
+        db.session.add(Task(title="Discarded", owner_id=6))
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(self._visible(6), [])
+        self._assert_in_sync()
+
+    def test_verify_and_rebuild_commands(self):
+        from app.models import task_visibility
+        service.create_task({'title': 'Task', 'owner_id': 1, 'collaborators_to_add': [2]})
+        db.session.execute(task_visibility.delete().where(task_visibility.c.user_id == 2))
+        db.session.execute(task_visibility.insert().values(user_id=9, root_task_id=1))
+        db.session.commit()
+        self.assertEqual(self._visible(2), [])
+
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=['visibility', 'verify'])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('1 missing, 1 stale', result.output)
+
+        result = runner.invoke(args=['visibility', 'verify', '--fix'])
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(self._visible(2), ['Task'])
+        self._assert_in_sync()
+
+        result = runner.invoke(args=['visibility', 'rebuild'])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn('2 rows', result.output)
+
+
+class TestHierarchyOperations(TestTaskRoutesIntegration):
+    """Tests for the recursive-CTE hierarchy helpers"""
+
+    _count_queries = TestTaskForestSerializer._count_queries
+
+    def _build_chain(self, depth, deadline=None, project_id=None):
+        """A chain of nested subtasks, each with a sibling leaf; returns the tasks from the root down"""
+        chain, parent = [], None
+        for level in range(depth):
+            task = Task(title=f"Level {level}", owner_id=1, deadline=deadline,
+                        project_id=project_id if level == 0 else None, parent_task=parent)
+            leaf = Task(title=f"Leaf {level}", owner_id=1, deadline=deadline, parent_task=parent)
+            db.session.add_all([task, leaf])
+            chain.append(task)
+            parent = task
+        db.session.commit()
+        return chain
+
+    def test_subtree_and_ancestors(self):
+        from app.hierarchy import get_subtree_ids, get_ancestors
+        chain = self._build_chain(5)
+        all_ids = {task.id for task in Task.query.all()}
+        root_leaf = Task.query.filter_by(title="Leaf 0").first()
+
+        subtree, query_count = self._count_queries(lambda: get_subtree_ids(chain[0].id))
+        self.assertEqual(subtree, all_ids - {root_leaf.id})
+        self.assertEqual(query_count, 1)
+        self.assertEqual(service._get_all_subtask_ids(999), {999})
+
+        ancestors, query_count = self._count_queries(lambda: get_ancestors(chain[-1].id))
+        self.assertEqual([row.id for row in ancestors], [task.id for task in reversed(chain)])
+        self.assertEqual([row.depth for row in ancestors], list(range(5)))
+        self.assertEqual(query_count, 1)
+
+    def test_descendant_rows_pair_each_root_with_its_subtree(self):
+        from app.hierarchy import get_subtree_ids, descendant_rows_query
+        chain = self._build_chain(4)
+        roots = [chain[1].id, chain[2].id]
+        rows = set(db.session.execute(descendant_rows_query(roots)).all())
+        self.assertEqual(rows, {(root_id, task_id) for root_id in roots for task_id in get_subtree_ids(root_id)})
+
+    def test_parent_deadline_cascade_is_one_statement(self):
+        from app.hierarchy import cascade_deadline
+        late, early = datetime(2025, 12, 31), datetime(2025, 12, 1)
+        chain = self._build_chain(6, deadline=late)
+        on_time = Task(title="On time", owner_id=1, deadline=datetime(2025, 11, 1), parent_task=chain[2])
+        db.session.add(on_time)
+        db.session.commit()
+
+        count, query_count = self._count_queries(lambda: cascade_deadline([chain[0].id], early))
+        self.assertEqual(count, 10)
+        # One UPDATE (plus the id fetch that keeps loaded objects in sync, where RETURNING is unavailable)
+        self.assertLessEqual(query_count, 2)
+        db.session.commit()
+
+        self.assertEqual(chain[0].deadline, late)
+        for task in Task.query.filter(Task.parent_task_id.isnot(None), Task.title != "On time"):
+            self.assertEqual(task.deadline, early, task.title)
+        self.assertEqual(on_time.deadline, datetime(2025, 11, 1))
+
+    def test_project_deadline_cascade(self):
+        chain = self._build_chain(4, deadline=datetime(2025, 12, 31), project_id=1)
+        other = Task(title="Other", owner_id=1, deadline=datetime(2025, 12, 31))
+        db.session.add(other)
+        db.session.commit()
+
+        service.update_project(1, 1, {'deadline': '2025-12-10T00:00:00Z'})
+
+        for task in Task.query.filter(Task.title.like('Level%') | Task.title.like('Leaf 1%')):
+            self.assertEqual(task.deadline, datetime(2025, 12, 10), task.title)
+        self.assertEqual(Task.query.filter_by(title="Leaf 0").first().deadline, datetime(2025, 12, 31))
+        self.assertEqual(other.deadline, datetime(2025, 12, 31))
+
+    def test_add_collaborators_to_parents_query_count_independent_of_depth(self):
+        shallow = self._build_chain(2, project_id=1)
+        deep = self._build_chain(8, project_id=1)
+
+        _, shallow_count = self._count_queries(
+            lambda: service._add_collaborators_to_parents(shallow[-1], {7, 8})
+        )
+        _, deep_count = self._count_queries(
+            lambda: service._add_collaborators_to_parents(deep[-1], {9, 10})
+        )
+        self.assertEqual(deep_count, shallow_count)
+        db.session.commit()
+
+        for task in deep:
+            self.assertEqual(sorted(task.collaborator_ids()), [9, 10])
+        self.assertIn(9, self.project.collaborator_ids())
+
+
+class ClosureEnabledMixin:
+    """Runs a test class with the task_closure table maintained and used for hierarchy lookups"""
+
+    def setUp(self):
+        super().setUp()
+        self.app.config['TASK_CLOSURE_ENABLED'] = True
+
+
+class TestHierarchyOperationsWithClosure(ClosureEnabledMixin, TestHierarchyOperations):
+    """The hierarchy helpers again, answered from task_closure"""
+
+
+class TestTaskClosureTable(ClosureEnabledMixin, TestTaskRoutesIntegration):
+    """Tests for the task_closure hierarchy table"""
+
+    def _assert_in_sync(self):
+        from app.closure import verify_task_closure
+        self.assertEqual(verify_task_closure(), (set(), set()))
+
+    def _create(self, title, parent=None, **data):
+        data.update({'title': title, 'owner_id': 1})
+        if parent is not None:
+            data['parent_task_id'] = parent.id
+        return service.create_task(data)
+
+    def test_maintained_by_task_lifecycle(self):
+        from app.hierarchy import get_subtree_ids, get_root_id, is_descendant
+        root = self._create('Root', deadline=datetime(2030, 1, 1), is_recurring=True,
+                            recurrence_interval='weekly')
+        child = self._create('Child', root)
+        grandchild = self._create('Grandchild', child)
+        in_project = service.create_task_in_project({'title': 'In project', 'owner_id': 1}, 1, 1)[0]
+        self._assert_in_sync()
+
+        self.assertEqual(get_subtree_ids(root.id), {root.id, child.id, grandchild.id})
+        self.assertEqual(get_root_id(grandchild.id), root.id)
+        self.assertTrue(is_descendant(grandchild.id, root.id))
+        self.assertFalse(is_descendant(root.id, grandchild.id))
+
+        service.add_existing_task_to_project(root.id, 1, 1)
+        service.remove_task_from_project(in_project.id, 1)
+        self._assert_in_sync()
+
+        # Completing a recurring task copies it and its subtasks
+        for task in (grandchild, child):
+            service.update_task(task.id, 1, {'status': 'Completed'}, None)
+        service.update_task(root.id, 1, {'status': 'Completed'}, None)
+        self.assertEqual(Task.query.filter_by(title='Root').count(), 2)
+        self._assert_in_sync()
+
+        service.delete_task(root.id, 1)
+        self._assert_in_sync()
+        self.assertEqual(get_subtree_ids(root.id), set())
+
+    def test_reparenting_moves_subtree(self):
+        from app.hierarchy import get_subtree_ids, get_root_id
+        first, second = self._create('First'), self._create('Second')
+        child = self._create('Child', first)
+        grandchild = self._create('Grandchild', child)
+
+        child.parent_task_id = second.id
+        db.session.commit()
+        self._assert_in_sync()
+        self.assertEqual(get_subtree_ids(first.id), {first.id})
+        self.assertEqual(get_root_id(grandchild.id), second.id)
+
+    def test_matches_recursive_queries(self):
+        from app.hierarchy import get_subtree_ids, get_ancestors
+        root = self._create('Root')
+        child = self._create('Child', root)
+        leaf = self._create('Leaf', child)
+
+        with_closure = (get_subtree_ids(root.id), get_ancestors(leaf.id))
+        self.app.config['TASK_CLOSURE_ENABLED'] = False
+        self.assertEqual((get_subtree_ids(root.id), get_ancestors(leaf.id)), with_closure)
+
+    def test_verify_and_rebuild_commands(self):
+        from app.models import task_closure
+        root = self._create('Root')
+        self._create('Child', root)
+        db.session.execute(task_closure.delete().where(task_closure.c.depth == 1))
+        db.session.commit()
+
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=['closure', 'verify'])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('1 missing, 0 stale', result.output)
+
+        result = runner.invoke(args=['closure', 'verify', '--fix'])
+        self.assertEqual(result.exit_code, 0)
+        self._assert_in_sync()
+
+        result = runner.invoke(args=['closure', 'rebuild'])
+        self.assertIn('3 rows', result.output)
+
+
+class TestUserProjectsAggregate(TestTaskRoutesIntegration):
+    """get_user_projects: roles and task counts from one grouped query"""
+
+    _count_queries = TestTaskForestSerializer._count_queries
+
+    def _make_projects(self, count, owner_id=7, collaborator_id=8):
+        projects = []
+        for i in range(count):
+            project = Project(title=f"Aggregate {i}", owner_id=owner_id)
+            db.session.add(project)
+            db.session.flush()
+            db.session.execute(project_collaborators.insert().values(project_id=project.id, user_id=collaborator_id))
+            parent = Task(title=f"Parent {i}", owner_id=owner_id, project_id=project.id)
+            db.session.add(parent)
+            db.session.flush()
+            db.session.add(Task(title=f"Sub {i}", owner_id=owner_id, project_id=project.id, parent_task_id=parent.id))
+            projects.append(project)
+        db.session.commit()
+        return projects
+
+    def test_roles_and_task_counts(self):
+        from app.service import get_user_projects
+        owned = self._make_projects(2, owner_id=7, collaborator_id=8)
+        shared = self._make_projects(1, owner_id=8, collaborator_id=7)
+        # Owner also listed as a collaborator on their own project
+        db.session.execute(project_collaborators.insert().values(project_id=owned[0].id, user_id=7))
+        db.session.commit()
+
+        projects = get_user_projects(7)
+        self.assertEqual([p['id'] for p in projects], [owned[0].id, owned[1].id, shared[0].id])
+        self.assertEqual([p['user_role'] for p in projects], ['owner', 'owner', 'collaborator'])
+        self.assertTrue(all(p['task_count'] == 1 for p in projects))
+        self.assertEqual(projects[0], {**owned[0].to_json(), 'user_role': 'owner', 'task_count': 1})
+
+        self.assertEqual([p['id'] for p in get_user_projects(7, role_filter='owner')], [owned[0].id, owned[1].id])
+        collab = get_user_projects(7, role_filter='collaborator')
+        self.assertEqual([p['id'] for p in collab], [owned[0].id, shared[0].id])
+        self.assertEqual({p['user_role'] for p in collab}, {'collaborator'})
+
+    def test_project_without_tasks_counts_zero(self):
+        from app.service import get_user_projects
+        project = Project(title="Empty", owner_id=7)
+        db.session.add(project)
+        db.session.commit()
+
+        projects = get_user_projects(7)
+        self.assertEqual(len(projects), 1)
+        self.assertEqual(projects[0]['task_count'], 0)
+        self.assertEqual(projects[0]['tasks'], [])
+
+    def test_query_count_does_not_grow_with_projects(self):
+        from app.service import get_user_projects
+        self._make_projects(1, owner_id=7)
+        _, few = self._count_queries(lambda: get_user_projects(7))
+        self._make_projects(10, owner_id=7)
+        result, many = self._count_queries(lambda: get_user_projects(7))
+        self.assertEqual(len(result), 11)
+        self.assertEqual(few, many)
+
+
+class TestTaskCounters(TestTaskRoutesIntegration):
+    """Denormalized comment/attachment counters and the derived subtask count"""
+
+    def _counters(self, task_id):
+        db.session.expire_all()
+        task = db.session.get(Task, task_id)
+        return task.subtask_count, task.comment_count, task.attachment_count
+
+    def test_service_writes_keep_counters_in_sync(self):
+        parent = service.create_task({'title': 'Counted', 'owner_id': 1})
+        subtask = service.create_task({'title': 'Sub', 'owner_id': 1, 'parent_task_id': parent.id})
+        comment, _ = service.add_comment(parent.id, {'body': 'Top', 'author_id': 1})
+        service.add_comment(parent.id, {'body': 'Reply', 'author_id': 2, 'parent_comment_id': comment['id']})
+
+        mock_file = MagicMock()
+        mock_file.filename = 'a.txt'
+        mock_file.content_type = 'text/plain'
+        with patch('app.service.current_app.s3_client'):
+            attachment = service.add_attachment(parent.id, mock_file, 'a.txt')
+        self.assertEqual(self._counters(parent.id), (1, 2, 1))
+
+        # Deleting a comment also removes its replies
+        service.delete_comment(comment['id'])
+        with patch('app.service.current_app.s3_client'):
+            service.delete_attachment_url(parent.id, attachment['id'])
+        self.assertEqual(self._counters(parent.id), (1, 0, 0))
+
+        db.session.get(Task, subtask.id).status = TaskStatusEnum.COMPLETED
+        db.session.commit()
+        service.delete_task(subtask.id, 1)
+        self.assertEqual(self._counters(parent.id), (0, 0, 0))
+
+    def test_subtask_writes_leave_the_parent_row_alone(self):
+        parent = service.create_task({'title': 'Shared parent', 'owner_id': 1})
+        parent_id = parent.id
+        stamp = datetime(2025, 1, 1)
+        db.session.execute(db.update(Task).where(Task.id == parent_id).values(updated_at=stamp))
+        db.session.commit()
+
+        subtask = service.create_task({'title': 'Sibling', 'owner_id': 1, 'parent_task_id': parent_id})
+        self.assertEqual(self._counters(parent_id)[0], 1)
+        service.delete_task(subtask.id, 1)
+        self.assertEqual(self._counters(parent_id)[0], 0)
+        self.assertEqual(db.session.get(Task, parent_id).updated_at, stamp)
+
+    def test_loaded_task_sees_new_count(self):
+        parent = Task(title='Loaded', owner_id=1)
+        db.session.add(parent)
+        db.session.commit()
+        self.assertEqual(parent.comment_count, 0)
+
+        db.session.add(Comment(body='Hi', author_id=1, task_id=parent.id))
+        db.session.commit()
+        self.assertEqual(parent.comment_count, 1)
+
+    def test_summary_counts_read_counter_columns(self):
+        from app.serializers import serialize_task_summaries
+        parent = service.create_task({'title': 'Summary', 'owner_id': 1})
+        service.create_task({'title': 'Sub', 'owner_id': 1, 'parent_task_id': parent.id})
+        parent_id = parent.id
+        summaries, count = TestTaskForestSerializer._count_queries(
+            self, lambda: serialize_task_summaries([parent_id], ['subtask_count', 'comment_count'])
+        )
+        self.assertEqual(summaries, [{'subtask_count': 1, 'comment_count': 0}])
+        self.assertEqual(count, 1)
+
+    def test_repair_command(self):
+        parent = service.create_task({'title': 'Drifted', 'owner_id': 1})
+        service.add_comment(parent.id, {'body': 'Hi', 'author_id': 1})
+        db.session.execute(db.update(Task).where(Task.id == parent.id).values(comment_count=5, attachment_count=2))
+        db.session.commit()
+
+        result = self.app.test_cli_runner().invoke(args=['counters', 'repair'])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn('2 values fixed', result.output)
+        self.assertEqual(self._counters(parent.id), (0, 1, 0))
+
+
+class TestDeadlineFeed(TestTaskRoutesIntegration):
+    """GET /tasks/with-deadlines/feed: slim rows, deadline window and updated_since cursor"""
+
+    def _task(self, title, deadline, updated_at, status=TaskStatusEnum.ONGOING, **kwargs):
+        task = Task(title=title, owner_id=1, deadline=deadline, status=status, **kwargs)
+        db.session.add(task)
+        db.session.flush()
+        db.session.execute(db.update(Task).where(Task.id == task.id).values(updated_at=updated_at))
+        db.session.commit()
+        return task.id
+
+    def _feed(self, **params):
+        response = self.client.get('/tasks/with-deadlines/feed', query_string=params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data)
+
+    def setUp(self):
+        super().setUp()
+        self.base = datetime(2025, 1, 1, 12, 0)
+        self.soon = self._task('Soon', self.base + timedelta(days=2), self.base)
+        self.later = self._task('Later', self.base + timedelta(days=30), self.base + timedelta(minutes=1))
+        self.done = self._task('Done', self.base + timedelta(days=1), self.base + timedelta(minutes=2),
+                               status=TaskStatusEnum.COMPLETED)
+        self._task('No deadline', None, self.base + timedelta(minutes=3))
+        db.session.execute(task_collaborators.insert().values(task_id=self.soon, user_id=4))
+        db.session.commit()
+
+    def test_snapshot_returns_slim_active_rows(self):
+        data = self._feed()
+        self.assertEqual([task['id'] for task in data['tasks']], [self.soon, self.later])
+        self.assertEqual(set(data['tasks'][0]), {
+            'id', 'title', 'deadline', 'status', 'owner_id', 'parent_task_id', 'collaborator_ids'
+        })
+        self.assertEqual(data['tasks'][0]['collaborator_ids'], [4])
+        self.assertFalse(data['has_more'])
+
+        window = self._feed(deadline_to=(self.base + timedelta(days=7)).isoformat())
+        self.assertEqual([task['id'] for task in window['tasks']], [self.soon])
+
+    def test_updated_since_returns_only_changes(self):
+        cursor = self._feed()['next_cursor']
+        self.assertEqual(self._feed(updated_since=cursor)['tasks'], [])
+        self.assertEqual(self._feed(updated_since=cursor)['next_cursor'], cursor)
+
+        db.session.execute(db.update(Task).where(Task.id == self.soon).values(
+            status=TaskStatusEnum.COMPLETED, updated_at=self.base + timedelta(hours=1)
+        ))
+        db.session.commit()
+        data = self._feed(updated_since=cursor)
+        self.assertEqual([(task['id'], task['status']) for task in data['tasks']], [(self.soon, 'Completed')])
+        self.assertEqual(self._feed(updated_since=data['next_cursor'])['tasks'], [])
+
+    def test_pages_with_limit(self):
+        first = self._feed(limit=1)
+        self.assertTrue(first['has_more'])
+        second = self._feed(limit=1, updated_since=first['next_cursor'])
+        self.assertEqual([task['id'] for task in first['tasks'] + second['tasks']], [self.soon, self.later])
+
+    def test_cursor_lags_the_clock(self):
+        from app.changes import database_now
+        now = database_now()
+        self._task('Fresh', self.base + timedelta(days=3), now)
+        cursor = self._feed()['next_cursor']
+        # A transaction that started before the last call but committed after it
+        late = self._task('Late', self.base + timedelta(days=4), now - timedelta(seconds=1))
+        data = self._feed(updated_since=cursor)
+        self.assertIn(late, [task['id'] for task in data['tasks']])
+        self.assertFalse(data['has_more'])
+
+    def test_collaborator_changes_are_fed(self):
+        cursor = self._feed()['next_cursor']
+        service.update_task(self.later, 1, {'collaborators_to_add': [5]}, None)
+        service._remove_collaborators_from_subtasks(db.session.get(Task, self.soon), [4])
+        db.session.commit()
+        data = self._feed(updated_since=cursor)
+        self.assertEqual({task['id']: task['collaborator_ids'] for task in data['tasks']},
+                         {self.soon: [], self.later: [5]})
+
+    def test_invalid_arguments(self):
+        self.assertEqual(self.client.get('/tasks/with-deadlines/feed?updated_since=bogus').status_code, 400)
+        self.assertEqual(self.client.get('/tasks/with-deadlines/feed?deadline_from=soon').status_code, 400)
+
+
+class TestNdjsonStreaming(TestTaskRoutesIntegration):
+    """Accept: application/x-ndjson streams task lists one task per line"""
+
+    NDJSON = {'Accept': 'application/x-ndjson'}
+
+    def setUp(self):
+        super().setUp()
+        deadline = datetime(2030, 1, 1)
+        self.task_ids = []
+        for i in range(5):
+            task = Task(title=f"Streamed {i}", owner_id=1, deadline=deadline, project_id=self.project.id)
+            db.session.add(task)
+            db.session.flush()
+            db.session.add(Task(title=f"Sub {i}", owner_id=1, deadline=deadline,
+                                project_id=self.project.id, parent_task_id=task.id))
+            db.session.add(Comment(body='Hi', author_id=1, task_id=task.id))
+            self.task_ids.append(task.id)
+        db.session.commit()
+
+    def _lines(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    def test_with_deadlines_stream_matches_json(self):
+        expected = json.loads(self.client.get('/tasks/with-deadlines').data)
+        with patch('app.streaming.STREAM_BATCH_SIZE', 3):
+            rows = self._lines(self.client.get('/tasks/with-deadlines', headers=self.NDJSON))
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(sorted(rows, key=lambda task: task['id']), sorted(expected, key=lambda task: task['id']))
+
+    def test_project_tasks_stream(self):
+        expected = json.loads(self.client.get(f'/projects/{self.project.id}/tasks').data)
+        with patch('app.streaming.STREAM_BATCH_SIZE', 2):
+            rows = self._lines(self.client.get(f'/projects/{self.project.id}/tasks', headers=self.NDJSON))
+        self.assertEqual(rows, expected)
+
+        rows = self._lines(self.client.get(
+            f'/projects/{self.project.id}/tasks?fields=title,subtask_count', headers=self.NDJSON
+        ))
+        self.assertEqual(rows[0], {'id': self.task_ids[-1], 'title': 'Streamed 4', 'subtask_count': 1})
+
+    def test_json_remains_default(self):
+        response = self.client.get(f'/projects/{self.project.id}/tasks', headers={'Accept': '*/*'})
+        self.assertEqual(response.mimetype, 'application/json')
+        response = self.client.get('/projects/99999/tasks', headers=self.NDJSON)
+        self.assertEqual(response.status_code, 404)
+
+
+class TestConditionalGet(TestTaskRoutesIntegration):
+    """Weak ETags and If-None-Match on task and project reads"""
+
+    _count_queries = TestTaskForestSerializer._count_queries
+
+    def setUp(self):
+        super().setUp()
+        self.root = Task(title='Root', owner_id=1, project_id=self.project.id)
+        db.session.add(self.root)
+        db.session.flush()
+        self.child = Task(title='Child', owner_id=1, project_id=self.project.id, parent_task_id=self.root.id)
+        db.session.add(self.child)
+        db.session.flush()
+        self.grandchild = Task(title='Grandchild', owner_id=1, parent_task_id=self.child.id)
+        db.session.add(self.grandchild)
+        db.session.commit()
+
+    def _etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag, weak = response.get_etag()
+        self.assertTrue(weak)
+        self.assertIsNotNone(response.last_modified)
+        return etag
+
+    def _touch(self, task, when):
+        db.session.execute(db.update(Task).where(Task.id == task.id).values(updated_at=when))
+        db.session.commit()
+
+    def test_task_not_modified_costs_one_query(self):
+        url = f'/tasks/{self.root.id}'
+        etag = self._etag(url)
+        response, count = self._count_queries(
+            lambda: self.client.get(url, headers={'If-None-Match': f'W/"{etag}"'})
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(count, 1)
+
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': 'W/"other"'}).status_code, 200)
+
+    def test_deep_changes_and_deletes_change_the_etag(self):
+        url = f'/tasks/{self.root.id}'
+        etag = self._etag(url)
+        self._touch(self.grandchild, datetime(2099, 1, 1))
+        touched = self._etag(url)
+        self.assertNotEqual(touched, etag)
+
+        db.session.execute(task_collaborators.insert().values(task_id=self.grandchild.id, user_id=5))
+        db.session.commit()
+        self.assertNotEqual(self._etag(url), touched)
+
+        db.session.delete(db.session.get(Task, self.grandchild.id))
+        db.session.commit()
+        self.assertNotEqual(self._etag(url), touched)
+
+    def test_writes_committed_out_of_order_change_the_etag(self):
+        # A write stamped with an older transaction start commits after a newer one was served
+        self._touch(self.child, datetime(2099, 1, 1))
+        urls = (f'/tasks/{self.root.id}', f'/projects/{self.project.id}?user_id=1', '/projects/user/1')
+        etags = [self._etag(url) for url in urls]
+        self._touch(self.grandchild, datetime(2050, 1, 1))
+        for url, etag in zip(urls, etags):
+            self.assertEqual(self.client.get(url, headers={'If-None-Match': f'W/"{etag}"'}).status_code, 200)
+
+        # So does replacing a task by another in one transaction
+        etag = self._etag(urls[0])
+        db.session.delete(db.session.get(Task, self.grandchild.id))
+        db.session.add(Task(title='Replacement', owner_id=1, parent_task_id=self.child.id))
+        db.session.commit()
+        self.assertNotEqual(self._etag(urls[0]), etag)
+
+    def test_project_routes(self):
+        for url in (f'/projects/{self.project.id}?user_id=1', f'/projects/{self.project.id}/tasks', '/projects/user/1'):
+            etag = self._etag(url)
+            self.assertEqual(self.client.get(url, headers={'If-None-Match': f'W/"{etag}"'}).status_code, 304)
+            self._touch(self.grandchild, datetime(2099, 1, 1))
+            self.assertEqual(self.client.get(url, headers={'If-None-Match': f'W/"{etag}"'}).status_code, 200)
+            self._touch(self.grandchild, datetime(2000, 1, 1))
+
+        # Each representation has its own ETag
+        self.assertNotEqual(
+            self._etag(f'/projects/{self.project.id}/tasks'),
+            self._etag(f'/projects/{self.project.id}/tasks?view=summary')
+        )
+
+    def test_missing_and_forbidden_are_not_cached(self):
+        self.assertEqual(self.client.get('/tasks/99999').status_code, 404)
+        etag = self._etag(f'/projects/{self.project.id}?user_id=1')
+        response = self.client.get(f'/projects/{self.project.id}?user_id=42', headers={'If-None-Match': f'W/"{etag}"'})
+        self.assertEqual(response.status_code, 403)
+
+
+class TestPayloadCache(TestTaskRoutesIntegration):
+    """Read-through cache of task and project payloads"""
+
+    _count_queries = TestTaskForestSerializer._count_queries
+
+    def setUp(self):
+        super().setUp()
+        self.root = Task(title='Root', owner_id=1, project_id=self.project.id)
+        db.session.add(self.root)
+        db.session.flush()
+        self.child = Task(title='Child', owner_id=1, project_id=self.project.id, parent_task_id=self.root.id)
+        db.session.add(self.child)
+        db.session.flush()
+        self.grandchild = Task(title='Grandchild', owner_id=1, parent_task_id=self.child.id)
+        db.session.add(self.grandchild)
+        db.session.commit()
+
+    def _stats(self):
+        return self.client.get('/tasks/cache/stats').get_json()
+
+    def test_memory_backend_lru_and_ttl(self):
+        from app.cache import MemoryCacheBackend
+        now = [0]
+        backend = MemoryCacheBackend(max_entries=2, ttl=10, clock=lambda: now[0])
+        backend.set('a', 1)
+        backend.set('b', 2)
+        self.assertEqual(backend.get('a'), 1)
+        backend.set('c', 3)  # 'b' is the least recently used
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.evictions, 1)
+
+        now[0] = 10
+        self.assertIsNone(backend.get('a'))
+        self.assertEqual(backend.expirations, 1)
+        self.assertEqual(len(backend), 1)
+
+    def test_repeated_reads_are_served_from_the_cache(self):
+        url = f'/tasks/{self.root.id}'
+        first = self.client.get(url).get_json()
+        response, count = self._count_queries(lambda: self.client.get(url))
+        self.assertEqual(response.get_json(), first)
+        # Only the version probe runs
+        self.assertEqual(count, 1)
+
+        stats = self._stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 1, 1))
+        self.assertEqual(stats['backend'], 'memory')
+
+    def test_writes_invalidate_the_task_its_ancestors_and_project(self):
+        from app.service import add_comment
+        self.client.get(f'/tasks/{self.root.id}')
+        self.client.get(f'/tasks/{self.child.id}')
+        self.client.get(f'/projects/{self.project.id}?user_id=1')
+        self.assertEqual(self._stats()['size'], 3)
+
+        add_comment(self.grandchild.id, {'body': 'Deep comment', 'author_id': 1})
+        self.assertEqual(self._stats()['size'], 0)
+
+        root = self.client.get(f'/tasks/{self.root.id}').get_json()
+        grandchild = root['subtasks'][0]['subtasks'][0]
+        self.assertEqual([comment['body'] for comment in grandchild['comments']], ['Deep comment'])
+
+    def test_rolled_back_writes_keep_the_entries(self):
+        from app.service import _touch_project
+        self.client.get(f'/projects/{self.project.id}?user_id=1')
+        _touch_project(self.project)
+        db.session.rollback()
+        self.assertEqual(self._stats()['size'], 1)
+
+    def test_entries_of_an_older_version_are_not_served(self):
+        url = f'/tasks/{self.root.id}'
+        self.client.get(url)
+        db.session.execute(db.update(Task).where(Task.id == self.grandchild.id).values(
+            title='Renamed', updated_at=datetime(2099, 1, 1)))
+        db.session.commit()
+
+        root = self.client.get(url).get_json()
+        self.assertEqual(root['subtasks'][0]['subtasks'][0]['title'], 'Renamed')
+        stats = self._stats()
+        self.assertEqual((stats['hits'], stats['stale']), (0, 1))
+
+    def test_writes_committed_out_of_order_are_not_served(self):
+        url = f'/tasks/{self.root.id}'
+        db.session.execute(db.update(Task).where(Task.id == self.child.id).values(updated_at=datetime(2099, 1, 1)))
+        db.session.commit()
+        self.client.get(url)
+        # Stamped below the newest updated_at already served
+        db.session.execute(db.update(Task).where(Task.id == self.grandchild.id).values(
+            title='Renamed', updated_at=datetime(2050, 1, 1)))
+        db.session.commit()
+
+        root = self.client.get(url).get_json()
+        self.assertEqual(root['subtasks'][0]['subtasks'][0]['title'], 'Renamed')
+        self.assertEqual(self._stats()['hits'], 0)
+
+    def test_disabled_backend(self):
+        from app.cache import init_payload_cache
+        self.app.config['PAYLOAD_CACHE_BACKEND'] = 'none'
+        init_payload_cache(self.app)
+        url = f'/tasks/{self.root.id}'
+        self.client.get(url)
+        self.client.get(url)
+        stats = self._stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (0, 2, 0))
+
+        self.app.config['PAYLOAD_CACHE_BACKEND'] = 'redis'
+        with self.assertRaises(ValueError):
+            init_payload_cache(self.app)
+
+
+class TestChangeFeed(TestTaskRoutesIntegration):
+    """GET /changes delta sync"""
+
+    def setUp(self):
+        super().setUp()
+        self.shared = Task(title='Shared', owner_id=1, project_id=self.project.id)
+        self.private = Task(title='Private', owner_id=2)
+        db.session.add_all([self.shared, self.private])
+        db.session.flush()
+        self.subtask = Task(title='Subtask', owner_id=1, parent_task_id=self.shared.id)
+        db.session.add(self.subtask)
+        db.session.flush()
+        db.session.execute(task_collaborators.insert().values(task_id=self.subtask.id, user_id=3))
+        db.session.commit()
+        self._age_everything()
+        self.cursor = self._changes(1)['cursor']
+
+    def _age_everything(self):
+        old = datetime(2020, 1, 1)
+        db.session.execute(db.update(Task).values(created_at=old, updated_at=old))
+        db.session.execute(db.update(Project).values(created_at=old, updated_at=old))
+        db.session.commit()
+
+    def _changes(self, user_id, since=None, **params):
+        params.update(user_id=user_id)
+        if since:
+            params['since'] = since
+        response = self.client.get('/changes', query_string=params)
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_visibility_changes_pending_in_the_transaction_are_applied_first(self):
+        from app.changes import get_changes
+        # Shared in the same transaction as the poll, before the index was refreshed
+        db.session.execute(task_collaborators.insert().values(task_id=self.private.id, user_id=5))
+        db.session.execute(db.update(Task).where(Task.id == self.private.id).values(title='Shared now'))
+
+        changes = get_changes(5, self.cursor)
+        self.assertEqual(changes['tasks']['updated'], [self.private.id])
+        db.session.rollback()
+
+    def test_first_call_resets(self):
+        changes = self._changes(1)
+        self.assertTrue(changes['reset'])
+        self.assertEqual(changes['tasks'], {'created': [], 'updated': [], 'deleted': []})
+        self.assertIsNotNone(changes['cursor'])
+
+    def test_nothing_changed(self):
+        changes = self._changes(1, self.cursor)
+        self.assertFalse(changes['reset'])
+        self.assertEqual(changes['tasks'], {'created': [], 'updated': [], 'deleted': []})
+        self.assertEqual(changes['projects'], {'created': [], 'updated': [], 'deleted': []})
+
+    def test_created_and_updated_tasks_and_projects(self):
+        from app.service import update_project
+        response = self.client.post('/tasks', json={'title': 'New', 'owner_id': 1})
+        new_id = response.get_json()['id']
+        self.client.put(f'/tasks/{self.subtask.id}', json={'user_id': 1, 'title': 'Renamed subtask'})
+        update_project(self.project.id, 1, {'title': 'Renamed project'})
+
+        changes = self._changes(1, self.cursor)
+        self.assertEqual(changes['tasks']['created'], [new_id])
+        self.assertIn(self.subtask.id, changes['tasks']['updated'])
+        self.assertEqual(changes['projects']['updated'], [self.project.id])
+
+        # Another user only sees the changes to what they can see
+        changes = self._changes(3, self.cursor)
+        self.assertEqual(changes['tasks']['created'], [])
+        self.assertIn(self.subtask.id, changes['tasks']['updated'])
+        self.assertEqual(changes['projects']['updated'], [])
+
+        summary = self._changes(1, self.cursor, view='summary')['tasks']['created'][0]
+        self.assertEqual((summary['id'], summary['title']), (new_id, 'New'))
+
+    def test_deletes_leave_tombstones_for_everyone_who_saw_them(self):
+        from app.service import delete_task
+        self.assertTrue(delete_task(self.subtask.id, 1)[0])
+        self.assertTrue(delete_task(self.private.id, 2)[0])
+
+        self.assertEqual(self._changes(1, self.cursor)['tasks']['deleted'], [self.subtask.id])
+        self.assertEqual(self._changes(2, self.cursor)['tasks']['deleted'], [self.private.id])
+        self.assertEqual(self._changes(3, self.cursor)['tasks']['deleted'], [self.subtask.id])
+        self.assertEqual(self._changes(4, self.cursor)['tasks']['deleted'], [])
+
+        project = Project(title='Doomed', owner_id=5)
+        db.session.add(project)
+        db.session.commit()
+        project_id = project.id
+        db.session.delete(project)
+        db.session.commit()
+        self.assertEqual(self._changes(5, self.cursor)['projects']['deleted'], [project_id])
+
+    def test_cursor_past_retention_resets_and_prune(self):
+        from app.models import change_tombstones
+        from app.pagination import encode_cursor
+        db.session.execute(change_tombstones.insert().values(
+            user_id=1, entity_type='task', entity_id=999, deleted_at=datetime(2000, 1, 1)))
+        db.session.commit()
+
+        stale = encode_cursor('changes', False, datetime(2000, 1, 1), 0)
+        self.assertTrue(self._changes(1, stale)['reset'])
+
+        result = self.app.test_cli_runner().invoke(args=['changes', 'prune'])
+        self.assertIn('change tombstones pruned: 1 rows', result.output)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/changes').status_code, 400)
+        self.assertEqual(self.client.get('/changes?user_id=1&since=garbage').status_code, 400)
+
+
+class TestTaskEvents(TestTaskRoutesIntegration):
+    """Live task events and the GET /tasks/events stream"""
+
+    def setUp(self):
+        super().setUp()
+        from app.events import get_event_broker
+        self.broker = get_event_broker()
+        self.task = Task(title='Watched', owner_id=1)
+        db.session.add(self.task)
+        db.session.flush()
+        db.session.execute(task_collaborators.insert().values(task_id=self.task.id, user_id=3))
+        db.session.commit()
+
+    def _drain(self, subscription):
+        events = []
+        while True:
+            task_event = subscription.get(timeout=0)
+            if task_event is None:
+                return events
+            events.append(task_event)
+
+    @patch('app.rabbitmq_publisher.publish_status_update')
+    def test_commits_publish_to_the_users_who_can_see_the_task(self, mock_publish):
+        owner, collaborator, stranger = (self.broker.subscribe(user_id) for user_id in (1, 3, 4))
+
+        self.client.put(f'/tasks/{self.task.id}', json={'user_id': 1, 'status': 'Ongoing'})
+        events = self._drain(collaborator)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]['event'], 'task.status_changed')
+        self.assertEqual((events[0]['task_id'], events[0]['old_status'], events[0]['new_status']),
+                         (self.task.id, 'Unassigned', 'Ongoing'))
+        self.assertNotIn('user_ids', events[0])
+        self.assertEqual(len(self._drain(owner)), 1)
+        self.assertEqual(self._drain(stranger), [])
+        mock_publish.assert_called_once()
+
+        new_id = self.client.post('/tasks', json={'title': 'Mine', 'owner_id': 1}).get_json()['id']
+        self.assertEqual([(e['event'], e['task_id']) for e in self._drain(owner)], [('task.created', new_id)])
+        self.assertEqual(self._drain(collaborator), [])
+
+    def test_deletes_and_rollbacks(self):
+        subscription = self.broker.subscribe(3)
+        self.task.title = 'Not saved'
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(self._drain(subscription), [])
+
+        task_id = self.task.id
+        db.session.delete(self.task)
+        db.session.commit()
+        self.assertEqual([(e['event'], e['task_id']) for e in self._drain(subscription)], [('task.deleted', task_id)])
+
+        subscription.close()
+        self.broker.dispatch([{'event': 'task.updated', 'task_id': 1, 'user_ids': [3]}])
+        self.assertEqual(self._drain(subscription), [])
+
+    def test_event_stream(self):
+        self.app.config.update(SSE_HEARTBEAT_SECONDS=0.01, SSE_MAX_STREAM_SECONDS=2)
+        self.assertEqual(self.client.get('/tasks/events').status_code, 400)
+
+        response = self.client.get('/tasks/events?user_id=3', buffered=False)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.task.title = 'Renamed'
+        db.session.commit()
+
+        chunks = []
+        for chunk in response.iter_encoded():
+            chunks.append(chunk.decode())
+            if chunk.startswith(b'event:'):
+                break
+        response.close()
+        self.assertEqual(chunks[0], 'retry: 3000\n\n')
+        event_name, data = chunks[-1].strip().split('\n')
+        self.assertEqual(event_name, 'event: task.updated')
+        self.assertEqual(json.loads(data[len('data: '):])['task_id'], self.task.id)
+        self.assertEqual(self.broker._subscriptions, set())
+
+    def test_slow_clients_are_told_to_resync(self):
+        from app.events import LocalEventBroker, event_stream
+        broker = LocalEventBroker(queue_size=1)
+        subscription = broker.subscribe(1)
+        broker.dispatch([{'event': 'task.updated', 'task_id': task_id, 'user_ids': [1]} for task_id in (1, 2)])
+        chunks = list(event_stream(subscription, heartbeat=0.01, max_seconds=1))
+        self.assertEqual(chunks[-1], 'event: resync\ndata: {}\n\n')
+
+    def test_nothing_is_collected_without_subscribers(self):
+        with patch('app.events.task_audiences') as mock_audiences:
+            self.client.put(f'/tasks/{self.task.id}', json={'user_id': 1, 'title': 'Unwatched'})
+            db.session.delete(db.session.get(Task, self.task.id))
+            db.session.commit()
+        mock_audiences.assert_not_called()
+
+    def test_streams_per_worker_are_capped(self):
+        self.broker.max_connections = 1
+        try:
+            subscription = self.broker.subscribe(1)
+            response = self.client.get('/tasks/events?user_id=3')
+            self.assertEqual(response.status_code, 503)
+            self.assertIn('Retry-After', response.headers)
+            subscription.close()
+        finally:
+            self.broker.max_connections = None
+
+    def test_exchange_publisher_keeps_one_connection(self):
+        import time
+        from app.rabbitmq_publisher import ExchangePublisher
+        with patch('app.rabbitmq_publisher.pika.BlockingConnection') as mock_connection:
+            publisher = ExchangePublisher('amqp://test', 'test_exchange')
+            for number in range(3):
+                self.assertTrue(publisher.publish({'number': number}))
+            channel = mock_connection.return_value.channel.return_value
+            deadline = time.monotonic() + 2
+            while channel.basic_publish.call_count < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        mock_connection.assert_called_once()
+        self.assertEqual([json.loads(call.kwargs['body'])['number'] for call in channel.basic_publish.call_args_list],
+                         [0, 1, 2])
+
+
+class TestBatchRequests(TestTaskRoutesIntegration):
+    """POST /tasks/batch"""
+
+    def setUp(self):
+        super().setUp()
+        self.task = Task(title='Batched', owner_id=1)
+        db.session.add(self.task)
+        db.session.flush()
+        db.session.execute(task_collaborators.insert().values(task_id=self.task.id, user_id=3))
+        db.session.commit()
+
+    def _batch(self, requests_, status=200):
+        response = self.client.post('/tasks/batch', json=requests_)
+        self.assertEqual(response.status_code, status)
+        return response.get_json()
+
+    def test_results_in_request_order(self):
+        results = self._batch([
+            {'path': f'/tasks/{self.task.id}'},
+            {'method': 'get', 'path': f'/tasks/{self.task.id}/collaborators'},
+            {'path': '/tasks/99999'},
+            {'method': 'POST', 'path': '/tasks', 'body': {'title': 'From batch', 'owner_id': 1}},
+            {'path': '/tasks?owner_id=1&view=summary'},
+        ])
+        self.assertEqual([result['status'] for result in results], [200, 200, 404, 201, 200])
+        self.assertEqual(results[0]['body']['title'], 'Batched')
+        self.assertEqual(results[2]['body'], {'error': 'Task not found'})
+        # Later sub-requests see what earlier ones wrote
+        self.assertIn('From batch', [task['title'] for task in results[4]['body']])
+
+    def test_sub_request_headers(self):
+        first = self._batch([{'path': f'/tasks/{self.task.id}'}])[0]
+        etag = first['headers']['ETag']
+        again = self._batch([{'path': f'/tasks/{self.task.id}', 'headers': {'If-None-Match': etag}}])[0]
+        self.assertEqual((again['status'], again['body']), (304, None))
+
+    def test_invalid_batches(self):
+        self.assertIn('error', self._batch({'path': '/tasks/1'}, 400))
+        self.assertIn('error', self._batch([], 400))
+        self.assertIn('error', self._batch([{'path': 'tasks/1'}], 400))
+        self.assertIn('error', self._batch([{'method': 'TRACE', 'path': '/tasks/1'}], 400))
+        self.assertIn('error', self._batch([{'path': '/health'}] * 21, 400))
+
+        results = self._batch([{'method': 'POST', 'path': '/tasks/batch', 'body': []}, {'path': '/tasks/events?user_id=1'}])
+        self.assertEqual([result['status'] for result in results], [400, 400])
+
+    def test_sub_request_header_names_are_case_insensitive(self):
+        self.app.config['COMPRESS_MIN_SIZE'] = 0
+        result = self._batch([{'path': f'/tasks/{self.task.id}', 'headers': {'accept-encoding': 'gzip'}}])[0]
+        self.assertEqual(result['status'], 200)
+        self.assertNotIn('Content-Encoding', result['headers'])
+        self.assertEqual(result['body']['title'], 'Batched')
+
+    @patch('app.routes.service.get_task_details')
+    def test_failed_transactions_do_not_leak_into_later_sub_requests(self, mock_get_task_details):
+        def failing_flush(*args, **kwargs):
+            # Leaves the shared session in a failed transaction; the route only answers 500
+            db.session.add(Task(owner_id=1))
+            db.session.flush()
+
+        mock_get_task_details.side_effect = failing_flush
+        results = self._batch([{'path': f'/tasks/{self.task.id}'}, {'path': '/projects/1?user_id=1'}])
+        self.assertEqual([result['status'] for result in results], [500, 200])
+        self.assertEqual(results[1]['body']['id'], 1)
+
+    @patch('app.routes.service.get_task_details')
+    def test_unexpected_errors_stay_in_their_result(self, mock_get_task_details):
+        mock_get_task_details.side_effect = Exception('boom')
+        results = self._batch([{'path': f'/tasks/{self.task.id}'}, {'path': '/health'}])
+        self.assertEqual([result['status'] for result in results], [500, 200])
+
+
+class TestResponseEncoding(TestTaskRoutesIntegration):
+    """Compression, columnar JSON / MessagePack lists and the orjson provider"""
+
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([
+            Task(title=f'Encoded task {i}', description='Repetitive description ' * 5, owner_id=1, priority=i % 10)
+            for i in range(20)
+        ])
+        db.session.commit()
+
+    def test_large_bodies_are_compressed_when_accepted(self):
+        import gzip
+        import zlib
+        plain = self.client.get('/tasks?owner_id=1')
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertIn('Accept-Encoding', plain.headers['Vary'])
+
+        gzipped = self.client.get('/tasks?owner_id=1', headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(gzipped.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(gzipped.data), plain.data)
+        self.assertLess(len(gzipped.data), len(plain.data) // 4)
+
+        deflated = self.client.get('/tasks?owner_id=1', headers={'Accept-Encoding': 'deflate'})
+        self.assertEqual(zlib.decompress(deflated.data), plain.data)
+
+        # Below the threshold
+        small = self.client.get('/tasks/99999', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', small.headers)
+
+    def test_columnar_lists(self):
+        rows = self.client.get('/tasks?owner_id=1&fields=title,priority').get_json()
+        response = self.client.get('/tasks?owner_id=1&fields=title,priority',
+                                   headers={'Accept': 'application/vnd.columnar+json'})
+        self.assertEqual(response.mimetype, 'application/vnd.columnar+json')
+        table = json.loads(response.data)
+        self.assertEqual(table['columns'], ['id', 'title', 'priority'])
+        self.assertEqual([dict(zip(table['columns'], row)) for row in table['rows']], rows)
+
+        page = json.loads(self.client.get('/tasks?owner_id=1&view=summary&limit=5',
+                                          headers={'Accept': 'application/vnd.columnar+json'}).data)
+        self.assertEqual(len(page['tasks']['rows']), 5)
+        self.assertIsNotNone(page['next_cursor'])
+
+        # JSON stays the default
+        self.assertEqual(self.client.get('/tasks?owner_id=1', headers={'Accept': '*/*'}).mimetype, 'application/json')
+
+    def test_msgpack_lists(self):
+        from app import encoding
+        if encoding.msgpack is None:
+            self.skipTest('msgpack is not installed')
+        response = self.client.get('/tasks?owner_id=1', headers={'Accept': 'application/msgpack'})
+        self.assertEqual(response.mimetype, 'application/msgpack')
+        self.assertEqual(encoding.msgpack.unpackb(response.data), self.client.get('/tasks?owner_id=1').get_json())
+
+    def test_orjson_provider_matches_the_default_provider(self):
+        from flask.json.provider import DefaultJSONProvider
+        payload = {'b': [1, 2.5, None, True], 'a': {'when': datetime(2025, 1, 2, 3, 4, 5), 'n': 'x'}, 'c': 'caf\u00e9'}
+        default = DefaultJSONProvider(self.app)
+        self.assertEqual(json.loads(self.app.json.dumps(payload)), json.loads(default.dumps(payload)))
+        with self.app.test_request_context():
+            fast, slow = self.app.json.response(payload).data, default.response(payload).data
+        # Same document, only the non-ASCII characters are not escaped
+        self.assertEqual(fast.decode(), slow.decode().replace('\\u00e9', '\u00e9'))
+
+
+class TestBulkTaskCreate(TestTaskRoutesIntegration):
+    """POST /tasks/bulk"""
+
+    def _plan(self, size, collaborator_id=2):
+        return [
+            {'title': f'Phase {i}', 'owner_id': 1, 'project_id': 1, 'subtasks': [
+                {'title': f'Step {i}.{j}', 'collaborators_to_add': [collaborator_id]} for j in range(3)
+            ]}
+            for i in range(size)
+        ]
+
+    def _collaborators(self, task_id):
+        return set(db.session.execute(
+            db.select(task_collaborators.c.user_id).where(task_collaborators.c.task_id == task_id)
+        ).scalars())
+
+    def test_creates_nested_tasks_with_collaborators(self):
+        from app.visibility import verify_task_visibility
+        from app.closure import verify_task_closure
+        # Core inserts keep task_closure in sync too
+        self.app.config['TASK_CLOSURE_ENABLED'] = True
+        response = self.client.post('/tasks/bulk', json={'tasks': [
+            {'title': 'Launch', 'owner_id': 1, 'project_id': 1, 'deadline': '2025-06-01T00:00:00Z',
+             'collaborators_to_add': [3], 'subtasks': [
+                {'title': 'Design', 'status': 'Ongoing', 'subtasks': [
+                    {'title': 'Mockups', 'owner_id': 4}
+                ]},
+                {'title': 'Build', 'collaborators_to_add': [5]},
+            ]},
+            {'title': 'Standalone', 'owner_id': 2},
+        ]})
+        self.assertEqual(response.status_code, 201)
+        body = response.get_json()
+        self.assertEqual(body['count'], 5)
+        launch, standalone = body['tasks']
+        (design, build), (mockups,) = launch['subtasks'], launch['subtasks'][0]['subtasks']
+
+        db.session.expire_all()
+        mockups_task = db.session.get(Task, mockups['id'])
+        self.assertEqual(mockups_task.parent_task_id, design['id'])
+        self.assertEqual((mockups_task.project_id, mockups_task.owner_id), (1, 4))
+        self.assertEqual(db.session.get(Task, design['id']).status, TaskStatusEnum.ONGOING)
+        self.assertEqual(db.session.get(Task, launch['id']).subtask_count, 2)
+        self.assertIsNone(db.session.get(Task, standalone['id']).project_id)
+
+        # Collaborators climb to every ancestor and into the project, as with create_task
+        self.assertEqual(self._collaborators(launch['id']), {1, 3, 4, 5})
+        self.assertEqual(self._collaborators(design['id']), {1, 4})
+        self.assertEqual(self._collaborators(build['id']), {1, 5})
+        self.assertEqual(db.session.get(Project, 1).collaborator_ids(), [1, 3, 4, 5])
+        self.assertEqual(verify_task_visibility(), (set(), set()))
+        self.assertEqual(verify_task_closure(), (set(), set()))
+        visible = [task['id'] for task in self.client.get('/tasks?owner_id=4').get_json()]
+        self.assertEqual(visible, [launch['id']])
+
+    def test_tasks_under_an_existing_parent(self):
+        parent = service.create_task({'title': 'Existing', 'owner_id': 1, 'project_id': 1})
+        child = service.create_task({'title': 'Existing child', 'owner_id': 1, 'parent_task_id': parent.id,
+                                     'project_id': 1})
+        parent_id, child_id = parent.id, child.id
+
+        created = service.create_tasks_bulk([
+            {'title': 'Imported', 'owner_id': 6, 'parent_task_id': child_id, 'project_id': 1}
+        ])
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Task, created[0]['id']).parent_task_id, child_id)
+        self.assertEqual(db.session.get(Task, child_id).subtask_count, 1)
+        self.assertIn(6, self._collaborators(parent_id))
+        self.assertIn(6, self._collaborators(child_id))
+        self.assertIn(6, db.session.get(Project, 1).collaborator_ids())
+
+    def _count_statements(self, func):
+        from sqlalchemy import event
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            result = func()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+        # SQLite cannot return the ids of a multi-row INSERT in order, so there the task INSERTs
+        # run row by row (PostgreSQL batches them); everything else must not grow
+        task_inserts = [statement for statement in statements if statement.startswith('INSERT INTO tasks')]
+        return result, len(statements) - len(task_inserts)
+
+    def test_statement_count_does_not_grow_with_the_batch(self):
+        _, small = self._count_statements(lambda: service.create_tasks_bulk(self._plan(2)))
+        created, large = self._count_statements(lambda: service.create_tasks_bulk(self._plan(50, 3)))
+        self.assertEqual(len(created), 50)
+        self.assertEqual(small, large)
+        self.assertEqual(db.session.query(Task).count(), 208)
+
+    def test_invalid_batches_create_nothing(self):
+        for tasks in (None, [], [{'title': 'No owner'}],
+                      [{'title': 'Ok', 'owner_id': 1, 'subtasks': [{'description': 'No title'}]}],
+                      [{'title': 'Orphan', 'owner_id': 1, 'parent_task_id': 999}],
+                      [{'title': 'Lost', 'owner_id': 1, 'project_id': 999}]):
+            response = self.client.post('/tasks/bulk', json={'tasks': tasks})
+            self.assertEqual(response.status_code, 400, tasks)
+        self.assertEqual(db.session.query(Task).count(), 0)
+
+        with patch('app.service.MAX_BULK_TASKS', 5):
+            response = self.client.post('/tasks/bulk', json={'tasks': self._plan(2)})
+        self.assertEqual(response.status_code, 400)
+
+    def test_created_tasks_are_announced(self):
+        from app.events import get_event_broker
+        subscription = get_event_broker().subscribe(2)
+        created = service.create_tasks_bulk(self._plan(1))
+        events = []
+        while (task_event := subscription.get(timeout=0)) is not None:
+            events.append(task_event)
+        subscription.close()
+        expected = {created[0]['id']} | {node['id'] for node in created[0]['subtasks']}
+        self.assertEqual({e['task_id'] for e in events if e['event'] == 'task.created'}, expected)
+
+
+class TestBulkStatusUpdate(TestTaskRoutesIntegration):
+    """POST /tasks/status:bulk"""
+
+    _count_statements = TestBulkTaskCreate._count_statements
+
+    def setUp(self):
+        super().setUp()
+        self.ids = [node['id'] for node in service.create_tasks_bulk([
+            {'title': f'Task {i}', 'owner_id': 1, 'project_id': 1} for i in range(3)
+        ])]
+        # User 2 collaborates on the last task only
+        db.session.execute(task_collaborators.insert().values(task_id=self.ids[2], user_id=2))
+        db.session.commit()
+
+    def _status(self, task_id):
+        db.session.expire_all()
+        return db.session.get(Task, task_id).status
+
+    def _status_logs(self):
+        return db.session.query(TaskActivityLog).filter_by(field_changed='status').count()
+
+    @patch('app.rabbitmq_publisher.publish_to_rabbitmq')
+    def test_changes_statuses_in_one_commit_and_one_message(self, mock_publish):
+        response = self.client.post('/tasks/status:bulk', json={'user_id': 1, 'updates': [
+            {'task_id': self.ids[0], 'status': 'Ongoing'},
+            {'task_id': self.ids[1], 'status': 'Completed'},
+            {'task_id': self.ids[2], 'status': 'Unassigned'},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        # Unchanged statuses are skipped
+        self.assertEqual(body['updated'], [
+            {'task_id': self.ids[0], 'old_status': 'Unassigned', 'new_status': 'Ongoing'},
+            {'task_id': self.ids[1], 'old_status': 'Unassigned', 'new_status': 'Completed'},
+        ])
+        self.assertEqual(self._status(self.ids[1]), TaskStatusEnum.COMPLETED)
+        self.assertEqual(self._status_logs(), 2)
+
+        mock_publish.assert_called_once()
+        queue_name, message = mock_publish.call_args[0]
+        self.assertEqual(queue_name, 'task_status_updates')
+        self.assertEqual([(u['task_id'], u['changed_by_id']) for u in message['updates']],
+                         [(self.ids[0], 1), (self.ids[1], 1)])
+
+        # Collaborators may change the status of the tasks they work on, by id list
+        response = self.client.post('/tasks/status:bulk', json={
+            'user_id': 2, 'task_ids': [self.ids[2]], 'status': 'Under Review'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._status(self.ids[2]), TaskStatusEnum.UNDER_REVIEW)
+
+    @patch('app.rabbitmq_publisher.publish_to_rabbitmq')
+    def test_refused_batches_write_nothing(self, mock_publish):
+        subtask_id = service.create_tasks_bulk([
+            {'title': 'Sub', 'owner_id': 1, 'parent_task_id': self.ids[0]}
+        ])[0]['id']
+        cases = [
+            ({'user_id': 1, 'updates': [{'task_id': self.ids[1], 'status': 'Ongoing'},
+                                        {'task_id': self.ids[0], 'status': 'Completed'}]}, 400),
+            ({'user_id': 2, 'task_ids': [self.ids[2], self.ids[1]], 'status': 'Ongoing'}, 403),
+            ({'user_id': 1, 'task_ids': [self.ids[1], 999], 'status': 'Ongoing'}, 404),
+            ({'user_id': 1, 'task_ids': [self.ids[1]], 'status': 'Nope'}, 400),
+            ({'user_id': 1, 'updates': [{'task_id': self.ids[1]}]}, 400),
+            ({'user_id': 1, 'updates': [{'task_id': [self.ids[1]], 'status': 'Ongoing'}]}, 400),
+            ({'user_id': 1, 'updates': [{'task_id': {'id': 1}, 'status': 'Ongoing'}]}, 400),
+            ({'user_id': 1, 'updates': [{'task_id': self.ids[1], 'status': ['Ongoing']}]}, 400),
+            ({'task_ids': [self.ids[1]], 'status': 'Ongoing'}, 400),
+        ]
+        for payload, status_code in cases:
+            response = self.client.post('/tasks/status:bulk', json=payload)
+            self.assertEqual(response.status_code, status_code, payload)
+        self.assertEqual(self._status(self.ids[1]), TaskStatusEnum.UNASSIGNED)
+        self.assertEqual(self._status_logs(), 0)
+        mock_publish.assert_not_called()
+
+        # Completing the subtask in the same request unblocks the parent
+        result, error = service.update_tasks_status(1, [
+            {'task_id': self.ids[0], 'status': 'Completed'},
+            {'task_id': subtask_id, 'status': 'Completed'},
+        ])
+        self.assertIsNone(error)
+        self.assertEqual(self._status(self.ids[0]), TaskStatusEnum.COMPLETED)
+
+    @patch('app.rabbitmq_publisher.publish_to_rabbitmq')
+    def test_next_recurring_instances_are_created_in_bulk(self, mock_publish):
+        from app.visibility import verify_task_visibility
+        from app.closure import verify_task_closure, rebuild_task_closure
+        # Enabled on an existing database: rebuilt first, then kept in sync by the Core inserts
+        self.app.config['TASK_CLOSURE_ENABLED'] = True
+        rebuild_task_closure()
+        created = service.create_tasks_bulk([
+            {'title': f'Weekly {i}', 'owner_id': 1, 'project_id': 1, 'is_recurring': True,
+             'recurrence_interval': 'weekly', 'deadline': datetime(2030, 1, 1 + i), 'collaborators_to_add': [3],
+             'subtasks': [{'title': f'Weekly {i} prep', 'status': 'Completed', 'collaborators_to_add': [4]}]}
+            for i in range(2)
+        ])
+        recurring_ids = [node['id'] for node in created]
+
+        result, error = service.update_tasks_status(1, [
+            {'task_id': task_id, 'status': 'Completed'} for task_id in recurring_ids
+        ])
+        self.assertIsNone(error)
+        self.assertEqual([item['task_id'] for item in result['recurring']], recurring_ids)
+
+        db.session.expire_all()
+        for i, item in enumerate(result['recurring']):
+            self.assertFalse(db.session.get(Task, item['task_id']).is_recurring)
+            next_task = db.session.get(Task, item['next_task_id'])
+            self.assertTrue(next_task.is_recurring)
+            self.assertEqual(next_task.deadline, datetime(2030, 1, 8 + i))
+            self.assertEqual(next_task.status, TaskStatusEnum.UNASSIGNED)
+            self.assertEqual(sorted(next_task.collaborator_ids()), [1, 3, 4])
+            self.assertEqual(next_task.subtask_count, 1)
+            (copied_subtask,) = next_task.subtasks
+            self.assertEqual((copied_subtask.title, copied_subtask.status), (f'Weekly {i} prep', TaskStatusEnum.UNASSIGNED))
+            self.assertEqual(sorted(copied_subtask.collaborator_ids()), [1, 4])
+        self.assertEqual(verify_task_visibility(), (set(), set()))
+        self.assertEqual(verify_task_closure(), (set(), set()))
+
+    @patch('app.rabbitmq_publisher.publish_to_rabbitmq')
+    def test_statement_count_does_not_grow_with_the_batch(self, mock_publish):
+        more_ids = [node['id'] for node in service.create_tasks_bulk([
+            {'title': f'More {i}', 'owner_id': 1, 'project_id': 1} for i in range(30)
+        ])]
+        _, small = self._count_statements(lambda: service.update_tasks_status(1, [
+            {'task_id': task_id, 'status': 'Ongoing'} for task_id in self.ids
+        ]))
+        _, large = self._count_statements(lambda: service.update_tasks_status(1, [
+            {'task_id': task_id, 'status': 'Ongoing'} for task_id in more_ids
+        ]))
+        self.assertEqual(small, large)
+        self.assertEqual(mock_publish.call_count, 2)
+
+
+class TestProjectMembershipCascades(TestTaskRoutesIntegration):
+    """Set-based project collaborator cascades"""
+
+    _count_statements = TestBulkTaskCreate._count_statements
+
+    def _links(self, user_id):
+        return set(db.session.execute(
+            db.select(task_collaborators.c.task_id).where(task_collaborators.c.user_id == user_id)
+        ).scalars())
+
+    def _project_with_tasks(self, size):
+        project = Project(title=f'Project of {size}', owner_id=1)
+        db.session.add(project)
+        db.session.commit()
+        created = service.create_tasks_bulk([
+            {'title': f'Task {i}', 'owner_id': 1, 'project_id': project.id, 'collaborators_to_add': [2],
+             'subtasks': [{'title': f'Task {i} step'}]}
+            for i in range(size)
+        ])
+        return project.id, created
+
+    def test_removing_a_collaborator_cascades_over_the_subtree(self):
+        from app.visibility import verify_task_visibility
+        project_id, created = self._project_with_tasks(2)
+        # A subtask added without a project still belongs to the project's subtree
+        loose = service.create_task({'title': 'Loose', 'owner_id': 1, 'parent_task_id': created[0]['id'],
+                                     'collaborators_to_add': [2]})
+        owned = service.create_task({'title': 'Owned by 2', 'owner_id': 2, 'project_id': project_id})
+        loose_id, owned_id = loose.id, owned.id
+
+        result, error = service.remove_project_collaborator(project_id, 1, 2)
+        self.assertIsNone(error)
+        db.session.expire_all()
+        # Their own task leaves the project and keeps its link; every other link is gone
+        self.assertIsNone(db.session.get(Task, owned_id).project_id)
+        self.assertEqual(self._links(2), {owned_id})
+        self.assertNotIn(loose_id, self._links(2))
+        self.assertNotIn(2, db.session.get(Project, project_id).collaborator_ids())
+        self.assertEqual(verify_task_visibility(), (set(), set()))
+
+    def test_update_project_changes_membership_in_one_go(self):
+        project_id, created = self._project_with_tasks(2)
+        result, message = service.update_project(project_id, 1, {
+            'collaborators_to_add': [3, 4, 2, 1], 'collaborators_to_remove': [2]
+        })
+        self.assertIsNotNone(result, message)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Project, project_id).collaborator_ids(), [1, 3, 4])
+        self.assertEqual(self._links(2), set())
+
+        _, error = service.add_project_collaborator(project_id, 1, 3)
+        self.assertEqual(error, "User is already a collaborator on this project")
+
+    def test_statement_count_does_not_grow_with_the_project(self):
+        small_id, _ = self._project_with_tasks(3)
+        large_id, _ = self._project_with_tasks(60)
+        _, small = self._count_statements(lambda: service.update_project(small_id, 1, {
+            'deadline': '2030-01-01T00:00:00Z', 'collaborators_to_add': [5, 6], 'collaborators_to_remove': [2]
+        }))
+        _, large = self._count_statements(lambda: service.update_project(large_id, 1, {
+            'deadline': '2030-01-01T00:00:00Z', 'collaborators_to_add': [5, 6], 'collaborators_to_remove': [2]
+        }))
+        self.assertEqual(small, large)
+        self.assertEqual(self._links(2), set())
+
+
+class TestUpdateTaskTransaction(TestTaskRoutesIntegration):
+    """update_task writes everything in one transaction"""
+
+    def _task(self):
+        task = service.create_task({'title': 'Draft', 'owner_id': 1, 'project_id': 1, 'priority': 3,
+                                    'subtasks': [], 'collaborators_to_add': []})
+        subtask = service.create_task({'title': 'Step', 'owner_id': 1, 'parent_task_id': task.id,
+                                       'deadline': '2030-06-01T00:00:00Z'})
+        return task.id, subtask.id
+
+    def test_update_commits_once_with_one_activity_insert(self):
+        from sqlalchemy import event
+        task_id, subtask_id = self._task()
+        inserts = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('INSERT INTO task_activity_log'):
+                inserts.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            with patch.object(db.session, 'commit', wraps=db.session.commit) as commit:
+                result, message = service.update_task(task_id, 1, {
+                    'title': 'Final', 'description': 'Now with details', 'priority': 5,
+                    'deadline': '2030-01-01T00:00:00Z', 'owner_id': 2
+                }, 'Reworked')
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+        self.assertEqual(message, "Task updated successfully")
+        self.assertEqual(result['title'], 'Final')
+        self.assertEqual(commit.call_count, 1)
+        self.assertEqual(len(inserts), 1)
+
+        logged = set(db.session.execute(
+            db.select(TaskActivityLog.field_changed).where(TaskActivityLog.task_id == task_id)
+        ).scalars())
+        self.assertEqual(logged, {'title', 'description', 'priority', 'deadline', 'owner_id', 'collaborators_added'})
+        self.assertEqual([comment.body for comment in db.session.get(Task, task_id).comments], ['Reworked'])
+        # The deadline still cascades to the subtask
+        self.assertEqual(db.session.get(Task, subtask_id).deadline, datetime(2030, 1, 1))
+
+    def test_rejected_update_writes_nothing(self):
+        task_id, _ = self._task()
+        result, message = service.update_task(task_id, 1, {'title': 'Changed', 'status': 'Finished'}, 'Note')
+        self.assertIsNone(result)
+        self.assertEqual(message, "Invalid status value")
+
+        result, message = service.update_task(task_id, 1, {'title': 'Changed', 'status': 'Completed'}, None)
+        self.assertEqual(message, "Cannot mark task as completed while it has incomplete subtasks.")
+
+        db.session.commit()
+        db.session.expire_all()
+        task = db.session.get(Task, task_id)
+        self.assertEqual(task.title, 'Draft')
+        self.assertEqual(task.comments, [])
+        self.assertEqual(db.session.execute(
+            db.select(db.func.count()).select_from(TaskActivityLog).where(TaskActivityLog.task_id == task_id)
+        ).scalar(), 0)
+
+
+class TestOptimisticConcurrency(TestTaskRoutesIntegration):
+    """Conditional PUT /tasks/<id> and PUT /projects/<id> against the version column"""
+
+    def _put(self, path, body, if_match=None):
+        headers = {'If-Match': if_match} if if_match else {}
+        return self.client.put(path, data=json.dumps(body), content_type='application/json', headers=headers)
+
+    def test_task_write_with_current_version_bumps_it(self):
+        task = service.create_task({'title': 'Versioned', 'owner_id': 1})
+        self.assertEqual(task.version, 1)
+
+        response = self._put(f'/tasks/{task.id}', {'user_id': 1, 'title': 'First'}, if_match='"1"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['version'], 2)
+
+        # The version may also travel in the body
+        response = self._put(f'/tasks/{task.id}', {'user_id': 1, 'title': 'Second', 'version': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['version'], 3)
+
+    def test_stale_task_write_is_rejected(self):
+        task = service.create_task({'title': 'Versioned', 'owner_id': 1})
+        task_id = task.id
+        self._put(f'/tasks/{task_id}', {'user_id': 1, 'title': 'Theirs'})
+
+        response = self._put(f'/tasks/{task_id}', {'user_id': 1, 'title': 'Mine'}, if_match='"1"')
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('version 2', response.get_json()['error'])
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Task, task_id).title, 'Theirs')
+
+        for bad in ('W/"2"', '"two"'):
+            self.assertEqual(self._put(f'/tasks/{task_id}', {'user_id': 1, 'title': 'Mine'}, if_match=bad).status_code, 400)
+        self.assertEqual(self._put(f'/tasks/{task_id}', {'user_id': 1, 'title': 'Mine'}, if_match='*').status_code, 200)
+
+    def _save_elsewhere(self, model, row_id):
+        # Another request saves the row after this one read it
+        db.session.execute(db.update(model).where(model.id == row_id).values(version=model.version + 1))
+        db.session.commit()
+
+    def _race(self, task_id, **kwargs):
+        """update_task completing the task while another request saves it mid-way"""
+        def concurrent_write(task):
+            # Saved after the task was read; the loaded row keeps its old version
+            db.session.execute(
+                db.update(Task).where(Task.id == task_id).values(version=Task.version + 1),
+                execution_options={'synchronize_session': False}
+            )
+            return True
+
+        with patch('app.service._are_all_subtasks_completed', side_effect=concurrent_write):
+            return service.update_task(task_id, 1, {'title': 'Mine', 'status': 'Completed'}, 'A comment', **kwargs)
+
+    def test_write_racing_another_commit_is_rolled_back(self):
+        task_id = service.create_task({'title': 'Versioned', 'owner_id': 1}).id
+        result, message = self._race(task_id, expected_version=1)
+        self.assertIsNone(result)
+        self.assertTrue(message.startswith('Conflict'))
+
+        db.session.expire_all()
+        task = db.session.get(Task, task_id)
+        self.assertEqual((task.title, task.status, task.comments), ('Versioned', TaskStatusEnum.UNASSIGNED, []))
+
+    def test_unconditional_writes_do_not_conflict(self):
+        task_id = service.create_task({'title': 'Versioned', 'owner_id': 1}).id
+        result, message = self._race(task_id)
+        self.assertIsNotNone(result, message)
+        self.assertEqual((result['title'], result['version']), ('Mine', 3))
+
+        response = self._put('/projects/1', {'user_id': 1, 'title': 'Renamed'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['version'], 2)
+
+    def test_project_write_checks_the_version(self):
+        response = self._put('/projects/1', {'user_id': 1, 'title': 'Renamed'}, if_match='"1"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['version'], 2)
+
+        response = self._put('/projects/1', {'user_id': 1, 'title': 'Stale', 'version': 1})
+        self.assertEqual(response.status_code, 409)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Project, 1).title, 'Renamed')
+
+
+class TestRecurrenceExpansion(TestTaskRoutesIntegration):
+    """Virtual occurrences of recurring tasks, materialized only when edited or completed"""
+
+    def _series(self):
+        task = service.create_task({
+            'title': 'Weekly sync', 'owner_id': 1, 'deadline': '2030-01-07T09:00:00Z',
+            'is_recurring': True, 'recurrence_interval': 'weekly', 'recurrence_end_date': '2030-03-01T00:00:00Z'
+        })
+        service.create_task({'title': 'Agenda', 'owner_id': 1, 'parent_task_id': task.id})
+        return task.id
+
+    def _occurrences(self, start='2030-01-01T00:00:00Z', end='2030-02-01T00:00:00Z'):
+        response = self.client.get(f'/tasks/occurrences?owner_id=1&start={start}&end={end}')
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def _task_count(self):
+        return db.session.execute(db.select(db.func.count()).select_from(Task)).scalar()
+
+    def test_expands_without_creating_rows(self):
+        task_id = self._series()
+        before = self._task_count()
+        occurrences = self._occurrences()
+        # The current occurrence (Jan 7) is a real row, not repeated here
+        self.assertEqual([occurrence['id'] for occurrence in occurrences],
+                         [f'{task_id}-20300114T090000', f'{task_id}-20300121T090000', f'{task_id}-20300128T090000'])
+        self.assertTrue(all(occurrence['virtual'] and occurrence['status'] == 'Unassigned' for occurrence in occurrences))
+        self.assertEqual(self._occurrences(), occurrences)
+        self.assertEqual(self._task_count(), before)
+        # The series ends before its end date
+        self.assertEqual(self._occurrences('2030-02-20T00:00:00Z', '2030-04-01T00:00:00Z')[-1]['deadline'],
+                         '2030-02-25T09:00:00')
+
+    def test_editing_an_occurrence_materializes_it_once(self):
+        task_id = self._series()
+        occurrence = f'{task_id}-20300114T090000'
+        response = self.client.put(f'/tasks/occurrences/{occurrence}', json={'user_id': 1, 'title': 'Moved sync'})
+        self.assertEqual(response.status_code, 200)
+        created = response.get_json()
+        self.assertEqual((created['title'], created['deadline'], created['is_recurring']),
+                         ('Moved sync', '2030-01-14T09:00:00', False))
+        self.assertEqual([subtask['title'] for subtask in created['subtasks']], ['Agenda'])
+
+        self.assertNotIn(occurrence, [item['id'] for item in self._occurrences()])
+        # The same occurrence id now edits the row it became
+        response = self.client.put(f'/tasks/occurrences/{occurrence}', json={'user_id': 1, 'status': 'Completed',
+                                                                             'title': 'Done'})
+        self.assertEqual(response.status_code, 400)
+        service.update_task(created['subtasks'][0]['id'], 1, {'status': 'Completed'}, None)
+        response = self.client.put(f'/tasks/occurrences/{occurrence}', json={'user_id': 1, 'status': 'Completed'})
+        self.assertEqual(response.get_json()['id'], created['id'])
+        self.assertEqual(response.get_json()['status'], 'Completed')
+
+    def test_concurrent_materialization_updates_the_first_row(self):
+        from app.recurrence import find_occurrence
+        task_id = self._series()
+        occurrence = f'{task_id}-20300114T090000'
+        first, _ = service.update_occurrence(occurrence, 1, {'title': 'First'}, None)
+
+        # The second request resolved the occurrence before the first one committed
+        seen = []
+        def stale_once(value):
+            task, scheduled, existing = find_occurrence(value)
+            if not seen:
+                seen.append(existing)
+                return task, scheduled, None
+            return task, scheduled, existing
+
+        with patch('app.service.find_occurrence', side_effect=stale_once):
+            second, _ = service.update_occurrence(occurrence, 1, {'title': 'Second'}, None)
+        self.assertEqual(second['id'], first['id'])
+        self.assertEqual(second['title'], 'Second')
+        rows = db.session.execute(
+            db.select(db.func.count()).select_from(Task).where(Task.recurrence_occurrence_at == datetime(2030, 1, 14, 9))
+        ).scalar()
+        self.assertEqual(rows, 1)
+
+    def test_completing_the_current_row_skips_materialized_occurrences(self):
+        task_id = self._series()
+        self.client.put(f'/tasks/occurrences/{task_id}-20300114T090000', json={'user_id': 1, 'priority': 9})
+        subtask_id = db.session.execute(db.select(Task.id).where(Task.parent_task_id == task_id)).scalar()
+        service.update_task(subtask_id, 1, {'status': 'Completed'}, None)
+        service.update_task(task_id, 1, {'status': 'Completed'}, None)
+
+        db.session.expire_all()
+        head = db.session.execute(db.select(Task).where(Task.is_recurring.is_(True))).scalar_one()
+        self.assertEqual((head.deadline, head.recurrence_series_id), (datetime(2030, 1, 21, 9), task_id))
+        # Ids stay the same across materializations
+        self.assertEqual([occurrence['id'] for occurrence in self._occurrences()], [f'{task_id}-20300128T090000'])
+
+    def test_rejects_unknown_occurrences_and_ranges(self):
+        task_id = self._series()
+        self.assertEqual(self.client.put(f'/tasks/occurrences/{task_id}-20300115T090000', json={'user_id': 1}).status_code, 404)
+        self.assertEqual(self.client.put('/tasks/occurrences/not-an-id', json={'user_id': 1}).status_code, 400)
+        self.assertEqual(self.client.put(f'/tasks/occurrences/{task_id}-20300114T090000', json={'user_id': 7}).status_code, 403)
+        self.assertEqual(self.client.get('/tasks/occurrences?owner_id=1&start=2030-01-01&end=2032-01-01').status_code, 400)
+        self.assertEqual(self.client.get('/tasks/occurrences?owner_id=1&start=2030-01-01').status_code, 400)
+
+
+class TestDerivedFreshness(TestTaskRoutesIntegration):
+    """Child writes leave parent and project rows alone; their updated_at is derived on read"""
+
+    def test_subtask_writes_do_not_touch_parent_or_project_rows(self):
+        from sqlalchemy import event
+        from app.serializers import serialize_project, serialize_project_summary
+        parent = service.create_task({'title': 'Parent', 'owner_id': 1, 'project_id': 1})
+        subtask = service.create_task({'title': 'Child', 'owner_id': 1, 'parent_task_id': parent.id})
+        parent_id, subtask_id = parent.id, subtask.id
+        long_ago = datetime(2020, 1, 1)
+        db.session.execute(db.update(Task).values(updated_at=long_ago))
+        db.session.execute(db.update(Project).values(updated_at=long_ago))
+        db.session.commit()
+
+        updates = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('UPDATE'):
+                updates.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            service.add_comment(subtask_id, {'body': 'Busy', 'author_id': 1})
+            service.update_task(subtask_id, 1, {'status': 'Ongoing'}, None)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+        self.assertFalse([statement for statement in updates if statement.startswith('UPDATE projects')])
+
+        # Only the subtask's own row was written
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Task, parent_id).updated_at, long_ago)
+        project = db.session.get(Project, 1)
+        self.assertEqual(project.updated_at, long_ago)
+
+        # Reads report when anything below last changed
+        subtask_updated = db.session.get(Task, subtask_id).updated_at.isoformat()
+        self.assertEqual(service.get_task_details(parent_id)['updated_at'], subtask_updated)
+        self.assertEqual(serialize_project(project)['updated_at'], subtask_updated)
+        self.assertEqual(serialize_project_summary(project)['updated_at'], subtask_updated)
+
+    def test_summaries_report_the_same_updated_at_as_full_payloads(self):
+        parent = service.create_task({'title': 'Parent', 'owner_id': 1})
+        subtask = service.create_task({'title': 'Child', 'owner_id': 1, 'parent_task_id': parent.id})
+        parent_id, subtask_id = parent.id, subtask.id
+        db.session.execute(db.update(Task).where(Task.id == parent_id).values(updated_at=datetime(2020, 1, 1)))
+        db.session.execute(db.update(Task).where(Task.id == subtask_id).values(updated_at=datetime(2024, 5, 6)))
+        db.session.commit()
+
+        full = self.client.get('/tasks?owner_id=1').get_json()[0]
+        summary = self.client.get('/tasks?owner_id=1&view=summary').get_json()[0]
+        sparse = self.client.get('/tasks?owner_id=1&fields=updated_at').get_json()[0]
+        self.assertEqual(full['updated_at'], '2024-05-06T00:00:00')
+        self.assertEqual(summary['updated_at'], full['updated_at'])
+        self.assertEqual(sparse, {'id': parent_id, 'updated_at': full['updated_at']})
+
+
+    def test_project_routes_report_subtree_writes(self):
+        parent = service.create_task({'title': 'Parent', 'owner_id': 1, 'project_id': 1})
+        subtask = service.create_task({'title': 'Child', 'owner_id': 1, 'parent_task_id': parent.id})
+        parent_id, subtask_id = parent.id, subtask.id
+        long_ago = datetime(2020, 1, 1)
+        db.session.execute(db.update(Task).values(updated_at=long_ago))
+        db.session.execute(db.update(Project).values(updated_at=long_ago))
+        db.session.commit()
+
+        response = self.client.post(f'/tasks/{subtask_id}/comments', json={'body': 'Busy', 'author_id': 1})
+        self.assertEqual(response.status_code, 201)
+        db.session.expire_all()
+        subtask_updated = db.session.get(Task, subtask_id).updated_at.isoformat()
+        self.assertNotEqual(subtask_updated, long_ago.isoformat())
+
+        project = self.client.get('/projects/1?user_id=1').get_json()
+        self.assertEqual(project['updated_at'], subtask_updated)
+        self.assertEqual([task['updated_at'] for task in project['tasks'] if task['id'] == parent_id], [subtask_updated])
+
+        tasks = self.client.get('/projects/1/tasks?user_id=1').get_json()
+        self.assertEqual([task['updated_at'] for task in tasks if task['id'] == parent_id], [subtask_updated])
+
+
 class TestServiceCreateTaskEdgeCases(TestTaskRoutesIntegration):
     """More edge cases for create_task"""
 
@@ -3644,8 +5771,8 @@ class TestServiceErrorPaths(TestTaskRoutesIntegration):
             with self.assertRaises(Exception):
                 create_task({'title': 'Error Task', 'owner_id': 1})
 
-    def test_log_task_activity_with_none_values(self):
-        from app.service import _log_task_activity
+    def test_activity_row_with_none_values(self):
+        from app.service import _activity_row
         from app.models import TaskActivityLog
 
         task = Task(title="Log Test Task", owner_id=1)
@@ -3653,7 +5780,7 @@ class TestServiceErrorPaths(TestTaskRoutesIntegration):
         db.session.commit()
 
         # Test logging with None values
-        _log_task_activity(1, task.id, 'test_field', None, None)
+        db.session.execute(TaskActivityLog.__table__.insert(), [_activity_row(1, task.id, 'test_field', None, None)])
         db.session.commit()
 
         # Verify log was created
@@ -3728,7 +5855,7 @@ class TestRecurringTaskCreation(TestTaskRoutesIntegration):
     """Test recurring task creation and next instance generation"""
 
     def test_create_next_recurring_task_basic(self):
-        from app.service import _create_next_recurring_task
+        from app.service import _create_next_recurring_tasks
         from datetime import datetime, timedelta
 
         # Create a recurring task that was just completed
@@ -3745,7 +5872,7 @@ class TestRecurringTaskCreation(TestTaskRoutesIntegration):
         db.session.commit()
 
         # Call function to create next instance
-        _create_next_recurring_task(task)
+        _create_next_recurring_tasks([task])
         db.session.commit()
 
         # Verify next task was created
@@ -3758,7 +5885,7 @@ class TestRecurringTaskCreation(TestTaskRoutesIntegration):
         self.assertGreater(len(new_tasks), 0)
 
     def test_create_next_recurring_task_with_end_date_passed(self):
-        from app.service import _create_next_recurring_task
+        from app.service import _create_next_recurring_tasks
         from datetime import datetime, timedelta
 
         # Recurring task with end date in the past
@@ -3778,14 +5905,14 @@ class TestRecurringTaskCreation(TestTaskRoutesIntegration):
         initial_recurring = task.is_recurring
 
         # Should not create new task
-        _create_next_recurring_task(task)
+        _create_next_recurring_tasks([task])
         db.session.commit()
 
         # Task should be marked as no longer recurring
         self.assertFalse(task.is_recurring)
 
     def test_create_next_recurring_task_with_subtasks(self):
-        from app.service import _create_next_recurring_task
+        from app.service import _create_next_recurring_tasks
         from datetime import datetime, timedelta
 
         # Create recurring task with subtasks
@@ -3812,7 +5939,7 @@ class TestRecurringTaskCreation(TestTaskRoutesIntegration):
         db.session.commit()
 
         # Create next instance
-        _create_next_recurring_task(parent)
+        _create_next_recurring_tasks([parent])
         db.session.commit()
 
         # Verify new parent and subtask created
@@ -3825,7 +5952,7 @@ class TestRecurringTaskCreation(TestTaskRoutesIntegration):
         self.assertGreater(len(new_parents), 0)
 
     def test_create_next_recurring_task_with_collaborators(self):
-        from app.service import _create_next_recurring_task
+        from app.service import _create_next_recurring_tasks
         from datetime import datetime, timedelta
 
         # Create recurring task with collaborators
@@ -3846,7 +5973,7 @@ class TestRecurringTaskCreation(TestTaskRoutesIntegration):
         db.session.commit()
 
         # Create next instance
-        _create_next_recurring_task(task)
+        _create_next_recurring_tasks([task])
         db.session.commit()
 
         # Verify collaborators were copied
@@ -3864,34 +5991,34 @@ class TestRecurringTaskCreation(TestTaskRoutesIntegration):
                 return
 
     def test_calculate_next_due_date_weekly(self):
-        from app.service import _calculate_next_due_date
+        from app.recurrence import calculate_next_due_date
         from datetime import datetime, timedelta
 
         current = datetime(2025, 1, 1)
-        next_date = _calculate_next_due_date(current, 'weekly', None)
+        next_date = calculate_next_due_date(current, 'weekly', None)
 
         self.assertIsNotNone(next_date)
         self.assertEqual((next_date - current).days, 7)
 
     def test_calculate_next_due_date_monthly(self):
-        from app.service import _calculate_next_due_date
+        from app.recurrence import calculate_next_due_date
         from datetime import datetime
         from dateutil.relativedelta import relativedelta
 
         current = datetime(2025, 1, 15)
-        next_date = _calculate_next_due_date(current, 'monthly', None)
+        next_date = calculate_next_due_date(current, 'monthly', None)
 
         self.assertIsNotNone(next_date)
         expected = current + relativedelta(months=1)
         self.assertEqual(next_date.day, expected.day)
 
     def test_calculate_next_due_date_invalid_interval(self):
-        from app.service import _calculate_next_due_date
+        from app.recurrence import calculate_next_due_date
         from datetime import datetime
 
         # Test with invalid interval - should return None
         current = datetime(2025, 1, 1)
-        next_date = _calculate_next_due_date(current, 'invalid_interval', None)
+        next_date = calculate_next_due_date(current, 'invalid_interval', None)
 
         # Function should handle gracefully (returns None for unknown interval)
         self.assertIsNone(next_date)
@@ -3,12 +3,15 @@ from flask_cors import CORS
 from config import app_config
 from .models import db
 from .routes import user_bp
+from .encoding import OrjsonProvider
 
 def create_app(config_name="development"):
     """An application factory."""
 
     app = Flask(__name__)
     app.config.from_object(app_config[config_name])
+    # jsonify() through orjson
+    app.json = OrjsonProvider(app)
 
     # Enable CORS for frontend communication
     CORS(app, origins=["http://localhost:5173", "http://localhost:5174", "http://localhost:8000"])
@@ -0,0 +1,112 @@
+from flask import current_app, request
+from werkzeug.datastructures import Headers
+from werkzeug.test import EnvironBuilder
+from .models import db
+
+# Request batching (POST /tasks/batch, POST /user/batch).
+# Pages such as TaskDetail chain several calls (the task, its collaborators, ...), each a full
+# browser -> Kong -> Flask round trip. A batch carries those calls as sub-requests to existing
+# routes, which are dispatched one after another through the normal request pipeline inside the
+# batch's own app context, so they share its database session and connection, and the results
+# come back as one array. Sub-requests are independent: one failing does not stop the others.
+#
+# task_service/app/batch.py and user_service/app/batch.py are the same file: every service is
+# its own Docker build context, so there is no shared package to import it from. Change both.
+
+MAX_BATCH_SIZE = 20
+
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+# Headers of the batch request passed on to every sub-request
+FORWARDED_HEADERS = ('Authorization', 'Accept-Language')
+
+
+def parse_batch(payload):
+    """
+    Validate a batch body: a list of {"method", "path", "body"?, "headers"?} objects.
+    Returns the normalized list. Raises ValueError for a malformed batch.
+    """
+    if not isinstance(payload, list) or not payload:
+        raise ValueError("Batch must be a non-empty list of requests")
+    if len(payload) > MAX_BATCH_SIZE:
+        raise ValueError(f"A batch holds at most {MAX_BATCH_SIZE} requests")
+
+    sub_requests = []
+    for index, item in enumerate(payload):
+        if not isinstance(item, dict) or not isinstance(item.get('path'), str) or not item['path'].startswith('/'):
+            raise ValueError(f"Request {index} needs a path starting with '/'")
+        method = str(item.get('method', 'GET')).upper()
+        if method not in BATCH_METHODS:
+            raise ValueError(f"Request {index} has an unsupported method: {method}")
+        headers = item.get('headers') or {}
+        if not isinstance(headers, dict):
+            raise ValueError(f"Request {index} headers must be an object")
+        sub_requests.append({'method': method, 'path': item['path'], 'body': item.get('body'), 'headers': headers})
+    return sub_requests
+
+
+def _result(response):
+    body = None
+    if response.status_code != 304:
+        body = response.get_json(silent=True)
+        if body is None:
+            body = response.get_data(as_text=True) or None
+    headers = {key: value for key, value in response.headers.items() if key != 'Content-Length'}
+    return {'status': response.status_code, 'headers': headers, 'body': body}
+
+
+def _error(status, message):
+    return {'status': status, 'headers': {'Content-Type': 'application/json'}, 'body': {'error': message}}
+
+
+def run_sub_request(sub_request, excluded_endpoints=()):
+    """
+    Dispatch one sub-request through the app and return {"status", "headers", "body"}.
+    Routes in excluded_endpoints (and the batch route itself) are refused with a 400 result.
+    """
+    app = current_app._get_current_object()
+    excluded_endpoints = {request.endpoint, *excluded_endpoints}
+    # Header names are case-insensitive: a sub-request's 'authorization' replaces the batch's
+    headers = Headers([(name, request.headers[name]) for name in FORWARDED_HEADERS if name in request.headers])
+    for name, value in sub_request['headers'].items():
+        headers.set(name, str(value))
+    # Results are embedded in the batch's JSON, so sub-responses must not be compressed
+    headers.remove('Accept-Encoding')
+    builder = EnvironBuilder(
+        path=sub_request['path'],
+        method=sub_request['method'],
+        json=sub_request['body'] if sub_request['body'] is not None else None,
+        headers=headers,
+        base_url=request.host_url
+    )
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+
+    # The app context of the batch is already active, so it (and its session) is reused
+    with app.request_context(environ):
+        if request.url_rule is not None and request.url_rule.endpoint in excluded_endpoints:
+            return _error(400, f"{sub_request['path']} cannot be batched")
+        try:
+            response = app.full_dispatch_request()
+            # Read while the request context is active (streamed bodies need it)
+            result = _result(response)
+            response.close()
+        except Exception as e:
+            print(f"Error in batched request {sub_request['method']} {sub_request['path']}: {e}")
+            result = _error(500, str(e))
+        if result['status'] >= 500:
+            # The session is shared with the rest of the batch: a failed transaction left open
+            # here (on PostgreSQL) would make every later sub-request fail too
+            db.session.rollback()
+        return result
+
+
+def run_batch(payload, excluded_endpoints=()):
+    """
+    Run every sub-request of a batch in order. Returns the list of results.
+    excluded_endpoints names routes that cannot be batched, such as never-ending streams.
+    Raises ValueError for a malformed batch.
+    """
+    return [run_sub_request(sub_request, excluded_endpoints) for sub_request in parse_batch(payload)]
@@ -1,11 +1,14 @@
 # app/routes.py
 from flask import Blueprint, request, jsonify, current_app
 from . import service
+from .batch import run_batch
+from .encoding import list_response, compress_response
 import jwt
 from functools import wraps
 from flask import current_app
 
 user_bp = Blueprint('user_bp', __name__)
+user_bp.after_request(compress_response)
 
 # --- Decorator for protected routes ---
 def token_required(f):
@@ -77,7 +80,7 @@ def get_all_users():
     """Get all users"""
     try:
         users = service.get_all_users()
-        return jsonify([user.to_json() for user in users]), 200
+        return list_response([user.to_json() for user in users]), 200
     except Exception as e:
         print(f"Error getting all users: {e}")
         return jsonify({'error': str(e)}), 500
@@ -87,7 +90,7 @@ def get_all_teams():
     """Get all teams"""
     try:
         teams = service.get_all_teams()
-        return jsonify([team.to_json() for team in teams]), 200
+        return list_response([team.to_json() for team in teams]), 200
     except Exception as e:
         print(f"Error getting all teams: {e}")
         return jsonify({'error': str(e)}), 500
@@ -97,7 +100,7 @@ def get_all_users_in_team(team_id):
     """Get all users in a specific team"""
     try:
         users = service.get_all_users_in_team(team_id)
-        return jsonify([user.to_json() for user in users]), 200
+        return list_response([user.to_json() for user in users]), 200
     except Exception as e:
         print(f"Error getting users in team {team_id}: {e}")
         return jsonify({'error': str(e)}), 500
@@ -107,7 +110,7 @@ def get_all_dept():
     """Get all departments"""
     try:
         depts = service.get_all_dept()
-        return jsonify([dept.to_json() for dept in depts]), 200
+        return list_response([dept.to_json() for dept in depts]), 200
     except Exception as e:
         print(f"Error getting all departments: {e}")
         return jsonify({'error': str(e)}), 500
@@ -117,11 +120,27 @@ def get_all_users_in_dept(dept_id):
     """Get all users in a specific department"""
     try:
         users = service.get_all_users_in_dept(dept_id)
-        return jsonify([user.to_json() for user in users]), 200
+        return list_response([user.to_json() for user in users]), 200
     except Exception as e:
         print(f"Error getting users in department {dept_id}: {e}")
         return jsonify({'error': str(e)}), 500
 
+@user_bp.route('/user/batch', methods=['POST'])
+def batch_requests():
+    """
+    Run several requests to this service in one round trip, e.g. one /user/<id> per collaborator.
+    Body: [{"method": "GET", "path": "/user/1"}, {"method": "GET", "path": "/user/2"}, ...]
+    Returns [{"status": 200, "headers": {...}, "body": {...}}, ...] in the same order.
+    """
+    try:
+        return jsonify(run_batch(request.get_json(silent=True))), 200
+    except ValueError as e:
+        print(f"Error in batch_requests: {e}")
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error in batch_requests: {e}")
+        return jsonify({'error': str(e)}), 500
+
 # --- Protected Routes ---
 @user_bp.route('/user/verifyJWT', methods=['GET'])
 @token_required
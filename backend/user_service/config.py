@@ -19,6 +19,10 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {'pool_recycle': 299}
 
+    # gzip/deflate responses of at least this many bytes
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '6'))
+
 class TestingConfig(Config):
     """Configurations for Testing."""
     TESTING = True
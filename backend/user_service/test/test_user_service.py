@@ -391,6 +391,101 @@ class TestUserServiceRoutes(unittest.TestCase):
 
 # ==================== COMPREHENSIVE ERROR PATH AND EDGE CASE TESTS ====================
 
+class TestBatchRoutes(unittest.TestCase):
+    """POST /user/batch"""
+
+    setUp = TestUserServiceRoutes.setUp
+    tearDown = TestUserServiceRoutes.tearDown
+
+    def test_batch_of_user_lookups(self):
+        user_id = self.client().post('/user/create', json=self.user_data).get_json()['id']
+        res = self.client().post('/user/batch', json=[
+            {'method': 'GET', 'path': f'/user/{user_id}'},
+            {'method': 'GET', 'path': '/user/9999'},
+            {'method': 'GET', 'path': '/user/teams'},
+        ])
+        self.assertEqual(res.status_code, 200)
+        results = res.get_json()
+        self.assertEqual([result['status'] for result in results], [200, 404, 200])
+        self.assertEqual(results[0]['body']['username'], 'testuser')
+        self.assertEqual(results[2]['body'][0]['name'], 'Test Team')
+
+    def test_batch_forwards_the_authorization_header(self):
+        self.client().post('/user/create', json=self.user_data)
+        token = self.client().post('/user/login', json={
+            'email': self.user_data['email'], 'password': self.user_data['password']
+        }).get_json()['token']
+        res = self.client().post('/user/batch', json=[{'path': '/user/verifyJWT'}],
+                                 headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(res.get_json()[0]['status'], 200)
+
+    def test_sub_request_header_names_are_case_insensitive(self):
+        self.app.config['COMPRESS_MIN_SIZE'] = 0
+        self.client().post('/user/create', json=self.user_data)
+        token = self.client().post('/user/login', json={
+            'email': self.user_data['email'], 'password': self.user_data['password']
+        }).get_json()['token']
+        res = self.client().post('/user/batch', json=[
+            {'path': '/user/teams', 'headers': {'accept-encoding': 'gzip'}},
+            {'path': '/user/verifyJWT', 'headers': {'authorization': f'Bearer {token}'}},
+        ], headers={'Authorization': 'Bearer stale'})
+        results = res.get_json()
+        self.assertNotIn('Content-Encoding', results[0]['headers'])
+        self.assertEqual(results[0]['body'][0]['name'], 'Test Team')
+        self.assertEqual(results[1]['status'], 200)
+
+    @patch('app.routes.service.get_all_users')
+    def test_failed_transactions_do_not_leak_into_later_sub_requests(self, mock_get_all_users):
+        def failing_flush():
+            # Leaves the shared session in a failed transaction; the route only answers 500
+            db.session.add(User(username='broken'))
+            db.session.flush()
+
+        mock_get_all_users.side_effect = failing_flush
+        res = self.client().post('/user/batch', json=[{'path': '/user'}, {'path': '/user/teams'}])
+        results = res.get_json()
+        self.assertEqual([result['status'] for result in results], [500, 200])
+        self.assertEqual(results[1]['body'][0]['name'], 'Test Team')
+
+    def test_invalid_batches(self):
+        self.assertEqual(self.client().post('/user/batch', json={'path': '/user/1'}).status_code, 400)
+        self.assertEqual(self.client().post('/user/batch', json=[{'path': '/user/1'}] * 21).status_code, 400)
+        res = self.client().post('/user/batch', json=[{'method': 'POST', 'path': '/user/batch', 'body': []}])
+        self.assertEqual(res.get_json()[0]['status'], 400)
+
+
+class TestResponseEncoding(unittest.TestCase):
+    """Compression and columnar JSON on the user list routes"""
+
+    setUp = TestUserServiceRoutes.setUp
+    tearDown = TestUserServiceRoutes.tearDown
+
+    def _create_users(self, count):
+        for i in range(count):
+            data = dict(self.user_data, username=f'user{i}', email=f'user{i}@example.com')
+            self.client().post('/user/create', json=data)
+
+    def test_large_lists_are_gzipped(self):
+        import gzip
+        self._create_users(15)
+        plain = self.client().get('/user')
+        gzipped = self.client().get('/user', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual(gzipped.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(gzipped.data), plain.data)
+
+        small = self.client().get('/user/teams', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', small.headers)
+
+    def test_columnar_lists(self):
+        import json
+        self._create_users(2)
+        users = self.client().get('/user').get_json()
+        res = self.client().get('/user', headers={'Accept': 'application/vnd.columnar+json'})
+        table = json.loads(res.data)
+        self.assertEqual([dict(zip(table['columns'], row)) for row in table['rows']], users)
+
+
 class TestRoutesErrorPaths(unittest.TestCase):
     """Test error handling in routes"""
 